@@ -0,0 +1,53 @@
+"""
+Degree planner scaling: quarters found, lower bound and search time as the requirement set grows.
+
+Targets are random CMPSC/MATH/PSTAT/ECE courses from the real prerequisite data
+(plus the prerequisites the planner adds). A third of the courses are offered in
+only one or two quarters, which is what makes the search work for its answer.
+Runs that hit the time budget fall back to the greedy schedule ("optimal" = no).
+
+    python backend/benchmarks/degree_planner.py [--sizes 5 10 20 40] [--units 12 16] [--budget-ms 250]
+"""
+import argparse
+import os
+import random
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from src.services.prereq_engine import get_prereq_graph
+from src.services.prereq_planner import SEASONS, DegreePlanner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--units", type=int, nargs="+", default=[12, 16])
+    parser.add_argument("--budget-ms", type=float, default=250.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    graph = get_prereq_graph()
+    catalog = [code for node, code in enumerate(graph.codes) if graph.is_catalog(node)]
+    rng = random.Random(args.seed)
+    offerings = {
+        code: rng.sample(SEASONS, rng.randint(1, 2)) for code in graph.codes if rng.random() < 1 / 3
+    }
+
+    print(f"{'targets':>8} {'units':>6} {'planned':>8} {'bound':>6} {'greedy':>7} {'found':>6} {'optimal':>8} {'ms':>8}")
+    for size in args.sizes:
+        targets = rng.sample(catalog, min(size, len(catalog)))
+        for units in args.units:
+            planner = DegreePlanner([], targets, units, offerings, time_budget_ms=args.budget_ms)
+            greedy = len(planner._greedy())
+            plan = planner.plan()
+            print(
+                f"{size:>8} {units:>6} {len(planner.nodes):>8} {plan['lower_bound']:>6} {greedy:>7} "
+                f"{plan['quarter_count']:>6} {'yes' if plan['optimal'] else 'no':>8} {plan['elapsed_ms']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
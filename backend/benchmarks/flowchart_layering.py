@@ -0,0 +1,98 @@
+"""
+Scaling benchmark for flowchart tiering: the old list-queue layering vs. layer_courses.
+
+Builds synthetic DAGs over a mix of departments, the shape of a combined
+multi-major graph: 40% of courses have no prerequisites and the rest depend on
+1-3 courses from the previous few layers. "keys ms" is the one-off
+_course_sort_key pass; the layering columns reuse those ranks, as
+build_upper_division_flowchart_data does.
+
+    python backend/benchmarks/flowchart_layering.py [--sizes 1000 5000 20000 50000] [--legacy-max 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from src.services.prereq_graph import _course_ranks, _course_sort_key, layer_courses
+
+DEPARTMENTS = ["CMPSC", "MATH", "PSTAT", "ECE", "PHYS", "ECON"]
+
+
+def synthetic_graph(size: int, seed: int = 3) -> tuple[list[str], set[tuple[str, str]]]:
+    rng = random.Random(seed)
+    courses = [f"{DEPARTMENTS[i % len(DEPARTMENTS)]} {i // len(DEPARTMENTS) + 1}" for i in range(size)]
+    roots = max(size * 2 // 5, 1)
+    layer_width = max((size - roots) // 30, 1)
+    edges = set()
+    for i in range(roots, size):
+        layer_start = roots + (i - roots) // layer_width * layer_width
+        window_start = max(0, layer_start - 3 * layer_width)
+        for source in rng.sample(range(window_start, layer_start), min(rng.randint(1, 3), layer_start - window_start)):
+            edges.add((courses[source], courses[i]))
+    return courses, edges
+
+
+def legacy_levels(subset_courses: list[str], edges: set[tuple[str, str]]) -> dict[str, int]:
+    """The previous implementation: list.pop(0) and a regex-keyed sort per node."""
+    indegree = {course: 0 for course in subset_courses}
+    outgoing: dict[str, set[str]] = {course: set() for course in subset_courses}
+    for source, target in edges:
+        if source not in indegree or target not in indegree or target in outgoing[source]:
+            continue
+        outgoing[source].add(target)
+        indegree[target] += 1
+
+    queue = sorted([course for course, degree in indegree.items() if degree == 0], key=_course_sort_key)
+    levels = {course: 0 for course in subset_courses}
+    while queue:
+        node = queue.pop(0)
+        for neighbor in sorted(outgoing[node], key=_course_sort_key):
+            levels[neighbor] = max(levels[neighbor], levels[node] + 1)
+            indegree[neighbor] -= 1
+            if indegree[neighbor] == 0:
+                queue.append(neighbor)
+    return levels
+
+
+def _timed(fn) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1e3, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000, 50000])
+    parser.add_argument("--legacy-max", type=int, default=20000, help="skip the legacy run above this size")
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8} {'edges':>8} {'legacy ms':>10} {'keys ms':>8} {'longest ms':>11} {'alap ms':>9} {'tiers':>6}")
+    for size in args.sizes:
+        courses, edges = synthetic_graph(size)
+        _course_sort_key.cache_clear()
+        keys_ms, ranks = _timed(lambda: _course_ranks(courses))
+        longest_ms, (levels, cycles) = _timed(lambda: layer_courses(courses, edges, ranks=ranks))
+        alap_ms, _ = _timed(lambda: layer_courses(courses, edges, "alap", ranks))
+        assert not cycles
+
+        legacy = "-"
+        if size <= args.legacy_max:
+            _course_sort_key.cache_clear()
+            legacy_ms, legacy_result = _timed(lambda: legacy_levels(courses, edges))
+            assert legacy_result == levels, "layer_courses disagrees with the legacy layering"
+            legacy = f"{legacy_ms:.1f}"
+
+        print(
+            f"{size:>8} {len(edges):>8} {legacy:>10} {keys_ms:>8.1f} {longest_ms:>11.1f} {alap_ms:>9.1f} "
+            f"{max(levels.values()) + 1:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
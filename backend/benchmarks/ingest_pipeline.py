@@ -0,0 +1,78 @@
+"""
+Ingestion throughput: one serial embed-then-upsert pass vs. IngestPipeline.
+
+The embedding API and Pinecone are simulated with fixed per-call latencies
+(plus a per-document embedding cost), so the numbers show what batching and the
+worker pools buy rather than network noise.
+
+    python backend/benchmarks/ingest_pipeline.py [--docs 2000] [--embed-ms 300] [--upsert-ms 80]
+"""
+import argparse
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from langchain_core.documents import Document
+
+from src.managers.ingest_pipeline import IngestPipeline
+
+
+class SlowEmbeddings:
+    def __init__(self, call_ms: float, per_doc_ms: float):
+        self.call_ms = call_ms
+        self.per_doc_ms = per_doc_ms
+
+    def embed_documents(self, texts):
+        time.sleep((self.call_ms + self.per_doc_ms * len(texts)) / 1000)
+        return [[0.0] * 8 for _ in texts]
+
+
+def slow_index(upsert_ms: float):
+    index = MagicMock()
+    index.upsert.side_effect = lambda **kwargs: time.sleep(upsert_ms / 1000)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--embed-ms", type=float, default=300.0, help="latency per embedding call")
+    parser.add_argument("--embed-doc-ms", type=float, default=1.0, help="extra embedding cost per document")
+    parser.add_argument("--upsert-ms", type=float, default=80.0, help="latency per upsert call")
+    parser.add_argument("--upsert-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    docs = [Document(page_content=f"review {i}") for i in range(args.docs)]
+    ids = [f"id-{i}" for i in range(args.docs)]
+
+    embeddings = SlowEmbeddings(args.embed_ms, args.embed_doc_ms)
+    index = slow_index(args.upsert_ms)
+    started = time.perf_counter()
+    vectors = embeddings.embed_documents([doc.page_content for doc in docs])
+    records = list(zip(ids, vectors, [{} for _ in docs]))
+    for start in range(0, len(records), args.upsert_batch):
+        index.upsert(vectors=records[start:start + args.upsert_batch], namespace="bench")
+    serial = time.perf_counter() - started
+    print(f"{'serial (one call)':<28} {serial:>7.2f}s {args.docs / serial:>9.1f} docs/s")
+
+    for batch_size, embed_workers, upsert_workers in [(64, 1, 1), (64, 4, 2), (128, 4, 4), (64, 8, 4)]:
+        pipeline = IngestPipeline(
+            SlowEmbeddings(args.embed_ms, args.embed_doc_ms),
+            slow_index(args.upsert_ms),
+            embed_batch_size=batch_size,
+            embed_workers=embed_workers,
+            upsert_workers=upsert_workers,
+            upsert_batch_size=args.upsert_batch,
+        )
+        _, stats = pipeline.run(docs, ids, "bench")
+        label = f"batch={batch_size} embed={embed_workers} upsert={upsert_workers}"
+        print(f"{label:<28} {stats['seconds']:>7.2f}s {stats['docs_per_second']:>9.1f} docs/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Per-call eligibility timings: string-set evaluation vs. PrereqGraph bitmasks.
+
+Runs on the bundled CMPSC prerequisite data and on a synthetic multi-department
+catalog (5,000 courses by default).
+
+    python backend/benchmarks/prereq_eligibility.py [--courses 5000] [--calls 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from src.services.prereq_engine import PrereqGraph, get_prereq_graph
+
+DEPARTMENTS = ["CMPSC", "MATH", "PSTAT", "ECE", "PHYS", "CHEM", "ECON", "MCDB", "ENGR", "LING"]
+
+
+def synthetic_catalog(course_count: int, seed: int = 7) -> dict:
+    """Courses spread over DEPARTMENTS, each with 0-3 AND-groups of 1-3 earlier courses."""
+    rng = random.Random(seed)
+    codes: list[str] = []
+    data: dict = {}
+    for i in range(course_count):
+        code = f"{DEPARTMENTS[i % len(DEPARTMENTS)]} {i // len(DEPARTMENTS) + 1}"
+        prereqs: list[str] = []
+        if codes:
+            for _ in range(rng.randint(0, 3)):
+                options = rng.sample(codes[-400:], min(len(codes), rng.randint(1, 3), 400))
+                prereqs.append(options[0])
+                prereqs.extend(f"OR {option}" for option in options[1:])
+        data[code] = {"prereq_courses": prereqs}
+        codes.append(code)
+    return data
+
+
+def string_set_eligible(graph: PrereqGraph, completed: set[str], excluded: set[str]) -> list[str]:
+    """The pre-bitmask evaluation: all(any(option in completed_set)) over code strings."""
+    eligible = []
+    for node in graph.catalog_ids:
+        code = graph.codes[node]
+        if code in excluded:
+            continue
+        groups = [[graph.codes[option] for option in group] for group in graph.groups[node]]
+        if all(any(option in completed for option in group) for group in groups):
+            eligible.append(code)
+    return eligible
+
+
+def _per_call_us(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def run(name: str, graph: PrereqGraph, calls: int, seed: int = 11):
+    rng = random.Random(seed)
+    catalog = [graph.codes[node] for node in graph.catalog_ids]
+    completed = set(rng.sample(catalog, len(catalog) // 3))
+
+    expected = string_set_eligible(graph, completed, completed)
+    actual = graph.eligible_courses(completed, completed)
+    assert actual == expected, "bitmask and string-set eligibility disagree"
+
+    completed_mask = graph.to_mask(completed)
+    completed_ids = graph.to_ids(completed)
+
+    string_us = _per_call_us(lambda: string_set_eligible(graph, completed, completed), calls)
+    bitmask_us = _per_call_us(lambda: graph.eligible_ids(completed_mask, completed_ids), calls)
+    end_to_end_us = _per_call_us(lambda: graph.eligible_courses(completed, completed), calls)
+
+    print(f"{name}: {len(graph)} courses, {len(completed)} completed, {len(expected)} eligible")
+    print(f"  string sets          {string_us:10.1f} us/call")
+    print(f"  bitmask (ids in)     {bitmask_us:10.1f} us/call  ({string_us / bitmask_us:.1f}x)")
+    print(f"  bitmask (codes in)   {end_to_end_us:10.1f} us/call  ({string_us / end_to_end_us:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=5000)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    run("CMPSC data", get_prereq_graph(), args.calls)
+
+    started = time.perf_counter()
+    synthetic = PrereqGraph.from_data(synthetic_catalog(args.courses))
+    compile_ms = (time.perf_counter() - started) * 1e3
+    print(f"\ncompiled synthetic catalog in {compile_ms:.1f} ms")
+    run("synthetic catalog", synthetic, max(args.calls // 10, 5))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+VectorManager.search latency with a cold vs. warm self-query retriever cache.
+
+Cold re-reads the schema file and rebuilds SelfQueryRetriever for every query
+(what search() used to do); warm reuses the retriever compiled for the namespace.
+The query-constructor LLM and Pinecone are simulated with fixed latencies, so the
+difference is the per-query schema load and retriever construction.
+
+    python backend/benchmarks/self_query_retriever.py [--queries 200] [--fields 8] [--llm-ms 0] [--query-ms 0]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from langchain_core.embeddings import FakeEmbeddings
+from langchain_core.language_models import FakeListLLM
+from langchain_pinecone import PineconeVectorStore
+
+import src.managers.vector_manager as vector_manager_module
+from src.managers.vector_manager import VectorManager
+
+NAMESPACE = "professor_data"
+
+
+def offline_vector_manager(llm_ms: float, query_ms: float) -> VectorManager:
+    with patch.object(vector_manager_module, "Pinecone"), \
+            patch.object(vector_manager_module, "GoogleGenerativeAIEmbeddings"), \
+            patch.object(vector_manager_module, "PineconeVectorStore"), \
+            patch.object(vector_manager_module, "NamespaceRouter"), \
+            patch.object(vector_manager_module, "CachedEmbeddings", lambda inner, **kwargs: FakeEmbeddings(size=8)), \
+            patch.object(vector_manager_module, "getLLM"):
+        vm = VectorManager(api_key="benchmark")
+
+    index = MagicMock()
+    index.query.side_effect = lambda **kwargs: time.sleep(query_ms / 1000) or {"matches": []}
+    vm.vector_store = PineconeVectorStore(index=index, embedding=FakeEmbeddings(size=8), text_key="text")
+    vm.llm = FakeListLLM(
+        responses=['```json\n{"query": "professors who grade fairly", "filter": "NO_FILTER"}\n```'],
+        sleep=llm_ms / 1000 or None,
+    )
+    vm.route_query = lambda query, query_vector=None: NAMESPACE
+    return vm
+
+
+def timed_queries(vm: VectorManager, queries: int, cold: bool) -> list[float]:
+    latencies = []
+    for i in range(queries):
+        if cold:
+            vm.invalidate_schema_cache()
+        started = time.perf_counter()
+        vm.search(f"which professors grade fairly {i}", k=4)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--fields", type=int, default=8, help="metadata fields in the namespace schema")
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="latency of the query-constructor LLM call")
+    parser.add_argument("--query-ms", type=float, default=0.0, help="latency of the Pinecone query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        schema_file = os.path.join(tmp, "namespace_schemas.json")
+        with open(schema_file, "w") as f:
+            json.dump({NAMESPACE: [
+                {"name": f"field_{i}", "description": f"Metadata field number {i}", "type": "string"}
+                for i in range(args.fields)
+            ]}, f)
+        vector_manager_module.SCHEMA_FILE = schema_file
+
+        vm = offline_vector_manager(args.llm_ms, args.query_ms)
+        vm.search("warm-up", k=4)
+        for label, cold in [("cold (rebuild per query)", True), ("warm (cached retriever)", False)]:
+            latencies = timed_queries(vm, args.queries, cold)
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+            print(
+                f"{label:<26} mean {statistics.mean(latencies):>7.2f} ms  "
+                f"p50 {statistics.median(latencies):>7.2f} ms  p95 {p95:>7.2f} ms"
+            )
+        print(f"retriever cache: {dict(vm.retriever_counters)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from dotenv import load_dotenv
 from fastapi import APIRouter, HTTPException
@@ -77,7 +78,8 @@ async def callback(code: str):
             "redirect_uri": "http://localhost:8000/auth/callback"
         }
         
-        response = requests.post(token_url, data=data)
+        # requests is blocking; run it on a worker thread so the event loop keeps serving.
+        response = await asyncio.to_thread(requests.post, token_url, data=data)
         token_data = response.json()
         
         if "error" in token_data:
@@ -88,7 +90,7 @@ async def callback(code: str):
         # Get user info
         user_info_url = "https://www.googleapis.com/oauth2/v2/userinfo"
         headers = {"Authorization": f"Bearer {access_token}"}
-        user_response = requests.get(user_info_url, headers=headers)
+        user_response = await asyncio.to_thread(requests.get, user_info_url, headers=headers)
         user_data = user_response.json()
         
         # Validate email domain
@@ -1,30 +1,38 @@
 import asyncio
+import functools
 import os
 import json
+import time
 
 from dotenv import load_dotenv
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 
 from langchain.agents import create_agent
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, AIMessageChunk, ToolMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
 
-from src.managers.session_manager import SessionManager
-from src.managers.firebase_chat_history_manager import FirebaseChatHistoryManager
-from src.managers.vector_manager import VectorManager
+from src.container import AppContainer, get_container
+from src.managers.flowchart_cache import get_flowchart_cache
 from src.scrapers.reddit_scraper import extract_course_codes
 from src.auth.firebase_token import verify_firebase_id_token, firebase_admin_ready
 from src.models.chat_request_dto import ChatRequestDTO
 from src.models.chat_response_dto import ChatResponseDTO
-from src.services.prereq_graph import generate_remaining_path_image
-from src.services.transcript_advisor import build_transcript_advising_context
+from src.services.chat_context import (
+    build_history_messages,
+    fold_session_history,
+    pending_fold,
+    split_history,
+    turn_messages,
+)
+from src.services.prereq_planner import plan_degree_path
+from src.services.prereq_reachability import get_reachability_index
 
 router = APIRouter(prefix="/chat", tags=["chat", "Public"])
 
 load_dotenv(dotenv_path=".env", override=True)
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 DEFAULT_GEMINI_MODEL = os.getenv("GEMINI_MODEL_NAME", "gemini-3-flash-preview")
 
 
@@ -55,7 +63,7 @@ def generate_course_prereqs_graph(completed_courses: Optional[List[str]] = None)
     """
 
     try:
-        image_url, message = generate_remaining_path_image(completed_courses)
+        image_url, message = get_flowchart_cache().remaining_path_image(completed_courses)
     except FileNotFoundError:
         return "Error: Prerequisite data file is missing on the server."
     except Exception:
@@ -67,6 +75,81 @@ def generate_course_prereqs_graph(completed_courses: Optional[List[str]] = None)
     return f"Here is the remaining prerequisite path based on your completed courses:\n\n![CMPSC Prerequisites Graph]({image_url})"
 
 
+@tool
+def lookup_course_prereq_chain(course: str, start_course: Optional[str] = None) -> str:
+    """
+    Answers exactly which courses a course requires (directly and transitively),
+    which courses it unlocks, and the shortest prerequisite chain leading to it.
+
+    Args:
+        course: Course code to look up. Example: "CMPSC 130A"
+        start_course: Optional course the chain should start from. Example: "CMPSC 16"
+    """
+
+    try:
+        info = get_reachability_index().describe(course, start_course)
+    except KeyError as e:
+        return f"{e.args[0]} is not in the prerequisite database."
+    except Exception:
+        return "Error: Failed to look up prerequisite relationships."
+
+    groups = " AND ".join("(" + " OR ".join(group) + ")" for group in info["prerequisite_groups"]) or "none"
+    chain = " -> ".join(info["shortest_chain"]) or f"{start_course} is not a prerequisite of {info['course']}"
+    return (
+        f"{info['course']}\n"
+        f"- Direct prerequisites: {groups}\n"
+        f"- All prerequisites (any option): {', '.join(info['all_prerequisites']) or 'none'}\n"
+        f"- Directly unlocks: {', '.join(info['directly_unlocks']) or 'none'}\n"
+        f"- Eventually unlocks: {', '.join(info['unlocks']) or 'none'}\n"
+        f"- Shortest prerequisite chain: {chain}"
+    )
+
+
+@tool
+def plan_course_schedule(
+    target_courses: List[str],
+    completed_courses: Optional[List[str]] = None,
+    max_units_per_quarter: int = 16,
+    start_quarter: str = "Fall",
+) -> str:
+    """
+    Plans the fewest quarters needed to finish a set of courses, respecting
+    prerequisites and a per-quarter unit cap, and reports the critical path.
+
+    Args:
+        target_courses: Courses the student still wants to finish. Example: ["CMPSC 130A", "CMPSC 170"]
+        completed_courses: Courses already finished or in progress. Example: ["CMPSC 16", "MATH 3A"]
+        max_units_per_quarter: Unit cap per quarter (courses count 4 units each).
+        start_quarter: First quarter of the plan: "Fall", "Winter" or "Spring".
+    """
+
+    try:
+        plan = plan_degree_path(completed_courses, target_courses, max_units_per_quarter, start_season=start_quarter)
+    except ValueError as e:
+        return f"Error: {e}"
+    except Exception:
+        return "Error: Failed to plan the course schedule."
+
+    if not plan["quarters"]:
+        return "Nothing left to schedule: every target course is already completed or unknown."
+
+    lines = [
+        f"{plan['quarter_count']} quarter(s) needed"
+        + ("" if plan["optimal"] else " (best found within the time budget; may not be minimal)")
+        + ":"
+    ]
+    for quarter in plan["quarters"]:
+        lines.append(f"- Quarter {quarter['quarter']} ({quarter['season']}): {', '.join(quarter['courses']) or 'no courses'}")
+    lines.append(f"Critical path: {' -> '.join(plan['critical_path'])}")
+    if plan["added_prerequisites"]:
+        lines.append(f"Added missing prerequisites: {', '.join(plan['added_prerequisites'])}")
+    if plan["unknown_courses"]:
+        lines.append(f"Not in the prerequisite database: {', '.join(plan['unknown_courses'])}")
+    if plan["unschedulable"]:
+        lines.append(f"Cannot be scheduled: {', '.join(plan['unschedulable'])}")
+    return "\n".join(lines)
+
+
 def env_bool(name: str, default: bool = False) -> bool:
     raw = os.getenv(name)
     if raw is None:
@@ -79,6 +162,19 @@ REDDIT_CLASS_NAMESPACE = os.getenv("REDDIT_CLASS_NAMESPACE", "reddit_class_data"
 UCSB_CATALOG_NAMESPACE = os.getenv("UCSB_CATALOG_NAMESPACE", "catalog_class_data")
 TRANSCRIPT_DETERMINISTIC_ADVICE = env_bool("TRANSCRIPT_DETERMINISTIC_ADVICE", True)
 
+CHAT_TOOLS = [generate_course_prereqs_graph, lookup_course_prereq_chain, plan_course_schedule]
+
+
+def _build_base_llm(model_name: str):
+    return GroundedChatGoogleGenerativeAI(
+        model=model_name,
+        temperature=0,
+    )
+
+
+def _build_agent(base_llm):
+    return create_agent(base_llm, CHAT_TOOLS)
+
 
 def to_text(x):
     if isinstance(x, str):
@@ -216,144 +312,276 @@ def _build_deterministic_transcript_advice(transcript_context: dict) -> str:
     )
 
 
-@router.post("/response", response_model=ChatResponseDTO)
-async def get_chat_response(request: ChatRequestDTO, http_request: Request):
-    model_name = request.model_name or DEFAULT_GEMINI_MODEL
+async def _persist_turn(
+    container: AppContainer,
+    chat_session_id: str,
+    user_email: str | None,
+    user_text,
+    ai_text,
+):
+    user_text_saved = to_text(user_text)
+    ai_text_saved = to_text(ai_text)
 
-    try:
-        # Initialize base LLM
-        base_llm = GroundedChatGoogleGenerativeAI(
-            model=model_name,
-            temperature=0,
+    # Written behind the response by the container's queue; only a full queue writes inline.
+    writer = container.chat_writer
+    if not writer.enqueue_turn(chat_session_id, user_email, user_text_saved, ai_text_saved):
+        await container.run_blocking(writer.write_now, chat_session_id, user_email, user_text_saved, ai_text_saved)
+
+
+def _schedule_history_fold(container: AppContainer, turn: dict, ai_text):
+    """
+    Folds turns that slid out of the history window into the session summary.
+    Queued behind the turn's own writes, then run on the I/O pool, so the summary
+    count never gets ahead of what sqlite holds and no request waits on it.
+    """
+    if turn["unsummarized"] is None:
+        return
+    unsummarized = turn["unsummarized"] + turn_messages(to_text(turn["user_text"]), to_text(ai_text))
+    to_fold = pending_fold(unsummarized, turn["summary"])
+    if not to_fold:
+        return
+    container.chat_writer.enqueue_callback(
+        lambda: container.io_pool.submit(
+            fold_session_history,
+            container.session_manager,
+            container.summary_llm,
+            turn["chat_session_id"],
+            turn["summary"],
+            turn["summarized_count"],
+            to_fold,
         )
+    )
 
-        tools = [generate_course_prereqs_graph]
 
-        agent_executor = create_agent(base_llm, tools)
+def _cache_turn_response(container: AppContainer, turn: dict, model_name: str, final_message):
+    if turn["cache_vector"] is None or not final_message:
+        return
+    container.response_cache.store(
+        turn["cache_vector"], model_name, final_message, turn["namespaces"], turn["course_codes"]
+    )
+
 
-        vector_manager = VectorManager(PINECONE_API_KEY)
-        session_manager = SessionManager()
-        firebase_history = FirebaseChatHistoryManager()
+async def _run_blocking(container: AppContainer, timings: dict, name: str, fn, *args):
+    """Runs a blocking call on the container's I/O pool and records its latency (ms) under `name`."""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(container.io_pool, fn, *args)
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
 
-        user_text = request.message
-        user_email = get_user_email_from_request(http_request)
-        chat_session_id = str(request.chat_session_id)
 
-        transcript_data = session_manager.load_transcript(chat_session_id)
-        transcript_context = (
-            build_transcript_advising_context(transcript_data) if transcript_data else None
+async def _prepare_chat_turn(
+    request: ChatRequestDTO,
+    http_request: Request,
+    container: AppContainer,
+    model_name: str,
+) -> dict:
+    """
+    Runs everything that happens before generation: transcript lookup, retrieval
+    and prompt assembly. Independent branches run concurrently on the container's
+    I/O pool: transcript, history and the query embedding load together (the
+    deterministic transcript answer does not wait for the embedding), then
+    routing and every namespace search overlap inside routed_multi_search.
+    Per-branch latencies (ms) end up in turn["timings"].
+
+    Returns either a ready "deterministic_response" / "cached_response" or the
+    "messages" to hand to the agent, plus what is needed to persist the turn and
+    to populate the semantic response cache.
+    """
+    vector_manager = container.vector_manager
+    user_text = request.message
+    chat_session_id = str(request.chat_session_id)
+
+    turn = {
+        "user_text": user_text,
+        "user_email": None,
+        "chat_session_id": chat_session_id,
+        "deterministic_response": None,
+        "cached_response": None,
+        "messages": None,
+        # Set only for user-independent turns whose answer may be cached.
+        "cache_vector": None,
+        "namespaces": [],
+        "course_codes": [],
+        # Rolling-summary state, set once history is loaded; drives the post-turn fold.
+        "summary": None,
+        "summarized_count": 0,
+        "unsummarized": None,
+        "timings": {},
+    }
+    timings = turn["timings"]
+    started = time.perf_counter()
+
+    # One query embedding shared by the response cache, routing and every namespace search.
+    # It starts with the other loads but is only awaited once a deterministic answer is ruled out.
+    embedding = asyncio.ensure_future(
+        _run_blocking(container, timings, "embedding", vector_manager.embeddings.embed_query, user_text)
+    )
+    try:
+        user_email, (transcript_data, transcript_context), summarized_history = await asyncio.gather(
+            _run_blocking(container, timings, "auth", get_user_email_from_request, http_request),
+            _run_blocking(container, timings, "transcript", container.advising_contexts.load, chat_session_id),
+            _run_blocking(container, timings, "history", container.chat_writer.load_summarized_history, chat_session_id),
         )
+    except BaseException:
+        embedding.cancel()
+        raise
+    turn["user_email"] = user_email
+
+    if (
+        transcript_context
+        and TRANSCRIPT_DETERMINISTIC_ADVICE
+        and _is_transcript_planning_query(user_text)
+    ):
+        embedding.cancel()
+        turn["deterministic_response"] = _build_deterministic_transcript_advice(transcript_context)
+        return turn
 
-        if (
-            transcript_context
-            and TRANSCRIPT_DETERMINISTIC_ADVICE
-            and _is_transcript_planning_query(user_text)
-        ):
-            deterministic_response = _build_deterministic_transcript_advice(transcript_context)
-            user_text_saved = to_text(user_text)
-            ai_text_saved = to_text(deterministic_response)
+    try:
+        query_vector = await embedding
+    except Exception as e:
+        # Skip the response cache; routed_multi_search embeds the query text itself.
+        print(f"Query embedding failed, falling back to text search: {e}")
+        query_vector = None
+
+    # The rolling summary, any older messages it does not cover yet, then a token-budgeted window of recent turns.
+    summary, summarized_count, history_raw = summarized_history
+    unsummarized = history_to_messages(history_raw)
+    older, window = split_history(unsummarized, summary)
+    history_msgs = build_history_messages(summary, window, pending=older)
+    turn.update(summary=summary, summarized_count=summarized_count, unsummarized=unsummarized)
+
+    course_codes = extract_course_codes(user_text)
+    turn["course_codes"] = course_codes
+
+    if query_vector is not None and not transcript_data and not history_msgs:
+        turn["cache_vector"] = query_vector
+        cached_response = container.response_cache.lookup(query_vector, model_name, course_codes)
+        if cached_response is not None:
+            turn["cached_response"] = cached_response
+            return turn
+
+    inserted_docs = 0
+
+    extra_namespaces = {}
+    if course_codes:
+        extra_namespaces = {REDDIT_CLASS_NAMESPACE: 3, UCSB_CATALOG_NAMESPACE: 3}
+
+    search = functools.partial(
+        vector_manager.routed_multi_search,
+        user_text,
+        k=4,
+        extra_namespaces=extra_namespaces,
+        query_vector=query_vector,
+        timings=timings,
+    )
+    routed_namespace, search_results = await _run_blocking(container, timings, "retrieval", search)
+    timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+    container.record_turn_timings(timings)
+    turn["namespaces"] = list(search_results.keys())
+    docs = search_results.get(routed_namespace, [])[:4]
+    reddit_docs = search_results.get(REDDIT_CLASS_NAMESPACE, [])[:3] if course_codes else []
+    catalog_docs = search_results.get(UCSB_CATALOG_NAMESPACE, [])[:3] if course_codes else []
+
+    context_sections = []
+    if docs:
+        context_sections.append(
+            "PRIMARY RAG CONTEXT (RMP/UCSB DATA):\n" + "\n\n".join([d.page_content for d in docs]))
+    if reddit_docs:
+        context_sections.append("REDDIT CLASS CONTEXT:\n" + "\n\n".join([d.page_content for d in reddit_docs]))
+    if catalog_docs:
+        context_sections.append("UCSB CLASS ROSTER CONTEXT FOR CURRENT QUARTER: \n" + "\n\n".join(
+            [d.page_content for d in catalog_docs]))
+    context_text = "\n\n".join(context_sections)
+
+    transcript_section = ""
+    if transcript_data:
+        # Compact JSON: indentation alone roughly doubles the transcript's token count.
+        transcript_section = f"\nSTUDENT TRANSCRIPT:\n{json.dumps(transcript_data, separators=(',', ':'))}\n"
+        transcript_section += "\nTRANSCRIPT FACTS:\n" + _build_transcript_constraint_block(transcript_context) + "\n"
+
+    system_prompt = SystemMessage(content=f"""
+    You are GauchoGuider, an academic-focused UCSB advising assistant.
+
+    RULES:
+    1. Prioritize educational outcomes: course planning, prerequisites, degree progress, GPA strategy, study tactics, and graduation readiness.
+    2. Use the student transcript (if provided) to personalize advice.
+       - Never mark in-progress courses as completed.
+       - Never recommend completed or in-progress/planned courses as new next courses.
+       - For "what should I take next" questions, prioritize the deterministic eligible-next list.
+    3. Use the provided RAG context first. If Reddit class context is present, use it as supplemental student-sentiment evidence, not as official policy.
+    4. If details are missing or uncertain, use reverse search to verify facts.
+    5. Do NOT suggest hangout spots, nightlife, restaurants, or Santa Barbara activities unless the user explicitly asks for lifestyle recommendations.
+    6. Keep answers practical and specific:
+       - Recommend concrete next steps.
+       - Call out constraints (prereqs, workload, sequence risk).
+       - When useful, suggest checking official UCSB sources (department pages, catalog, GOLD) for final confirmation.
+    7. If the user asks about unrelated non-UCSB topics, briefly redirect back to UCSB academics.
+    8. Tone: concise, supportive, and direct. Avoid filler and slang unless the user asks for a casual style.{transcript_section}
+    9. COURSE GRAPHS: If the user asks for a visual diagram or graph of course prerequisites, check if their transcript is available (either provided below or in previous chat history). 
+       - IF YES: Call the generate_course_prereqs_graph tool and pass their completed courses into the tool so it removes them from the visual path.
+       - IF NO: Do not call the tool. Politely ask them to upload their transcript or list their completed courses first so you can generate an accurate map.
+    10. PREREQUISITE CHAINS: For "what does X unlock", "what do I need before X" or "how do I get to X" questions, call the lookup_course_prereq_chain tool and answer from its output instead of guessing.
+    11. SCHEDULE PLANNING: For "how many quarters until I finish X" or "plan my remaining quarters" questions, call the plan_course_schedule tool with the target courses and the student's completed and in-progress courses, then present its quarter-by-quarter plan and critical path.
+    """.strip())
+
+    rag_prompt = f"""
+    CONTEXT FROM RMP REVIEWS:
+    {context_text}
+
+    USER QUESTION:
+    {user_text}
+
+    REDDIT INGEST INFO:
+    - class_codes_detected: {course_codes}
+    - new_reddit_docs_inserted_this_request: {inserted_docs}
+    """.strip()
+
+    messages = [system_prompt] + history_msgs + [HumanMessage(content=rag_prompt)]
+    turn["messages"] = messages
+    return turn
+
+
+@router.post("/response", response_model=ChatResponseDTO)
+async def get_chat_response(
+    request: ChatRequestDTO,
+    http_request: Request,
+    container: AppContainer = Depends(get_container),
+):
+    model_name = request.model_name or DEFAULT_GEMINI_MODEL
 
-            session_manager.save_message(chat_session_id, "human", user_text_saved)
-            session_manager.save_message(chat_session_id, "ai", ai_text_saved)
+    try:
+        # Shared per worker; agents are cached per model_name.
+        agent_executor = container.get_agent(model_name, _build_agent, _build_base_llm)
 
-            if user_email:
-                firebase_history.save_message(user_email, chat_session_id, "human", user_text_saved)
-                firebase_history.save_message(user_email, chat_session_id, "ai", ai_text_saved)
+        turn = await _prepare_chat_turn(request, http_request, container, model_name)
+        chat_session_id = turn["chat_session_id"]
 
+        if turn["deterministic_response"] is not None:
+            deterministic_response = turn["deterministic_response"]
+            await _persist_turn(container, chat_session_id, turn["user_email"], turn["user_text"], deterministic_response)
             return ChatResponseDTO(
                 response=deterministic_response,
                 model_name="deterministic-transcript-advisor",
             )
 
-        course_codes = extract_course_codes(user_text)
-        inserted_docs = 0
-
-        docs = vector_manager.std_search(user_text, k=4)
-        reddit_docs = []
-        catalog_docs = []
-
-        if course_codes:
-            try:
-                loop = asyncio.get_event_loop()
-                reddit_docs, catalog_docs = await asyncio.gather(
-                    loop.run_in_executor(None, vector_manager.vector_store.similarity_search, user_text, 3, None,
-                                         REDDIT_CLASS_NAMESPACE),
-                    loop.run_in_executor(None, vector_manager.vector_store.similarity_search, user_text, 3, None,
-                                         UCSB_CATALOG_NAMESPACE),
-                )
-            except Exception:
-                reddit_docs = []
-                catalog_docs = []
-
-        context_sections = []
-        if docs:
-            context_sections.append(
-                "PRIMARY RAG CONTEXT (RMP/UCSB DATA):\n" + "\n\n".join([d.page_content for d in docs]))
-        if reddit_docs:
-            context_sections.append("REDDIT CLASS CONTEXT:\n" + "\n\n".join([d.page_content for d in reddit_docs]))
-        if catalog_docs:
-            context_sections.append("UCSB CLASS ROSTER CONTEXT FOR CURRENT QUARTER: \n" + "\n\n".join(
-                [d.page_content for d in catalog_docs]))
-        context_text = "\n\n".join(context_sections)
-
-        transcript_section = ""
-        if transcript_data:
-            transcript_section = f"\nSTUDENT TRANSCRIPT:\n{json.dumps(transcript_data, indent=2)}\n"
-            transcript_section += "\nTRANSCRIPT FACTS:\n" + _build_transcript_constraint_block(transcript_context) + "\n"
-
-        system_prompt = SystemMessage(content=f"""
-        You are GauchoGuider, an academic-focused UCSB advising assistant.
-
-        RULES:
-        1. Prioritize educational outcomes: course planning, prerequisites, degree progress, GPA strategy, study tactics, and graduation readiness.
-        2. Use the student transcript (if provided) to personalize advice.
-           - Never mark in-progress courses as completed.
-           - Never recommend completed or in-progress/planned courses as new next courses.
-           - For "what should I take next" questions, prioritize the deterministic eligible-next list.
-        3. Use the provided RAG context first. If Reddit class context is present, use it as supplemental student-sentiment evidence, not as official policy.
-        4. If details are missing or uncertain, use reverse search to verify facts.
-        5. Do NOT suggest hangout spots, nightlife, restaurants, or Santa Barbara activities unless the user explicitly asks for lifestyle recommendations.
-        6. Keep answers practical and specific:
-           - Recommend concrete next steps.
-           - Call out constraints (prereqs, workload, sequence risk).
-           - When useful, suggest checking official UCSB sources (department pages, catalog, GOLD) for final confirmation.
-        7. If the user asks about unrelated non-UCSB topics, briefly redirect back to UCSB academics.
-        8. Tone: concise, supportive, and direct. Avoid filler and slang unless the user asks for a casual style.{transcript_section}
-        9. COURSE GRAPHS: If the user asks for a visual diagram or graph of course prerequisites, check if their transcript is available (either provided below or in previous chat history). 
-           - IF YES: Call the generate_course_prereqs_graph tool and pass their completed courses into the tool so it removes them from the visual path.
-           - IF NO: Do not call the tool. Politely ask them to upload their transcript or list their completed courses first so you can generate an accurate map.
-        """.strip())
-
-        rag_prompt = f"""
-        CONTEXT FROM RMP REVIEWS:
-        {context_text}
-
-        USER QUESTION:
-        {user_text}
-
-        REDDIT INGEST INFO:
-        - class_codes_detected: {course_codes}
-        - new_reddit_docs_inserted_this_request: {inserted_docs}
-        """.strip()
-
-        history_raw = session_manager.load_history(str(request.chat_session_id))
-        history_msgs = history_to_messages(history_raw)
-
-        messages = [system_prompt] + history_msgs + [HumanMessage(content=rag_prompt)]
-
-        response_state = await agent_executor.ainvoke({"messages": messages})
-
-        final_message = response_state["messages"][-1].content
+        if turn["cached_response"] is not None:
+            cached_response = turn["cached_response"]
+            await _persist_turn(container, chat_session_id, turn["user_email"], turn["user_text"], cached_response)
+            _schedule_history_fold(container, turn, cached_response)
+            return ChatResponseDTO(
+                response=cached_response,
+                model_name=model_name,
+            )
 
-        user_text_saved = to_text(user_text)
-        ai_text_saved = to_text(final_message)
+        response_state = await agent_executor.ainvoke({"messages": turn["messages"]})
 
-        session_manager.save_message(chat_session_id, "human", user_text_saved)
-        session_manager.save_message(chat_session_id, "ai", ai_text_saved)
+        final_message = response_state["messages"][-1].content
 
-        if user_email:
-            firebase_history.save_message(user_email, chat_session_id, "human", user_text_saved)
-            firebase_history.save_message(user_email, chat_session_id, "ai", ai_text_saved)
+        await _persist_turn(container, chat_session_id, turn["user_email"], turn["user_text"], final_message)
+        _schedule_history_fold(container, turn, final_message)
+        _cache_turn_response(container, turn, model_name, final_message)
 
         return ChatResponseDTO(
             response=final_message,
@@ -368,33 +596,143 @@ async def get_chat_response(request: ChatRequestDTO, http_request: Request):
         )
 
 
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _chunk_text(content) -> str:
+    """Text carried by a streamed message chunk; empty for non-text parts."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for item in content:
+            if isinstance(item, dict) and item.get("type", "text") == "text":
+                text = item.get("text")
+                if isinstance(text, str):
+                    parts.append(text)
+            elif isinstance(item, str):
+                parts.append(item)
+        return "".join(parts)
+    return ""
+
+
+async def _stream_chat_events(
+    request: ChatRequestDTO,
+    http_request: Request,
+    container: AppContainer,
+):
+    """
+    Yields SSE frames for one chat turn:
+      token      - {"text"} incremental answer text
+      tool_start - {"name", "args"} the agent decided to call a tool
+      tool_end   - {"name"} the tool returned
+      done       - {"response", "model_name"} final answer (already persisted)
+      error      - {"message"}
+    """
+    model_name = request.model_name or DEFAULT_GEMINI_MODEL
+
+    try:
+        agent_executor = container.get_agent(model_name, _build_agent, _build_base_llm)
+        turn = await _prepare_chat_turn(request, http_request, container, model_name)
+        chat_session_id = turn["chat_session_id"]
+
+        ready_response = turn["deterministic_response"] or turn["cached_response"]
+        if ready_response is not None:
+            ready_model_name = (
+                "deterministic-transcript-advisor" if turn["deterministic_response"] is not None else model_name
+            )
+            yield _sse_event("token", {"text": to_text(ready_response)})
+            await _persist_turn(container, chat_session_id, turn["user_email"], turn["user_text"], ready_response)
+            _schedule_history_fold(container, turn, ready_response)
+            yield _sse_event("done", {"response": to_text(ready_response), "model_name": ready_model_name})
+            return
+
+        final_message = None
+        streamed_parts: list[str] = []
+
+        async for mode, chunk in agent_executor.astream(
+            {"messages": turn["messages"]},
+            stream_mode=["messages", "updates"],
+        ):
+            if mode == "messages":
+                message_chunk, metadata = chunk
+                if not isinstance(message_chunk, AIMessageChunk) or metadata.get("langgraph_node") != "model":
+                    continue
+                text = _chunk_text(message_chunk.content)
+                if text:
+                    streamed_parts.append(text)
+                    yield _sse_event("token", {"text": text})
+                continue
+
+            for node, update in (chunk or {}).items():
+                for message in (update or {}).get("messages", []):
+                    if node == "tools" and isinstance(message, ToolMessage):
+                        yield _sse_event("tool_end", {"name": message.name})
+                    elif isinstance(message, AIMessage):
+                        if message.tool_calls:
+                            for call in message.tool_calls:
+                                yield _sse_event("tool_start", {"name": call.get("name"), "args": call.get("args")})
+                            # Text emitted before a tool call is not part of the final answer.
+                            streamed_parts = []
+                        else:
+                            final_message = message.content
+
+        if final_message is None:
+            final_message = "".join(streamed_parts)
+
+        await _persist_turn(container, chat_session_id, turn["user_email"], turn["user_text"], final_message)
+        _schedule_history_fold(container, turn, final_message)
+        _cache_turn_response(container, turn, model_name, final_message)
+        yield _sse_event("done", {"response": to_text(final_message), "model_name": model_name})
+
+    except Exception as e:
+        print(f"Error streaming chat request: {e}")
+        yield _sse_event("error", {"message": "Sorry, I'm having trouble accessing my database right now."})
+
+
+@router.post("/stream")
+async def stream_chat_response(
+    request: ChatRequestDTO,
+    http_request: Request,
+    container: AppContainer = Depends(get_container),
+):
+    return StreamingResponse(
+        _stream_chat_events(request, http_request, container),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/sessions")
-async def list_chat_sessions(http_request: Request):
+async def list_chat_sessions(http_request: Request, container: AppContainer = Depends(get_container)):
     if not firebase_admin_ready():
         raise HTTPException(
             status_code=503,
             detail="Backend Firebase Admin is not configured. Set FIREBASE_SERVICE_ACCOUNT_JSON or FIREBASE_SERVICE_ACCOUNT_PATH.",
         )
-    user_email = get_user_email_from_request(http_request)
+    user_email = await container.run_blocking(get_user_email_from_request, http_request)
     if not user_email:
         raise HTTPException(status_code=401, detail="Invalid or expired session")
 
-    firebase_history = FirebaseChatHistoryManager()
-    sessions = firebase_history.list_sessions(user_email)
+    sessions = await container.async_firebase_history.list_sessions(user_email)
     return {"sessions": sessions}
 
 
 @router.get("/sessions/{chat_session_id}")
-async def get_chat_session_messages(chat_session_id: str, http_request: Request):
+async def get_chat_session_messages(
+    chat_session_id: str,
+    http_request: Request,
+    container: AppContainer = Depends(get_container),
+):
     if not firebase_admin_ready():
         raise HTTPException(
             status_code=503,
             detail="Backend Firebase Admin is not configured. Set FIREBASE_SERVICE_ACCOUNT_JSON or FIREBASE_SERVICE_ACCOUNT_PATH.",
         )
-    user_email = get_user_email_from_request(http_request)
+    user_email = await container.run_blocking(get_user_email_from_request, http_request)
     if not user_email:
         raise HTTPException(status_code=401, detail="Invalid or expired session")
 
-    firebase_history = FirebaseChatHistoryManager()
-    messages = firebase_history.get_messages(user_email, chat_session_id)
+    messages = await container.async_firebase_history.get_messages(user_email, chat_session_id)
     return {"chat_session_id": chat_session_id, "messages": messages}
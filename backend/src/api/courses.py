@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from src.services.prereq_reachability import get_reachability_index
+
+router = APIRouter(prefix="/courses", tags=["courses"])
+
+
+class CourseReachabilityResponse(BaseModel):
+    course: str
+    in_catalog: bool
+    prerequisite_groups: list[list[str]] = Field(default_factory=list)
+    all_prerequisites: list[str] = Field(default_factory=list)
+    directly_unlocks: list[str] = Field(default_factory=list)
+    unlocks: list[str] = Field(default_factory=list)
+    shortest_chain: list[str] = Field(default_factory=list)
+
+
+@router.get("/{course_code}/reachability", response_model=CourseReachabilityResponse)
+async def get_course_reachability(course_code: str, start: str | None = Query(None)):
+    """What a course requires and unlocks, plus the shortest prerequisite chain to it (from `start` if given)."""
+    try:
+        return CourseReachabilityResponse(**get_reachability_index().describe(course_code, start))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown course: {e.args[0]}")
@@ -2,9 +2,10 @@ import asyncio
 import os
 
 from dotenv import load_dotenv
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-from src.managers.vector_manager import VectorManager
+from src.container import AppContainer, get_container
+from src.managers.catalog_availability import CATALOG_AVAILABILITY_REFRESH_SECONDS
 from src.scrapers.rmp_scraper import get_school_reviews, get_school_professors
 from src.scrapers.reddit_scraper import fetch_reddit_docs_for_cmpsc_catalog
 from src.scrapers.ucsbcatalog_scraper import UCSBCatalogClient
@@ -15,16 +16,51 @@ router = APIRouter(prefix="/rag", tags=["rag", "Internal"])
 
 load_dotenv()
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 MODEL_NAME = os.getenv("MODEL_NAME")
 UCSB_SCHOOL_ID = os.getenv("UCSB_SCHOOL_ID")
 REDDIT_CLASS_NAMESPACE = os.getenv("REDDIT_CLASS_NAMESPACE", "reddit_class_data")
 UCSB_CATALOG_NAMESPACE = os.getenv("UCSB_CATALOG_NAMESPACE", "catalog_class_data")
 
 
+def _ingest_namespace(container: AppContainer, documents, namespace: str):
+    container.vector_manager.ingest_data(documents, namespace)
+    # Cached answers grounded in this namespace may now be stale.
+    container.response_cache.invalidate_namespace(namespace)
+
+
+def _refresh_catalog_availability(container: AppContainer, ucsb_client: UCSBCatalogClient | None = None) -> int:
+    """
+    Pulls current seat counts into the side table; the embedded catalog text is
+    untouched. Courses that filled up or opened get their seats_available flag
+    updated in Pinecone metadata so self-query filters see it.
+    """
+    rows = (ucsb_client or UCSBCatalogClient()).get_enrollment_snapshot()
+    written = container.catalog_availability.update(rows)
+    if written:
+        try:
+            container.vector_manager.sync_availability_flags(UCSB_CATALOG_NAMESPACE)
+        except Exception as e:
+            print(f"Seats-available flag sync failed: {e}")
+        container.response_cache.invalidate_namespace(UCSB_CATALOG_NAMESPACE)
+    return written
+
+
+async def refresh_catalog_availability_periodically(
+    container: AppContainer,
+    interval_seconds: int = CATALOG_AVAILABILITY_REFRESH_SECONDS,
+):
+    """Background loop started by the app lifespan when CATALOG_AVAILABILITY_REFRESH_SECONDS > 0."""
+    while True:
+        try:
+            written = await container.run_blocking(_refresh_catalog_availability, container)
+            print(f"[catalog availability]: refreshed {written} courses")
+        except Exception as e:
+            print(f"Catalog availability refresh failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
 @router.post("/update", response_model=RagResponseDTO)
-async def update_llm_knowledge():
-    vector_manager = VectorManager(PINECONE_API_KEY)
+async def update_llm_knowledge(container: AppContainer = Depends(get_container)):
     ucsb_client = UCSBCatalogClient()
 
     try:
@@ -39,14 +75,18 @@ async def update_llm_knowledge():
         return {"message": f"Scraping failed: {str(e)}", "model_name": MODEL_NAME}
 
     if school_reviews:
-        vector_manager.ingest_data(school_reviews, "school_reviews")
+        _ingest_namespace(container, school_reviews, "school_reviews")
     if professors:
-        vector_manager.ingest_data(professors, "professor_data")
+        _ingest_namespace(container, professors, "professor_data")
     reddit_docs, discovered_codes = reddit_result
     if reddit_docs:
-        vector_manager.ingest_data(reddit_docs, REDDIT_CLASS_NAMESPACE)
+        _ingest_namespace(container, reddit_docs, REDDIT_CLASS_NAMESPACE)
     if catalog_results:
-        vector_manager.ingest_data(catalog_results, UCSB_CATALOG_NAMESPACE)
+        _ingest_namespace(container, catalog_results, UCSB_CATALOG_NAMESPACE)
+        try:
+            await container.run_blocking(_refresh_catalog_availability, container, ucsb_client)
+        except Exception as e:
+            print(f"Catalog availability refresh failed: {e}")
 
     return {
         "message": (
@@ -55,3 +95,19 @@ async def update_llm_knowledge():
         ),
         "model_name": MODEL_NAME
     }
+
+
+@router.post("/availability", response_model=RagResponseDTO)
+async def refresh_catalog_availability(container: AppContainer = Depends(get_container)):
+    """Refreshes catalog enrollment only; cheap enough to call every few minutes during pass times."""
+    try:
+        written = await container.run_blocking(_refresh_catalog_availability, container)
+    except Exception as e:
+        return {"message": f"Availability refresh failed: {str(e)}", "model_name": MODEL_NAME}
+
+    return {"message": f"Refreshed enrollment for {written} catalog courses.", "model_name": MODEL_NAME}
+
+
+@router.get("/metrics")
+async def get_runtime_metrics(container: AppContainer = Depends(get_container)):
+    return container.metrics()
@@ -1,14 +1,17 @@
 from dotenv import load_dotenv
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field
 
-from src.managers.session_manager import SessionManager
+from src.container import AppContainer, get_container
 from src.scrapers.transcript_scraper import parse_transcript
+from src.services.flowchart_svg import flowchart_svg_url, svg_path
 from src.services.prereq_graph import (
-    build_upper_division_flowchart_data,
+    LAYERING_MODES,
     extract_completed_courses_from_transcript,
     extract_taken_or_in_progress_courses_from_transcript,
 )
+from src.services.prereq_planner import DegreePlanner
 
 router = APIRouter(prefix="/transcript", tags=["transcript"])
 
@@ -24,6 +27,61 @@ class ClearTranscriptResponse(BaseModel):
     message: str
 
 
+class WhatIfRequest(BaseModel):
+    session_id: str
+    add: list[str] = Field(default_factory=list)
+    remove: list[str] = Field(default_factory=list)
+
+
+class TierChange(BaseModel):
+    course: str
+    # None means the course is taken (off the remaining chart).
+    from_tier: int | None = Field(None, alias="from")
+    to_tier: int | None = Field(None, alias="to")
+
+
+class WhatIfResponse(BaseModel):
+    added: list[str] = Field(default_factory=list)
+    removed: list[str] = Field(default_factory=list)
+    ignored_courses: list[str] = Field(default_factory=list)
+    newly_eligible: list[str] = Field(default_factory=list)
+    newly_blocked: list[str] = Field(default_factory=list)
+    tier_changes: list[TierChange] = Field(default_factory=list)
+    eligible_now: int = 0
+    remaining_courses: int = 0
+
+
+class PlanRequest(BaseModel):
+    session_id: str
+    # Empty means every remaining CMPSC 0-199 course on the flowchart.
+    courses: list[str] = Field(default_factory=list)
+    max_units: int = Field(16, gt=0)
+    # Course code -> quarters it is offered ("Fall", "Winter", "Spring"); unlisted courses run every quarter.
+    offerings: dict[str, list[str]] = Field(default_factory=dict)
+    units: dict[str, int] = Field(default_factory=dict)
+    start_quarter: str = "Fall"
+
+
+class PlannedQuarter(BaseModel):
+    quarter: int
+    season: str
+    courses: list[str] = Field(default_factory=list)
+    units: int = 0
+
+
+class PlanResponse(BaseModel):
+    quarters: list[PlannedQuarter] = Field(default_factory=list)
+    quarter_count: int = 0
+    lower_bound: int = 0
+    optimal: bool = True
+    critical_path: list[str] = Field(default_factory=list)
+    added_prerequisites: list[str] = Field(default_factory=list)
+    already_completed: list[str] = Field(default_factory=list)
+    unknown_courses: list[str] = Field(default_factory=list)
+    unschedulable: list[str] = Field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+
 class FlowchartResponse(BaseModel):
     message: str
     image_url: str | None = None
@@ -35,6 +93,7 @@ class FlowchartResponse(BaseModel):
 async def upload_and_parse_transcript(
     session_id: str = Form(...),
     file: UploadFile = File(...),
+    container: AppContainer = Depends(get_container),
 ):
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are accepted.")
@@ -44,12 +103,13 @@ async def upload_and_parse_transcript(
         raise HTTPException(status_code=400, detail="Uploaded file is empty.")
 
     try:
-        parsed = parse_transcript(pdf_bytes)
+        # PDF parsing (and its Gemini fallback) is blocking; keep it off the event loop.
+        parsed = await container.run_blocking(parse_transcript, pdf_bytes)
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Failed to parse transcript: {str(e)}")
 
-    session_manager = SessionManager()
-    session_manager.save_transcript(session_id, parsed)
+    # Advising context is computed once here and reused by every later chat turn.
+    await container.run_blocking(container.advising_contexts.store, session_id, parsed)
 
     return TranscriptResponse(
         message="Transcript parsed and stored for this session.",
@@ -58,29 +118,90 @@ async def upload_and_parse_transcript(
 
 
 @router.delete("/clear", response_model=ClearTranscriptResponse)
-async def clear_transcript(session_id: str):
-    session_manager = SessionManager()
-    session_manager.clear_transcript(session_id)
+async def clear_transcript(session_id: str, container: AppContainer = Depends(get_container)):
+    await container.async_session_manager.clear_transcript(session_id)
+    container.advising_contexts.invalidate(session_id)
+    container.what_if_bases.invalidate(session_id)
     return ClearTranscriptResponse(message="Transcript cleared for this session.")
 
 
+@router.post("/what-if", response_model=WhatIfResponse)
+async def what_if_eligibility(request: WhatIfRequest, container: AppContainer = Depends(get_container)):
+    """
+    Delta in eligibility and tiers if the session's student also finished `add`
+    and had not taken `remove`, computed against a cached base flowchart state.
+    """
+    transcript, _ = await container.run_blocking(container.advising_contexts.load, request.session_id)
+    if transcript is None:
+        raise HTTPException(status_code=404, detail="No transcript stored for this session.")
+
+    base = container.what_if_bases.get(request.session_id, transcript)
+    return WhatIfResponse(**base.what_if(request.add, request.remove))
+
+
+def _plan_for_transcript(container: AppContainer, transcript: dict, request: PlanRequest) -> dict:
+    completed = extract_completed_courses_from_transcript(transcript)
+    accounted = extract_taken_or_in_progress_courses_from_transcript(transcript)
+    targets = request.courses
+    if not targets:
+        flow = container.flowcharts.flowchart_data(completed, accounted)
+        targets = [node["id"] for node in flow["nodes"] if not node["taken"]]
+    planner = DegreePlanner(
+        set(completed) | set(accounted),
+        targets,
+        max_units=request.max_units,
+        offerings=request.offerings,
+        units=request.units,
+        start_season=request.start_quarter,
+    )
+    return planner.plan()
+
+
+@router.post("/plan", response_model=PlanResponse)
+async def plan_remaining_quarters(request: PlanRequest, container: AppContainer = Depends(get_container)):
+    """
+    Fewest-quarters schedule for the session's remaining courses (or `courses`),
+    treating completed and in-progress courses as done.
+    """
+    transcript, _ = await container.run_blocking(container.advising_contexts.load, request.session_id)
+    if transcript is None:
+        raise HTTPException(status_code=404, detail="No transcript stored for this session.")
+
+    try:
+        plan = await container.run_blocking(_plan_for_transcript, container, transcript, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return PlanResponse(**plan)
+
+
 @router.post("/flowchart", response_model=FlowchartResponse)
-async def generate_flowchart_from_transcript(file: UploadFile = File(...)):
+async def generate_flowchart_from_transcript(
+    file: UploadFile = File(...),
+    layering: str = Query("longest_path"),
+    container: AppContainer = Depends(get_container),
+):
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are accepted.")
+    if layering not in LAYERING_MODES:
+        raise HTTPException(status_code=400, detail=f"layering must be one of: {', '.join(LAYERING_MODES)}")
 
     pdf_bytes = await file.read()
     if not pdf_bytes:
         raise HTTPException(status_code=400, detail="Uploaded file is empty.")
 
     try:
-        parsed = parse_transcript(pdf_bytes)
+        parsed = await container.run_blocking(parse_transcript, pdf_bytes)
         completed_courses = extract_completed_courses_from_transcript(parsed)
         accounted_courses = extract_taken_or_in_progress_courses_from_transcript(parsed)
-        upper_division_plan = build_upper_division_flowchart_data(
-            completed_courses=completed_courses,
-            accounted_courses=accounted_courses,
+        # A cache miss lays out the graph and writes (and evicts) SVG files: keep it off the event loop.
+        upper_division_plan = await container.run_blocking(
+            container.flowcharts.flowchart_data, completed_courses, accounted_courses, layering
         )
+        image_url = None
+        if upper_division_plan["tiers"]:
+            image_url = flowchart_svg_url(await container.run_blocking(
+                container.flowcharts.flowchart_svg, completed_courses, accounted_courses, layering
+            ))
         summary = upper_division_plan.get("summary", {})
         remaining_upper = summary.get("remaining_cmpsc_0_199_courses")
         if remaining_upper is None:
@@ -97,7 +218,35 @@ async def generate_flowchart_from_transcript(file: UploadFile = File(...)):
 
     return FlowchartResponse(
         message=message,
-        image_url=None,
+        image_url=image_url,
         completed_courses=completed_courses,
         upper_division_plan=upper_division_plan,
     )
+
+
+@router.get("/flowchart.svg")
+async def flowchart_svg(
+    graph: str | None = Query(None),
+    completed: list[str] = Query(default_factory=list),
+    container: AppContainer = Depends(get_container),
+):
+    """
+    Locally rendered prerequisite graph. `graph` is a hash from an image_url;
+    without it the remaining-path graph for `completed` is rendered (and cached).
+    """
+    if graph is None:
+        graph = await container.run_blocking(container.flowcharts.remaining_path_svg, completed)
+        if graph is None:
+            raise HTTPException(status_code=404, detail="No remaining courses to draw.")
+
+    path = svg_path(graph)
+    if path is None:
+        raise HTTPException(status_code=400, detail="graph must be a flowchart hash.")
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Flowchart not found.")
+    # Content-addressed: a hash always names the same drawing.
+    return FileResponse(
+        path,
+        media_type="image/svg+xml",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
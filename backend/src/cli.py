@@ -71,6 +71,20 @@ def select_session(session_manager: SessionManager):
         return session_manager.create_session()
 
 
+def refresh_catalog_availability(vector_manager: VectorManager):
+    """Seat counts only: written to the local side table, nothing is re-embedded."""
+    try:
+        rows = UCSBCatalogClient().get_enrollment_snapshot()
+        written = vector_manager.catalog_availability.update(rows)
+        flipped = vector_manager.sync_availability_flags(UCSB_CATALOG_NAMESPACE)
+        click.secho(
+            f"Enrollment refreshed for {written} catalog courses ({flipped} seats-available flags updated).",
+            fg="green",
+        )
+    except Exception as e:
+        click.secho(f"Error refreshing catalog availability: {e}", fg="red")
+
+
 def print_logo():
     logo = r"""
       _____              __        _____     _    __       
@@ -135,7 +149,8 @@ def start():
     """)
 
     click.secho(
-        "\n[GauchoGuider]: Type '/scrape' (RMP), '/reddit' (Reddit corpus), or '/catalog' (UCSB catalog) to update knowledge, or just ask a question!",
+        "\n[GauchoGuider]: Type '/scrape' (RMP), '/reddit' (Reddit corpus), or '/catalog' (UCSB catalog) to update knowledge, "
+        "'/availability' to refresh seat counts, '/gc' to remove orphaned vectors, or just ask a question!",
         fg="cyan")
 
     while True:
@@ -204,10 +219,24 @@ def start():
                         f"Catalog ingest complete: {len(catalog_docs)} docs into '{UCSB_CATALOG_NAMESPACE}'.",
                         fg="green",
                     )
+                    refresh_catalog_availability(vector_manager)
                 else:
                     click.secho("No catalog docs found for current settings.", fg="yellow")
                 continue
 
+            if user_input.lower() == '/availability':
+                refresh_catalog_availability(vector_manager)
+                continue
+
+            if user_input.lower() == '/gc':
+                click.secho("Sweeping vectors the ingest ledger does not know about...", fg="yellow")
+                for namespace in ["school_reviews", "professor_data", REDDIT_CLASS_NAMESPACE, UCSB_CATALOG_NAMESPACE]:
+                    try:
+                        vector_manager.sweep_orphans(namespace)
+                    except Exception as e:
+                        click.secho(f"Orphan sweep of '{namespace}' failed: {e}", fg="red")
+                continue
+
             # --- RAG Logic ---
             click.secho("(Thinking...)", fg="black", bold=True)  # visual feedback
             docs = vector_manager.search(user_input, k=4)
@@ -0,0 +1,198 @@
+import asyncio
+import math
+import os
+import statistics
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from dotenv import load_dotenv
+from fastapi import Request
+
+from src.llm.llmswap import getLLM
+from src.managers.advising_context_cache import AdvisingContextCache
+from src.managers.async_manager import AsyncManager
+from src.managers.catalog_availability import CatalogAvailabilityStore, get_catalog_availability_store
+from src.managers.chat_write_behind import ChatWriteBehindQueue
+from src.managers.firebase_chat_history_manager import FirebaseChatHistoryManager
+from src.managers.flowchart_cache import get_flowchart_cache
+from src.managers.response_cache import SemanticResponseCache
+from src.managers.session_manager import SessionManager
+from src.managers.vector_manager import VectorManager
+from src.services.prereq_whatif import WhatIfBaseCache
+
+load_dotenv()
+PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+SUMMARY_MODEL_NAME = os.getenv("SUMMARY_MODEL_NAME", os.getenv("GEMINI_MODEL_NAME", "gemini-3-flash-preview"))
+CHAT_IO_WORKERS = int(os.getenv("CHAT_IO_WORKERS", "16"))
+# Recent chat turns whose per-stage latencies are summarised in metrics().
+CHAT_TIMINGS_WINDOW = int(os.getenv("CHAT_TIMINGS_WINDOW", "200"))
+
+
+class AppContainer:
+    """Process-wide holder for the expensive clients used by the API routes.
+
+    One container is created per worker in the FastAPI lifespan hook. Each
+    dependency is built lazily on first use and then reused by every request,
+    so Pinecone index checks, sqlite setup and Firestore init happen once per
+    process instead of once per request. LLM/agent instances are keyed by
+    model_name because the frontend can switch models per request.
+    """
+
+    def __init__(self, pinecone_api_key: str | None = None):
+        self._pinecone_api_key = pinecone_api_key or PINECONE_API_KEY
+        self._lock = threading.RLock()
+        self._vector_manager: VectorManager | None = None
+        self._session_manager: SessionManager | None = None
+        self._firebase_history: FirebaseChatHistoryManager | None = None
+        self._summary_llm: Any = None
+        self._llms: dict[str, Any] = {}
+        self._agents: dict[str, Any] = {}
+        self.response_cache = SemanticResponseCache()
+        # Bounded pool for the blocking clients (sqlite, Firestore, Gemini embeddings,
+        # Pinecone) that async routes must not call on the event loop.
+        self.io_pool = ThreadPoolExecutor(max_workers=CHAT_IO_WORKERS, thread_name_prefix="chat-io")
+        # Chat messages are persisted behind the response; see ChatWriteBehindQueue.
+        self.chat_writer = ChatWriteBehindQueue(lambda: self.session_manager, lambda: self.firebase_history)
+        self.advising_contexts = AdvisingContextCache(lambda: self.session_manager)
+        self.what_if_bases = WhatIfBaseCache()
+        # Shared with the chat graph tool, which has no container access.
+        self.flowcharts = get_flowchart_cache()
+        self._turn_timings: deque = deque(maxlen=CHAT_TIMINGS_WINDOW)
+
+    @property
+    def vector_manager(self) -> VectorManager:
+        # Not cached on failure, so a missing Pinecone config surfaces on every request.
+        if self._vector_manager is None:
+            with self._lock:
+                if self._vector_manager is None:
+                    self._vector_manager = VectorManager(self._pinecone_api_key)
+        return self._vector_manager
+
+    @property
+    def catalog_availability(self) -> CatalogAvailabilityStore:
+        """Live catalog seat counts; the same store VectorManager joins into catalog results."""
+        return get_catalog_availability_store()
+
+    @property
+    def session_manager(self) -> SessionManager:
+        if self._session_manager is None:
+            with self._lock:
+                if self._session_manager is None:
+                    self._session_manager = SessionManager()
+        return self._session_manager
+
+    @property
+    def firebase_history(self) -> FirebaseChatHistoryManager:
+        if self._firebase_history is None:
+            with self._lock:
+                if self._firebase_history is None:
+                    self._firebase_history = FirebaseChatHistoryManager()
+        return self._firebase_history
+
+    @property
+    def summary_llm(self) -> Any:
+        """Plain (tool-less) LLM used to fold old chat turns into the rolling session summary."""
+        if self._summary_llm is None:
+            with self._lock:
+                if self._summary_llm is None:
+                    self._summary_llm = getLLM(provider="gemini", model_name=SUMMARY_MODEL_NAME, temperature=0)
+        return self._summary_llm
+
+    @property
+    def async_session_manager(self) -> AsyncManager:
+        """session_manager with awaitable methods that run on io_pool."""
+        return AsyncManager(self.session_manager, self.io_pool)
+
+    @property
+    def async_firebase_history(self) -> AsyncManager:
+        """firebase_history with awaitable methods that run on io_pool."""
+        return AsyncManager(self.firebase_history, self.io_pool)
+
+    async def run_blocking(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Runs a blocking call (PDF parsing, HTTP client, ...) on io_pool."""
+        return await asyncio.get_running_loop().run_in_executor(self.io_pool, fn, *args)
+
+    def get_llm(self, model_name: str, factory: Callable[[str], Any]) -> Any:
+        """Returns the cached LLM for model_name, building it with factory(model_name) once."""
+        llm = self._llms.get(model_name)
+        if llm is None:
+            with self._lock:
+                llm = self._llms.get(model_name)
+                if llm is None:
+                    llm = factory(model_name)
+                    self._llms[model_name] = llm
+        return llm
+
+    def get_agent(self, model_name: str, factory: Callable[[Any], Any], llm_factory: Callable[[str], Any]) -> Any:
+        """Returns the cached agent graph for model_name, built on top of get_llm()."""
+        agent = self._agents.get(model_name)
+        if agent is None:
+            with self._lock:
+                agent = self._agents.get(model_name)
+                if agent is None:
+                    agent = factory(self.get_llm(model_name, llm_factory))
+                    self._agents[model_name] = agent
+        return agent
+
+    def record_turn_timings(self, timings: dict):
+        """Keeps one chat turn's per-stage latencies (ms) for the metrics summary."""
+        self._turn_timings.append(dict(timings))
+
+    def _turn_timing_summary(self) -> dict:
+        samples: dict[str, list[float]] = {}
+        for timings in list(self._turn_timings):
+            for stage, ms in timings.items():
+                samples.setdefault(stage, []).append(ms)
+        return {
+            stage: {
+                "p50": round(statistics.median(values), 1),
+                "p95": round(sorted(values)[math.ceil(0.95 * len(values)) - 1], 1),
+                "samples": len(values),
+            }
+            for stage, values in samples.items()
+        }
+
+    def metrics(self) -> dict:
+        """Runtime counters from the components that have already been built."""
+        out: dict[str, Any] = {
+            "response_cache": self.response_cache.stats(),
+            "write_behind": self.chat_writer.stats(),
+            "advising_context": self.advising_contexts.stats(),
+            "what_if": self.what_if_bases.stats(),
+            "flowchart_cache": self.flowcharts.stats(),
+            "turn_timings_ms": self._turn_timing_summary(),
+        }
+        if self._vector_manager is not None:
+            out["router"] = self._vector_manager.router.stats_snapshot()
+            out["embedding_cache"] = self._vector_manager.embeddings.stats()
+            out["self_query_retrievers"] = dict(self._vector_manager.retriever_counters)
+        return out
+
+    def close(self):
+        # Flush queued chat writes while the sqlite connection is still open.
+        self.chat_writer.close()
+        with self._lock:
+            if self._session_manager is not None:
+                self._session_manager.conn.close()
+                self._session_manager = None
+            self._vector_manager = None
+            self._firebase_history = None
+            self._summary_llm = None
+            self._llms.clear()
+            self._agents.clear()
+        self.io_pool.shutdown(wait=False)
+
+
+def get_container(request: Request) -> AppContainer:
+    """FastAPI dependency returning the app-scoped container.
+
+    Falls back to creating one when the lifespan hook has not run
+    (e.g. a TestClient used without a `with` block).
+    """
+    container = getattr(request.app.state, "container", None)
+    if container is None:
+        container = AppContainer()
+        request.app.state.container = container
+    return container
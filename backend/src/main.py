@@ -1,10 +1,30 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
-from src.api import chat, rag, transcript, auth
+from src.api import chat, rag, transcript, auth, courses
+from src.container import AppContainer
+from src.managers.catalog_availability import CATALOG_AVAILABILITY_REFRESH_SECONDS
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One container per worker; routers pull shared clients from app.state.
+    app.state.container = AppContainer()
+    availability_refresh = None
+    if CATALOG_AVAILABILITY_REFRESH_SECONDS > 0:
+        availability_refresh = asyncio.create_task(rag.refresh_catalog_availability_periodically(app.state.container))
+    try:
+        yield
+    finally:
+        if availability_refresh is not None:
+            availability_refresh.cancel()
+        app.state.container.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -39,3 +59,4 @@ app.include_router(chat.router)
 app.include_router(rag.router)
 app.include_router(transcript.router)
 app.include_router(auth.router)
+app.include_router(courses.router)
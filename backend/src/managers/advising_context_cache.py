@@ -0,0 +1,94 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from src.services.transcript_advisor import build_transcript_advising_context, prereq_data_version
+
+ADVISING_CONTEXT_CACHE_SIZE = int(os.getenv("ADVISING_CONTEXT_CACHE_SIZE", "256"))
+
+
+class AdvisingContextCache:
+    """
+    Per-session transcript advising context, computed once per upload.
+
+    store() runs build_transcript_advising_context when a transcript is parsed and
+    saves the result next to the transcript in sqlite, tagged with the prereq data
+    version. load() serves chat turns from an in-memory LRU, falls back to the
+    stored copy, and only recomputes when the prereq data has changed since.
+
+    Other workers share the sqlite file, so a memory hit is only trusted while
+    the transcript's stored upload timestamp still matches the one it was read
+    with; a re-upload or clear elsewhere is picked up on the next turn.
+    """
+
+    def __init__(self, get_session_manager: Callable[[], Any], max_entries: int = ADVISING_CONTEXT_CACHE_SIZE):
+        self._get_session_manager = get_session_manager
+        self.max_entries = max_entries
+        self.counters: Counter = Counter()
+        # session_id -> (context_version, uploaded_at, transcript, advising context)
+        self._entries: "OrderedDict[str, Tuple[str, Any, dict, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, session_id: str, version: str, uploaded_at: Any, transcript: dict, context: dict):
+        with self._lock:
+            self._entries[session_id] = (version, uploaded_at, transcript, context)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def store(self, session_id: str, transcript: dict) -> dict:
+        """Computes and persists the advising context for a freshly parsed transcript."""
+        version = prereq_data_version()
+        context = build_transcript_advising_context(transcript)
+        session_manager = self._get_session_manager()
+        session_manager.save_transcript(session_id, transcript, context, version)
+        self._remember(session_id, version, session_manager.transcript_uploaded_at(session_id), transcript, context)
+        return context
+
+    def load(self, session_id: str) -> Tuple[Optional[dict], Optional[dict]]:
+        """Returns (transcript, advising context) for a session, or (None, None) without a transcript."""
+        version = prereq_data_version()
+        session_manager = self._get_session_manager()
+        uploaded_at = session_manager.transcript_uploaded_at(session_id)
+        if uploaded_at is None:
+            self.invalidate(session_id)
+            return None, None
+
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry[0] == version and entry[1] == uploaded_at:
+                self._entries.move_to_end(session_id)
+                self.counters["memory_hits"] += 1
+                return entry[2], entry[3]
+
+        stored = session_manager.load_transcript_with_context(session_id)
+        if stored is None:
+            self.invalidate(session_id)
+            return None, None
+
+        transcript, context, stored_version = stored
+        if context is not None and stored_version == version:
+            self.counters["stored_hits"] += 1
+        else:
+            # Uploaded before contexts were stored, or the prereq data changed since.
+            self.counters["recomputed"] += 1
+            context = build_transcript_advising_context(transcript)
+            session_manager.save_advising_context(session_id, context, version)
+
+        self._remember(session_id, version, uploaded_at, transcript, context)
+        return transcript, context
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "memory_hits": self.counters.get("memory_hits", 0),
+            "stored_hits": self.counters.get("stored_hits", 0),
+            "recomputed": self.counters.get("recomputed", 0),
+        }
@@ -0,0 +1,35 @@
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import Any
+
+
+class AsyncManager:
+    """
+    Awaitable facade over a blocking manager (SessionManager, FirebaseChatHistoryManager).
+
+    Every method of the wrapped manager is exposed as a coroutine that runs the
+    original call on `executor`, so async routes can `await manager.save_message(...)`
+    without stalling the event loop on sqlite or Firestore. Non-callable attributes
+    (e.g. `enabled`) are passed through unchanged.
+    """
+
+    def __init__(self, manager: Any, executor: Executor | None = None):
+        self._manager = manager
+        self._executor = executor
+
+    @property
+    def wrapped(self) -> Any:
+        return self._manager
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._manager, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(attr, *args, **kwargs))
+
+        call.__name__ = name
+        return call
@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple
+
+from langchain_core.documents import Document
+
+CATALOG_AVAILABILITY_DB_PATH = os.getenv("CATALOG_AVAILABILITY_DB_PATH", "catalog_availability.db")
+# Seconds between background refreshes in the API process; 0 leaves refreshing to POST /rag/availability.
+CATALOG_AVAILABILITY_REFRESH_SECONDS = int(os.getenv("CATALOG_AVAILABILITY_REFRESH_SECONDS", "0"))
+
+CATALOG_SOURCE_PREFIX = "catalog:"
+# Coarse flag kept in the catalog vectors' metadata so self-query can filter on open seats.
+SEATS_AVAILABLE_FIELD = "seats_available"
+
+
+def catalog_key(doc: Document) -> Tuple[str, str] | None:
+    """(quarter, course_id) of a catalog document: its "quarter" metadata and "catalog:<course_id>" source key."""
+    metadata = getattr(doc, "metadata", None)
+    if not isinstance(metadata, dict):
+        return None
+    source_key, quarter = metadata.get("source_key"), metadata.get("quarter")
+    if not isinstance(source_key, str) or not source_key.startswith(CATALOG_SOURCE_PREFIX) or not quarter:
+        return None
+    course_id = source_key[len(CATALOG_SOURCE_PREFIX):]
+    return (str(quarter), course_id) if course_id else None
+
+
+class CatalogAvailabilityStore:
+    """
+    Live seat counts for catalog courses, in sqlite, keyed by (quarter, course_id).
+
+    The catalog namespace only embeds the static course text; enrollment moves
+    hourly during pass times and is refreshed here from
+    UCSBCatalogClient.get_enrollment_snapshot() without re-embedding anything.
+    join() adds the current numbers to catalog search results at query time.
+
+    Exact counts cannot be filtered on at retrieval time, so each vector also
+    carries a coarse seats_available flag. flag_synced remembers the value last
+    written to Pinecone; changed_flags() lists only the courses that flipped,
+    which VectorManager.sync_availability_flags() pushes as metadata-only updates.
+    """
+
+    def __init__(self, db_path: str = CATALOG_AVAILABILITY_DB_PATH):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS catalog_availability (
+                quarter TEXT,
+                course_id TEXT,
+                enrolled INTEGER,
+                max_enroll INTEGER,
+                remaining INTEGER,
+                sections TEXT,
+                updated_at TIMESTAMP,
+                flag_synced INTEGER,
+                PRIMARY KEY (quarter, course_id)
+            )
+        ''')
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(catalog_availability)")}
+        if "flag_synced" not in columns:
+            self.conn.execute("ALTER TABLE catalog_availability ADD COLUMN flag_synced INTEGER")
+        self.conn.commit()
+
+    def update(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Stores a get_enrollment_snapshot() result; returns how many courses were written."""
+        now = datetime.now().isoformat(timespec="seconds")
+        records = [
+            (
+                row["quarter"],
+                row["course_id"],
+                row["enrolled"],
+                row["max_enroll"],
+                row["remaining"],
+                json.dumps(row.get("sections", [])),
+                now,
+            )
+            for row in rows
+        ]
+        with self._lock:
+            # An upsert rather than INSERT OR REPLACE, which would reset flag_synced.
+            self.conn.executemany(
+                """
+                INSERT INTO catalog_availability
+                    (quarter, course_id, enrolled, max_enroll, remaining, sections, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (quarter, course_id) DO UPDATE SET
+                    enrolled = excluded.enrolled,
+                    max_enroll = excluded.max_enroll,
+                    remaining = excluded.remaining,
+                    sections = excluded.sections,
+                    updated_at = excluded.updated_at
+                """,
+                records,
+            )
+            self.conn.commit()
+        return len(records)
+
+    def changed_flags(self) -> List[Tuple[str, str, bool]]:
+        """
+        (quarter, course_id, seats_available) for courses whose flag differs from
+        the one last synced to Pinecone. Only each course's latest quarter counts,
+        since catalog vectors are keyed by course_id alone.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                """
+                SELECT quarter, course_id, remaining > 0 FROM catalog_availability AS a
+                WHERE quarter = (SELECT MAX(quarter) FROM catalog_availability WHERE course_id = a.course_id)
+                AND (flag_synced IS NULL OR flag_synced != (remaining > 0))
+                """
+            ).fetchall()
+        return [(quarter, course_id, bool(flag)) for quarter, course_id, flag in rows]
+
+    def mark_flags_synced(self, flags: Iterable[Tuple[str, str, bool]]):
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE catalog_availability SET flag_synced = ? WHERE quarter = ? AND course_id = ?",
+                [(int(flag), quarter, course_id) for quarter, course_id, flag in flags],
+            )
+            self.conn.commit()
+
+    def lookup(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        found = {}
+        with self._lock:
+            for quarter, course_id in set(keys):
+                row = self.conn.execute(
+                    "SELECT enrolled, max_enroll, remaining, sections, updated_at FROM catalog_availability "
+                    "WHERE quarter = ? AND course_id = ?",
+                    (quarter, course_id),
+                ).fetchone()
+                if row:
+                    found[(quarter, course_id)] = {
+                        "enrolled": row[0],
+                        "max_enroll": row[1],
+                        "remaining": row[2],
+                        "sections": json.loads(row[3]),
+                        "updated_at": row[4],
+                    }
+        return found
+
+    def join(self, documents: List[Document]) -> List[Document]:
+        """
+        Returns the documents with current enrollment appended to each catalog
+        document's text and metadata. Non-catalog documents, and courses with no
+        snapshot yet, are returned as they are.
+        """
+        keys = [catalog_key(doc) for doc in documents]
+        if not any(keys):
+            return documents
+        live = self.lookup(key for key in keys if key)
+
+        joined = []
+        for doc, key in zip(documents, keys):
+            availability = live.get(key)
+            if availability is None:
+                joined.append(doc)
+                continue
+            lines = [
+                f"Current Enrollment (as of {availability['updated_at'].replace('T', ' ')[:16]}): "
+                f"{availability['enrolled']}/{availability['max_enroll']} Enrolled, "
+                f"{availability['remaining']} seats left"
+            ]
+            for sec in availability["sections"]:
+                lines.append(
+                    f"  - Section: {sec['section']} (Code: {sec['enroll_code']}) | "
+                    f"Capacity: {sec['enrolled']}/{sec['max_enroll']} Enrolled"
+                )
+            metadata = dict(doc.metadata)
+            metadata.update({
+                "remaining_total_availability": availability["remaining"],
+                "enrolled_total": availability["enrolled"],
+                "max_enroll": availability["max_enroll"],
+                "availability_updated_at": availability["updated_at"],
+                SEATS_AVAILABLE_FIELD: availability["remaining"] > 0,
+            })
+            joined.append(Document(page_content=doc.page_content + "\n" + "\n".join(lines), metadata=metadata))
+        return joined
+
+
+@lru_cache(maxsize=1)
+def get_catalog_availability_store() -> CatalogAvailabilityStore:
+    """Process-wide store shared by the refresh job and VectorManager's query-time join."""
+    return CatalogAvailabilityStore()
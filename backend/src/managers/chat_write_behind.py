@@ -0,0 +1,311 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "1000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))
+WRITE_BEHIND_LINGER_SECONDS = float(os.getenv("WRITE_BEHIND_LINGER_SECONDS", "0.05"))
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "3"))
+WRITE_BEHIND_RETRY_BACKOFF_SECONDS = float(os.getenv("WRITE_BEHIND_RETRY_BACKOFF_SECONDS", "0.2"))
+
+# google.api_core exception names, matched by name so firebase stays an optional import here.
+_TRANSIENT_ERROR_NAMES = {
+    "Aborted",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "ServiceUnavailable",
+    "TooManyRequests",
+    "RetryError",
+}
+
+_STOP = object()
+
+
+def _turn_items(session_id: str, user_email: Optional[str], user_text: str, ai_text: str) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    # Distinct timestamps keep human-before-ai order in stores that sort by timestamp.
+    # message_id is fixed here, so a retried Firestore batch rewrites the same documents.
+    return [
+        {
+            "message_id": uuid.uuid4().hex,
+            "session_id": session_id,
+            "user_email": user_email,
+            "role": role,
+            "content": content,
+            "timestamp": now + timedelta(microseconds=offset),
+        }
+        for offset, (role, content) in enumerate((("human", user_text), ("ai", ai_text)))
+    ]
+
+
+def _to_message(item: dict) -> BaseMessage:
+    if item["role"] == "human":
+        return HumanMessage(content=item["content"])
+    return AIMessage(content=item["content"])
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, (sqlite3.OperationalError, ConnectionError, TimeoutError)):
+        return True
+    return type(error).__name__ in _TRANSIENT_ERROR_NAMES
+
+
+class ChatWriteBehindQueue:
+    """
+    Bounded in-process write-behind queue for chat persistence.
+
+    Routes enqueue a finished turn and return immediately; one background thread
+    drains the queue, groups messages by session and writes each group with one
+    sqlite commit and one Firestore batch. Transient failures are retried with
+    backoff, and close() flushes what is left on shutdown.
+
+    Messages stay visible through pending_messages() until they are committed to
+    sqlite, so the next turn of a session still sees the previous one.
+    """
+
+    def __init__(
+        self,
+        get_session_manager: Callable[[], Any],
+        get_firebase_history: Callable[[], Any],
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        linger_seconds: float = WRITE_BEHIND_LINGER_SECONDS,
+        max_retries: int = WRITE_BEHIND_MAX_RETRIES,
+        retry_backoff_seconds: float = WRITE_BEHIND_RETRY_BACKOFF_SECONDS,
+    ):
+        self._get_session_manager = get_session_manager
+        self._get_firebase_history = get_firebase_history
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.counters: Counter = Counter()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        # session_id -> messages accepted but not yet committed to sqlite.
+        self._pending: dict[str, List[dict]] = defaultdict(list)
+        # Guards _pending and queue puts; never held across sqlite or Firestore I/O.
+        self._pending_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    # --- producer side ---
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="chat-write-behind", daemon=True)
+                self._thread.start()
+
+    def _put(self, item: Any, block: bool) -> bool:
+        """
+        Queues one item while holding _pending_lock, so the capacity check in
+        enqueue_turn() holds until both of its messages are in. A blocking put polls
+        instead of waiting under the lock, which the worker needs in order to drain.
+        """
+        while True:
+            with self._pending_lock:
+                try:
+                    self._queue.put_nowait(item)
+                    return True
+                except queue.Full:
+                    if not block:
+                        return False
+            time.sleep(max(self.linger_seconds, 0.01))
+
+    def enqueue_turn(self, session_id: str, user_email: Optional[str], user_text: str, ai_text: str) -> bool:
+        """
+        Queues the human and ai messages of one turn. Returns False (nothing queued)
+        when the queue is full; the caller should then write synchronously with write_now().
+        """
+        items = _turn_items(session_id, user_email, user_text, ai_text)
+        with self._pending_lock:
+            if self._queue.maxsize and self._queue.qsize() + len(items) > self._queue.maxsize:
+                self.counters["overflow"] += 1
+                return False
+            for item in items:
+                self._pending[session_id].append(item)
+                self._queue.put_nowait(item)
+        self._ensure_worker()
+        return True
+
+    def enqueue_callback(self, callback: Callable[[], Any], block: bool = False) -> bool:
+        """
+        Runs callback on the worker once every message queued before it has been written.
+        Returns False if the queue is full and block is False.
+        """
+        if not self._put({"callback": callback}, block):
+            return False
+        self._ensure_worker()
+        return True
+
+    def write_now(self, session_id: str, user_email: Optional[str], user_text: str, ai_text: str):
+        """Synchronous fallback used when the queue is full."""
+        self._write_batch(_turn_items(session_id, user_email, user_text, ai_text))
+
+    # --- reader side ---
+
+    def pending_messages(self, session_id: str) -> List[BaseMessage]:
+        with self._pending_lock:
+            items = list(self._pending.get(session_id, ()))
+        return [_to_message(item) for item in items]
+
+    def load_summarized_history(self, session_id: str) -> Tuple[Optional[str], int, List[BaseMessage]]:
+        """
+        SessionManager.load_summarized_history plus this session's not-yet-committed messages.
+
+        The sqlite read runs outside _pending_lock. Pending messages are snapshotted
+        first, so one the worker commits in between is in both reads; it is dropped
+        from the snapshot by its stored timestamp.
+        """
+        with self._pending_lock:
+            items = list(self._pending.get(session_id, ()))
+        summary, summarized_count, rows = self._get_session_manager().load_summarized_history(
+            session_id, with_timestamps=True
+        )
+        committed = {str(timestamp) for timestamp, _ in rows}
+        pending = [_to_message(item) for item in items if str(item["timestamp"]) not in committed]
+        return summary, summarized_count, [message for _, message in rows] + pending
+
+    # --- worker side ---
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                return
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.linger_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                self._process(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _process(self, batch: List[dict]):
+        messages: List[dict] = []
+        for item in batch:
+            callback = item.get("callback")
+            if callback is None:
+                messages.append(item)
+                continue
+            # Callbacks run after the messages queued before them.
+            if messages:
+                self._write_batch(messages)
+                messages = []
+            try:
+                callback()
+            except Exception as e:
+                print(f"Write-behind callback failed: {e}")
+        if messages:
+            self._write_batch(messages)
+
+    def _with_retries(self, description: str, fn: Callable[[], Any]) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                fn()
+                return True
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_transient(e):
+                    self.counters["failed"] += 1
+                    print(f"Write-behind {description} failed after {attempt + 1} attempt(s): {e}")
+                    return False
+                self.counters["retries"] += 1
+                time.sleep(self.retry_backoff_seconds * (2 ** attempt))
+        return False
+
+    def _forget_pending(self, session_id: str, items: List[dict]):
+        """Drops items from the read-your-writes buffer. Caller holds _pending_lock."""
+        pending = self._pending.get(session_id)
+        if not pending:
+            return
+        done = {id(item) for item in items}
+        pending[:] = [item for item in pending if id(item) not in done]
+        if not pending:
+            del self._pending[session_id]
+
+    def _write_batch(self, items: List[dict]):
+        by_session: dict[Tuple[str, Optional[str]], List[dict]] = defaultdict(list)
+        for item in items:
+            by_session[(item["session_id"], item["user_email"])].append(item)
+
+        for (session_id, user_email), session_items in by_session.items():
+            rows = [(item["role"], item["content"], item["timestamp"]) for item in session_items]
+            firestore_rows = [row + (item["message_id"],) for row, item in zip(rows, session_items)]
+
+            def write_local():
+                # Committed outside _pending_lock, which enqueue_turn takes on the event loop.
+                self._get_session_manager().save_messages(session_id, rows)
+                with self._pending_lock:
+                    self._forget_pending(session_id, session_items)
+
+            if self._with_retries(f"sqlite write for session {session_id}", write_local):
+                self.counters["messages_written"] += len(session_items)
+            else:
+                # Give up on read-your-writes for these rather than keeping them forever.
+                with self._pending_lock:
+                    self._forget_pending(session_id, session_items)
+
+            if user_email:
+                self._with_retries(
+                    f"Firestore write for session {session_id}",
+                    lambda: self._get_firebase_history().save_messages(user_email, session_id, firestore_rows),
+                )
+
+            self.counters["batches"] += 1
+
+    # --- lifecycle ---
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Blocks until everything queued so far has been written. Returns False on timeout."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self.enqueue_callback(done.set, block=True)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 10.0):
+        if self._thread is None or not self._thread.is_alive():
+            return
+        if not self.flush(timeout):
+            print("Write-behind queue did not drain before shutdown; unwritten chat messages were dropped.")
+        self._put(_STOP, block=True)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._pending_lock:
+            pending_messages = sum(len(items) for items in self._pending.values())
+        return {
+            "queue_depth": self._queue.qsize(),
+            "pending_messages": pending_messages,
+            "messages_written": self.counters.get("messages_written", 0),
+            "batches": self.counters.get("batches", 0),
+            "retries": self.counters.get("retries", 0),
+            "failed": self.counters.get("failed", 0),
+            "overflow": self.counters.get("overflow", 0),
+        }
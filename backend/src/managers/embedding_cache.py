@@ -0,0 +1,181 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_DB_PATH = os.getenv("EMBEDDING_CACHE_DB_PATH", "embedding_cache.db")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+# Rows kept in the sqlite tier; the oldest by created_at are deleted past this.
+EMBEDDING_CACHE_DB_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_DB_MAX_ROWS", "200000"))
+
+
+def normalize_embedding_text(text: str) -> str:
+    """Collapses whitespace and case so trivially different phrasings share a key."""
+    return " ".join((text or "").split()).casefold()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with an in-memory LRU in front of a sqlite tier.
+
+    Keys combine the normalized text with the embedding model, output dimension
+    and kind ("query" vs "document", since Gemini embeds them with different
+    task types). Both embed_query and the bulk embed_documents path are cached,
+    so re-ingesting unchanged text never reaches the embedding API.
+
+    Vectors are stored on disk as float32, which is the precision the index
+    keeps anyway; rows written as float64 by older versions are still read.
+    """
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        model_name: str,
+        dimension: int,
+        db_path: Optional[str] = EMBEDDING_CACHE_DB_PATH,
+        max_memory_entries: int = EMBEDDING_CACHE_SIZE,
+        max_disk_rows: int = EMBEDDING_CACHE_DB_MAX_ROWS,
+    ):
+        self.inner = inner
+        self.model_name = model_name
+        self.dimension = dimension
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_rows = max_disk_rows
+        self.counters: Counter = Counter()
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.conn = None
+        self._disk_rows = 0
+        if db_path:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    cache_key TEXT PRIMARY KEY,
+                    vector BLOB,
+                    created_at TIMESTAMP
+                )
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_created_at ON embeddings (created_at)")
+            self.conn.commit()
+            self._disk_rows = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._evict_disk_rows()
+
+    def _key(self, text: str, kind: str) -> str:
+        raw = f"{self.model_name}|{self.dimension}|{kind}|{normalize_embedding_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _decode(self, blob: bytes) -> List[float]:
+        # The dimension is part of the key, so the blob size tells float32 from legacy float64.
+        typecode = "d" if len(blob) == self.dimension * 8 else "f"
+        return array(typecode, blob).tolist()
+
+    def _evict_disk_rows(self):
+        """Deletes the oldest rows past max_disk_rows. Caller holds _lock (or is __init__)."""
+        if self._disk_rows <= self.max_disk_rows:
+            return
+        self.conn.execute(
+            "DELETE FROM embeddings WHERE cache_key IN "
+            "(SELECT cache_key FROM embeddings ORDER BY created_at DESC, rowid DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_rows,),
+        )
+        self.conn.commit()
+        self._disk_rows = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> dict[str, List[float]]:
+        found: dict[str, List[float]] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self.counters["memory_hits"] += 1
+
+            missing = [key for key in keys if key not in found]
+            if missing and self.conn is not None:
+                # Chunked to stay under sqlite's bound-parameter limit.
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    placeholders = ",".join("?" for _ in chunk)
+                    rows = self.conn.execute(
+                        f"SELECT cache_key, vector FROM embeddings WHERE cache_key IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = self._decode(blob)
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.counters["disk_hits"] += 1
+        return found
+
+    def _store(self, items: dict[str, List[float]]):
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self.conn is not None and items:
+                now = datetime.now()
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (cache_key, vector, created_at) VALUES (?, ?, ?)",
+                    [(key, array("f", vector).tobytes(), now) for key, vector in items.items()],
+                )
+                self.conn.commit()
+                # Counts replaced keys too; the recount in _evict_disk_rows corrects it.
+                self._disk_rows += len(items)
+                self._evict_disk_rows()
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text, "query")
+        found = self._lookup([key])
+        if key in found:
+            return found[key]
+
+        self.counters["misses"] += 1
+        vector = list(self.inner.embed_query(text))
+        self._store({key: vector})
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text, "document") for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        # Embed each distinct missing text once, even if it repeats in the batch.
+        missing: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            self.counters["misses"] += len(missing)
+            vectors = self.inner.embed_documents(list(missing.values()))
+            computed = {key: list(vector) for key, vector in zip(missing.keys(), vectors)}
+            self._store(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def stats(self) -> dict:
+        with self._lock:
+            memory_hits = self.counters.get("memory_hits", 0)
+            disk_hits = self.counters.get("disk_hits", 0)
+            misses = self.counters.get("misses", 0)
+            memory_entries = len(self._memory)
+        lookups = memory_hits + disk_hits + misses
+        return {
+            "memory_hits": memory_hits,
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "hit_rate": (memory_hits + disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": memory_entries,
+        }
@@ -22,6 +22,8 @@ class FirebaseChatHistoryManager:
     def __init__(self):
         self.enabled = False
         self.db = None
+        # Chats already known to exist, so batched saves can skip the existence read.
+        self._known_chats: set[tuple[str, str]] = set()
 
         service_account_json = os.getenv("FIREBASE_SERVICE_ACCOUNT_JSON")
         service_account_path = os.getenv("FIREBASE_SERVICE_ACCOUNT_PATH")
@@ -86,6 +88,52 @@ class FirebaseChatHistoryManager:
             }
         )
 
+    def save_messages(self, user_email: str, chat_session_id: str, messages: list[tuple]):
+        """
+        Saves (role, content, timestamp[, message_id]) messages with a single Firestore batch:
+        one chat-document upsert plus one document per message. A message_id names the
+        message document, so retrying a batch the server already committed overwrites
+        the same documents instead of adding copies.
+        """
+        if not self.enabled or not user_email or not chat_session_id or not messages:
+            return
+
+        chat_ref = self._chat_ref(user_email, chat_session_id)
+        last_timestamp = messages[-1][2]
+
+        payload: dict[str, Any] = {
+            "last_updated": last_timestamp,
+            "updated_at_iso": last_timestamp.isoformat(),
+        }
+        # Same rule as save_message: the latest human message names the chat.
+        for role, content, *_ in messages:
+            if role == "human":
+                clean = (content or "").strip().replace("\n", " ")
+                payload["title"] = clean[:80] if clean else "New Chat"
+
+        key = (user_email, chat_session_id)
+        if key not in self._known_chats and not chat_ref.get().exists:
+            first_timestamp = messages[0][2]
+            payload["created_at"] = first_timestamp
+            payload["created_at_iso"] = first_timestamp.isoformat()
+            payload.setdefault("title", "New Chat")
+
+        batch = self.db.batch()
+        batch.set(chat_ref, payload, merge=True)
+        messages_ref = chat_ref.collection("messages")
+        for role, content, timestamp, *message_id in messages:
+            batch.set(
+                messages_ref.document(message_id[0] if message_id else None),
+                {
+                    "role": role,
+                    "content": content,
+                    "timestamp": timestamp,
+                    "timestamp_iso": timestamp.isoformat(),
+                },
+            )
+        batch.commit()
+        self._known_chats.add(key)
+
     def list_sessions(self, user_email: str, limit: int = 30) -> list[dict[str, Any]]:
         if not self.enabled or not user_email:
             return []
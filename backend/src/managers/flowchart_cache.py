@@ -0,0 +1,129 @@
+import hashlib
+import os
+import threading
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Any, Iterable
+
+from src.services.flowchart_svg import remaining_path_svg_url, write_flowchart_svg
+from src.services.prereq_engine import normalize_course_code
+from src.services.prereq_graph import (
+    build_mermaid_markup,
+    build_remaining_path_layout,
+    build_upper_division_flowchart_data,
+    write_upper_division_flowchart_svg,
+)
+from src.services.transcript_advisor import prereq_data_version
+
+FLOWCHART_CACHE_SIZE = int(os.getenv("FLOWCHART_CACHE_SIZE", "512"))
+
+
+def _canonical(codes: Iterable[str] | None) -> list[str]:
+    return sorted({normalize_course_code(code) for code in (codes or []) if isinstance(code, str) and code.strip()})
+
+
+class FlowchartCache:
+    """
+    LRU of flowchart data, Mermaid markup and graph layouts keyed by course set.
+
+    Many students share the same completed/accounted sets (everyone right after
+    CMPSC 8/16/24/40), so the key is a hash of the sorted, normalized sets plus the
+    prereq data version; a data change turns every old key into a miss.
+    Cached values are shared between callers and must be treated as read-only.
+    Rendered SVGs live in the on-disk cache of flowchart_svg, keyed by layout hash.
+    """
+
+    def __init__(self, max_entries: int = FLOWCHART_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.counters: Counter = Counter()
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind: str, completed: Iterable[str] | None, accounted: Iterable[str] | None = None, *extra: str) -> str:
+        completed_codes = _canonical(completed)
+        # build_upper_division_flowchart_data treats missing accounted courses as the completed ones.
+        accounted_codes = _canonical(accounted) if accounted else completed_codes
+        raw = "\x1f".join([kind, prereq_data_version(), *extra, "|".join(completed_codes), "|".join(accounted_codes)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get_or_build(self, key: str, build) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return self._entries[key]
+            self.counters["misses"] += 1
+
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def flowchart_data(
+        self,
+        completed: Iterable[str] | None,
+        accounted: Iterable[str] | None = None,
+        layering: str = "longest_path",
+    ) -> dict:
+        completed, accounted = list(completed or []), list(accounted or [])
+        return self._get_or_build(
+            self.key("flowchart", completed, accounted, layering),
+            lambda: build_upper_division_flowchart_data(completed, accounted, layering=layering),
+        )
+
+    def mermaid_markup(self, completed: Iterable[str] | None) -> str:
+        completed = list(completed or [])
+        return self._get_or_build(self.key("mermaid", completed), lambda: build_mermaid_markup(completed))
+
+    def remaining_path_layout(self, completed: Iterable[str] | None) -> tuple[list[list[str]], list[tuple[str, str]]]:
+        completed = list(completed or [])
+        return self._get_or_build(self.key("layout", completed), lambda: build_remaining_path_layout(completed))
+
+    def remaining_path_svg(self, completed: Iterable[str] | None) -> str | None:
+        """Graph hash of the rendered remaining-path graph, or None when nothing remains."""
+        tiers, edges = self.remaining_path_layout(completed)
+        return write_flowchart_svg(tiers, edges) if tiers else None
+
+    def remaining_path_image(self, completed: Iterable[str] | None) -> tuple[str | None, str]:
+        """
+        generate_remaining_path_image() backed by the cached layout and the on-disk SVG cache.
+        The SVG is written up front so the first fetch is a file hit, but the URL carries the
+        completed courses rather than the graph hash so it still renders after eviction.
+        """
+        if self.remaining_path_svg(completed) is None:
+            return None, "The student has completed all courses in the prerequisite database."
+        return remaining_path_svg_url(_canonical(completed)), "Flowchart generated successfully."
+
+    def flowchart_svg(
+        self,
+        completed: Iterable[str] | None,
+        accounted: Iterable[str] | None = None,
+        layering: str = "longest_path",
+    ) -> str:
+        """Graph hash of the rendered flowchart_data() chart (written to disk if missing)."""
+        return write_upper_division_flowchart_svg(self.flowchart_data(completed, accounted, layering))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters.get("hits", 0)
+            misses = self.counters.get("misses", 0)
+            return {
+                "entries": len(self._entries),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if (hits + misses) else 0.0,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_flowchart_cache() -> FlowchartCache:
+    """Process-wide cache shared by the transcript routes and the chat graph tool."""
+    return FlowchartCache()
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable, List, Sequence, Tuple
+
+INGEST_LEDGER_DB_PATH = os.getenv("INGEST_LEDGER_DB_PATH", "ingest_ledger.db")
+
+
+class IngestLedger:
+    """
+    Local record of which documents each namespace already holds, in sqlite.
+
+    Rows are (namespace, doc_id, content_hash). diff() splits an incoming
+    document list into the ones that need embedding (unknown id or changed hash)
+    and the ledger ids that are no longer in the list, so a refresh where most
+    documents are unchanged only pays for the changed ones. Rows are written per
+    landed batch, so an interrupted run keeps what it finished.
+    """
+
+    def __init__(self, db_path: str = INGEST_LEDGER_DB_PATH):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS ingest_ledger (
+                namespace TEXT,
+                doc_id TEXT,
+                content_hash TEXT,
+                ingested_at TIMESTAMP,
+                PRIMARY KEY (namespace, doc_id)
+            )
+        ''')
+        self.conn.commit()
+
+    def hashes(self, namespace: str) -> dict[str, str]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT doc_id, content_hash FROM ingest_ledger WHERE namespace = ?",
+                (namespace,),
+            ).fetchall()
+        return dict(rows)
+
+    def known_ids(self, namespace: str, ids: Iterable[str]) -> set[str]:
+        """The subset of `ids` the namespace already holds."""
+        with self._lock:
+            return {
+                doc_id
+                for doc_id in ids
+                if self.conn.execute(
+                    "SELECT 1 FROM ingest_ledger WHERE namespace = ? AND doc_id = ?",
+                    (namespace, doc_id),
+                ).fetchone()
+            }
+
+    def diff(
+        self,
+        namespace: str,
+        ids: Sequence[str],
+        hashes: Sequence[str],
+        force: bool = False,
+    ) -> Tuple[List[int], List[str]]:
+        """
+        Returns (positions in `ids` to ingest, ledger ids missing from `ids`).
+        Repeated ids are ingested once, at their first position; force=True
+        ingests every id regardless of the ledger.
+        """
+        known = self.hashes(namespace)
+        pending: List[int] = []
+        seen: set[str] = set()
+        for position, (doc_id, content_hash) in enumerate(zip(ids, hashes)):
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            if force or known.get(doc_id) != content_hash:
+                pending.append(position)
+        stale = sorted(doc_id for doc_id in known if doc_id not in seen)
+        return pending, stale
+
+    def record(self, namespace: str, ids: Iterable[str], hashes: Iterable[str]):
+        now = datetime.now()
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO ingest_ledger VALUES (?, ?, ?, ?)",
+                [(namespace, doc_id, content_hash, now) for doc_id, content_hash in zip(ids, hashes)],
+            )
+            self.conn.commit()
+
+    def forget(self, namespace: str, ids: Iterable[str]):
+        with self._lock:
+            self.conn.executemany(
+                "DELETE FROM ingest_ledger WHERE namespace = ? AND doc_id = ?",
+                [(namespace, doc_id) for doc_id in ids],
+            )
+            self.conn.commit()
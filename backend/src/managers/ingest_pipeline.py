@@ -0,0 +1,314 @@
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import click
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+INGEST_EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", "4"))
+INGEST_UPSERT_WORKERS = int(os.getenv("INGEST_UPSERT_WORKERS", "2"))
+INGEST_UPSERT_BATCH_SIZE = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", "32"))
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", "4"))
+INGEST_RETRY_BASE_SECONDS = float(os.getenv("INGEST_RETRY_BASE_SECONDS", "1.0"))
+# Pinecone accepts at most 1000 ids per delete request.
+INGEST_DELETE_BATCH_SIZE = int(os.getenv("INGEST_DELETE_BATCH_SIZE", "1000"))
+# Fetch sends the ids in the query string, so keep its requests smaller.
+INGEST_FETCH_BATCH_SIZE = int(os.getenv("INGEST_FETCH_BATCH_SIZE", "100"))
+INGEST_CHECKPOINT_DB_PATH = os.getenv("INGEST_CHECKPOINT_DB_PATH", "ingest_checkpoints.db")
+
+
+class IngestCheckpoint:
+    """
+    Batches of an ingestion run that already reached Pinecone, in sqlite.
+
+    A run is identified by its namespace plus a fingerprint of the document ids
+    and batch size, so re-running the same document list after a crash skips the
+    batches that finished. Once a run over a namespace completes, every row of
+    that namespace is dropped, including ones left by runs that were never resumed.
+
+    VectorManager does not use it: its ingest ledger already records each landed
+    batch, so the resumed run only receives the documents that did not land.
+    """
+
+    def __init__(self, db_path: str = INGEST_CHECKPOINT_DB_PATH):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+                namespace TEXT,
+                run_key TEXT,
+                batch_index INTEGER,
+                completed_at TIMESTAMP,
+                PRIMARY KEY (namespace, run_key, batch_index)
+            )
+        ''')
+        self.conn.commit()
+
+    @staticmethod
+    def run_key(ids: Sequence[str], batch_size: int) -> str:
+        digest = hashlib.sha256(str(batch_size).encode("utf-8"))
+        for doc_id in ids:
+            digest.update(b"\x1f" + doc_id.encode("utf-8"))
+        return digest.hexdigest()
+
+    def done_batches(self, namespace: str, run_key: str) -> set[int]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT batch_index FROM ingest_checkpoints WHERE namespace = ? AND run_key = ?",
+                (namespace, run_key),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_done(self, namespace: str, run_key: str, batch_index: int):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ingest_checkpoints VALUES (?, ?, ?, ?)",
+                (namespace, run_key, batch_index, datetime.now()),
+            )
+            self.conn.commit()
+
+    def clear(self, namespace: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM ingest_checkpoints WHERE namespace = ?", (namespace,))
+            self.conn.commit()
+
+
+class IngestPipeline:
+    """
+    Embeds and upserts documents in batches on two bounded worker pools.
+
+    Documents are cut into embed batches of `embed_batch_size`; each batch is
+    embedded on the embed pool and its records upserted in chunks of
+    `upsert_batch_size` on the upsert pool, so embedding of later batches overlaps
+    upserts of earlier ones. Each step retries with exponential backoff and jitter.
+    A batch that still fails is reported and left out of the checkpoint, so the
+    other batches land and the next run over the same documents retries only it.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        index: Any,
+        checkpoint: Optional[IngestCheckpoint] = None,
+        text_key: str = "text",
+        embed_batch_size: int = INGEST_EMBED_BATCH_SIZE,
+        embed_workers: int = INGEST_EMBED_WORKERS,
+        upsert_workers: int = INGEST_UPSERT_WORKERS,
+        upsert_batch_size: int = INGEST_UPSERT_BATCH_SIZE,
+        delete_batch_size: int = INGEST_DELETE_BATCH_SIZE,
+        fetch_batch_size: int = INGEST_FETCH_BATCH_SIZE,
+        max_retries: int = INGEST_MAX_RETRIES,
+        retry_base_seconds: float = INGEST_RETRY_BASE_SECONDS,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.embeddings = embeddings
+        self.index = index
+        self.checkpoint = checkpoint
+        self.text_key = text_key
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.embed_workers = max(1, embed_workers)
+        self.upsert_workers = max(1, upsert_workers)
+        self.upsert_batch_size = max(1, upsert_batch_size)
+        self.delete_batch_size = max(1, delete_batch_size)
+        self.fetch_batch_size = max(1, fetch_batch_size)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self._sleep = sleep
+
+    def _with_retries(self, fn: Callable[[], Any], what: str, stats: dict, lock: threading.Lock) -> Any:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_base_seconds * (2 ** attempt) + random.uniform(0, self.retry_base_seconds)
+                with lock:
+                    stats["retries"] += 1
+                click.secho(f"   ...{what} failed ({e}); retrying in {delay:.1f}s", fg="yellow")
+                self._sleep(delay)
+
+    def run(
+        self,
+        documents: List[Document],
+        ids: List[str],
+        namespace: str,
+        on_batch_written: Optional[Callable[[int, int], None]] = None,
+    ) -> tuple[List[List[float]], dict]:
+        """
+        Returns (vectors of the documents embedded in this run, stats). Stats has
+        documents, batches, skipped_batches, failed_batches, retries, seconds and
+        docs_per_second (documents written by this run over wall time).
+        `on_batch_written(start, end)` is called once a slice of `documents` is upserted.
+        """
+        started = time.perf_counter()
+        batches = [
+            (start // self.embed_batch_size, start, min(start + self.embed_batch_size, len(documents)))
+            for start in range(0, len(documents), self.embed_batch_size)
+        ]
+        run_key = IngestCheckpoint.run_key(ids, self.embed_batch_size)
+        done = self.checkpoint.done_batches(namespace, run_key) if self.checkpoint else set()
+
+        lock = threading.Lock()
+        stats = {
+            "documents": len(documents),
+            "batches": len(batches),
+            "skipped_batches": len(done & {batch[0] for batch in batches}),
+            "failed_batches": 0,
+            "retries": 0,
+            "written": 0,
+        }
+        vectors_by_batch: dict[int, List[List[float]]] = {}
+        # Caps embedded-but-not-yet-upserted batches held in memory.
+        in_flight = threading.BoundedSemaphore(self.embed_workers + 2 * self.upsert_workers)
+
+        def upsert(records: list) -> None:
+            self._with_retries(
+                lambda: self.index.upsert(vectors=records, namespace=namespace),
+                f"Upsert of {len(records)} vectors into '{namespace}'",
+                stats,
+                lock,
+            )
+
+        def process(batch_index: int, start: int, end: int, upsert_pool: ThreadPoolExecutor):
+            try:
+                chunk = documents[start:end]
+                vectors = self._with_retries(
+                    lambda: self.embeddings.embed_documents([doc.page_content for doc in chunk]),
+                    f"Embedding batch {batch_index + 1}/{len(batches)}",
+                    stats,
+                    lock,
+                )
+                records = []
+                for doc_id, vector, doc in zip(ids[start:end], vectors, chunk):
+                    metadata = dict(doc.metadata)
+                    metadata[self.text_key] = doc.page_content
+                    records.append((doc_id, vector, metadata))
+                upserts = [
+                    upsert_pool.submit(upsert, records[offset:offset + self.upsert_batch_size])
+                    for offset in range(0, len(records), self.upsert_batch_size)
+                ]
+                for future in upserts:
+                    future.result()
+            except Exception as e:
+                with lock:
+                    stats["failed_batches"] += 1
+                click.secho(f"Batch {batch_index + 1}/{len(batches)} for '{namespace}' failed: {e}", fg="red")
+                return
+            finally:
+                in_flight.release()
+
+            if self.checkpoint:
+                self.checkpoint.mark_done(namespace, run_key, batch_index)
+            if on_batch_written:
+                on_batch_written(start, end)
+            with lock:
+                vectors_by_batch[batch_index] = vectors
+                stats["written"] += end - start
+                finished = len(vectors_by_batch) + stats["skipped_batches"]
+                elapsed = time.perf_counter() - started
+                rate = stats["written"] / elapsed if elapsed else 0.0
+            click.secho(f"   ...{namespace}: {finished}/{len(batches)} batches, {rate:.1f} docs/s", fg="cyan")
+
+        with ThreadPoolExecutor(max_workers=self.embed_workers, thread_name_prefix="ingest-embed") as embed_pool, \
+                ThreadPoolExecutor(max_workers=self.upsert_workers, thread_name_prefix="ingest-upsert") as upsert_pool:
+            futures = []
+            for batch_index, start, end in batches:
+                if batch_index in done:
+                    continue
+                in_flight.acquire()
+                futures.append(embed_pool.submit(process, batch_index, start, end, upsert_pool))
+            wait(futures)
+
+        if self.checkpoint and stats["failed_batches"] == 0:
+            self.checkpoint.clear(namespace)
+
+        seconds = time.perf_counter() - started
+        stats["seconds"] = round(seconds, 3)
+        stats["docs_per_second"] = round(stats["written"] / seconds, 1) if seconds else 0.0
+        vectors = [vector for batch_index in sorted(vectors_by_batch) for vector in vectors_by_batch[batch_index]]
+        return vectors, stats
+
+    def delete(self, ids: Sequence[str], namespace: str) -> List[str]:
+        """
+        Deletes vectors by id in chunks of `delete_batch_size`, with the same
+        retries as upserts. Returns the ids whose chunk was deleted; a chunk that
+        still fails is reported and left for the next run.
+        """
+        lock = threading.Lock()
+        stats = {"retries": 0}
+        deleted: List[str] = []
+        for offset in range(0, len(ids), self.delete_batch_size):
+            chunk = list(ids[offset:offset + self.delete_batch_size])
+            try:
+                self._with_retries(
+                    lambda: self.index.delete(ids=chunk, namespace=namespace),
+                    f"Delete of {len(chunk)} vectors from '{namespace}'",
+                    stats,
+                    lock,
+                )
+            except Exception as e:
+                click.secho(f"Deleting {len(chunk)} vectors from '{namespace}' failed: {e}", fg="red")
+                continue
+            deleted.extend(chunk)
+        return deleted
+
+    def update_metadata(self, updates: Dict[str, Dict[str, Any]], namespace: str) -> List[str]:
+        """
+        Sets metadata fields on existing vectors without re-embedding them, one
+        update per id with the same retries as upserts. Returns the ids that were
+        updated; one that still fails is reported and left for the next run.
+        """
+        lock = threading.Lock()
+        stats = {"retries": 0}
+        updated: List[str] = []
+        for vector_id, metadata in updates.items():
+            try:
+                self._with_retries(
+                    lambda: self.index.update(id=vector_id, set_metadata=metadata, namespace=namespace),
+                    f"Metadata update of '{vector_id}' in '{namespace}'",
+                    stats,
+                    lock,
+                )
+            except Exception as e:
+                click.secho(f"Updating metadata of '{vector_id}' in '{namespace}' failed: {e}", fg="red")
+                continue
+            updated.append(vector_id)
+        return updated
+
+    def fetch_vectors(self, ids: Sequence[str], namespace: str) -> Dict[str, List[float]]:
+        """
+        Stored embeddings of the given ids, fetched in chunks of `fetch_batch_size`.
+        Ids that are not in the index, or whose chunk still fails after retries,
+        are left out.
+        """
+        lock = threading.Lock()
+        stats = {"retries": 0}
+        found: Dict[str, List[float]] = {}
+        for offset in range(0, len(ids), self.fetch_batch_size):
+            chunk = list(ids[offset:offset + self.fetch_batch_size])
+            try:
+                response = self._with_retries(
+                    lambda: self.index.fetch(ids=chunk, namespace=namespace),
+                    f"Fetch of {len(chunk)} vectors from '{namespace}'",
+                    stats,
+                    lock,
+                )
+            except Exception as e:
+                click.secho(f"Fetching {len(chunk)} vectors from '{namespace}' failed: {e}", fg="red")
+                continue
+            for vector_id, vector in (getattr(response, "vectors", None) or {}).items():
+                found[vector_id] = list(vector.values)
+        return found
+
+    def list_ids(self, namespace: str) -> List[str]:
+        """Every vector id stored in the namespace (Pinecone yields them a page at a time)."""
+        return [vector_id for page in self.index.list(namespace=namespace) for vector_id in page]
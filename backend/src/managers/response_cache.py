@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Iterable, List, Optional
+
+import numpy as np
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+
+class SemanticResponseCache:
+    """
+    In-process cache of final chat answers keyed by query embedding.
+
+    Only user-independent turns belong here (no transcript, empty history); the
+    caller is responsible for that check. A lookup hits when the cosine
+    similarity to a stored query is at least `threshold` for the same model and
+    the same set of course codes: "prereqs for CMPSC 130A" and "... 130B" embed
+    almost identically but must not share an answer.
+    Entries expire after `ttl_seconds` and are dropped when any namespace their
+    answer was retrieved from is re-ingested.
+    """
+
+    def __init__(
+        self,
+        threshold: float = RESPONSE_CACHE_THRESHOLD,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        enabled: bool = RESPONSE_CACHE_ENABLED,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.counters: Counter = Counter()
+        self._entries: List[dict[str, Any]] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector: Iterable[float]) -> np.ndarray:
+        arr = np.asarray(list(vector), dtype=np.float32)
+        norm = float(np.linalg.norm(arr))
+        return arr / norm if norm else arr
+
+    def _evict_expired(self, now: float):
+        alive = [entry for entry in self._entries if now - entry["created_at"] < self.ttl_seconds]
+        if len(alive) != len(self._entries):
+            self.counters["expired"] += len(self._entries) - len(alive)
+            self._entries = alive
+            self._matrix = None
+
+    def _similarity_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.vstack([entry["vector"] for entry in self._entries])
+        return self._matrix
+
+    def lookup(self, query_vector: Iterable[float], model_name: str, course_codes: Iterable[str] = ()) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        query = self._unit(query_vector)
+        course_codes = frozenset(course_codes)
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            candidates = [
+                i for i, entry in enumerate(self._entries)
+                if entry["model_name"] == model_name
+                and entry["course_codes"] == course_codes
+                and entry["vector"].shape == query.shape
+            ]
+            if not candidates:
+                self.counters["misses"] += 1
+                return None
+
+            similarities = self._similarity_matrix()[candidates] @ query
+            best = int(np.argmax(similarities))
+            if float(similarities[best]) < self.threshold:
+                self.counters["misses"] += 1
+                return None
+
+            self.counters["hits"] += 1
+            return self._entries[candidates[best]]["answer"]
+
+    def store(
+        self,
+        query_vector: Iterable[float],
+        model_name: str,
+        answer: Any,
+        namespaces: Iterable[str],
+        course_codes: Iterable[str] = (),
+    ):
+        if not self.enabled:
+            return
+
+        entry = {
+            "vector": self._unit(query_vector),
+            "model_name": model_name,
+            "course_codes": frozenset(course_codes),
+            "answer": answer,
+            "namespaces": set(namespaces),
+            "created_at": time.monotonic(),
+        }
+        with self._lock:
+            self._entries.append(entry)
+            if len(self._entries) > self.max_entries:
+                # Oldest first: entries are appended in insertion order.
+                self._entries = self._entries[-self.max_entries:]
+            self._matrix = None
+
+    def invalidate_namespace(self, namespace: str) -> int:
+        """Drops every answer that was grounded in `namespace`. Returns how many were removed."""
+        with self._lock:
+            kept = [entry for entry in self._entries if namespace not in entry["namespaces"]]
+            removed = len(self._entries) - len(kept)
+            if removed:
+                self._entries = kept
+                self._matrix = None
+                self.counters["invalidated"] += removed
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters.get("hits", 0)
+            misses = self.counters.get("misses", 0)
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if (hits + misses) else 0.0,
+                "expired": self.counters.get("expired", 0),
+                "invalidated": self.counters.get("invalidated", 0),
+            }
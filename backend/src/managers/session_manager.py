@@ -1,19 +1,34 @@
 import json
 import os
 import sqlite3
+import threading
 import uuid
 from datetime import datetime
-from typing import List, Optional, Tuple
+from functools import wraps
+from typing import Any, List, Optional, Tuple
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 
 DB_PATH = os.getenv("SESSION_DB_PATH", "chat_history.db")
 
 
+def _locked(method):
+    """Serializes access to the sqlite connection, which the API shares across worker threads."""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class SessionManager:
     def __init__(self):
         self.conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        self._lock = threading.RLock()
         self.create_tables()
 
+    @_locked
     def create_tables(self):
         cursor = self.conn.cursor()
         # Table for Sessions
@@ -43,8 +58,23 @@ class SessionManager:
                 uploaded_at TIMESTAMP
             )
         ''')
+        # Advising context precomputed from the transcript, tagged with the prereq data version
+        transcript_columns = {row[1] for row in cursor.execute("PRAGMA table_info(transcripts)")}
+        for column in ("advising_context", "context_version"):
+            if column not in transcript_columns:
+                cursor.execute(f"ALTER TABLE transcripts ADD COLUMN {column} TEXT")
+        # Rolling summary of the oldest `summarized_count` messages of a session
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS session_summaries (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT,
+                summarized_count INTEGER,
+                updated_at TIMESTAMP
+            )
+        ''')
         self.conn.commit()
 
+    @_locked
     def create_session(self, name: str = None) -> str:
         """Creates a new chat session and returns its ID."""
         session_id = str(uuid.uuid4())
@@ -59,6 +89,7 @@ class SessionManager:
         self.conn.commit()
         return session_id
 
+    @_locked
     def get_recent_sessions(self, limit: int = 5) -> List[Tuple[str, str, str]]:
         """Returns the last N sessions (id, name, last_updated)."""
         cursor = self.conn.cursor()
@@ -68,6 +99,7 @@ class SessionManager:
         )
         return cursor.fetchall()
 
+    @_locked
     def save_message(self, session_id: str, role: str, content: str):
         """Saves a message to the database and updates session timestamp."""
         cursor = self.conn.cursor()
@@ -82,38 +114,151 @@ class SessionManager:
         )
         self.conn.commit()
 
-    def load_history(self, session_id: str) -> List[BaseMessage]:
-        """Loads all messages for a session as LangChain message objects."""
+    @_locked
+    def save_messages(self, session_id: str, messages: List[Tuple[str, str, datetime]]):
+        """Saves (role, content, timestamp) rows in one transaction and bumps the session timestamp."""
+        if not messages:
+            return
         cursor = self.conn.cursor()
+        cursor.executemany(
+            "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+            [(session_id, role, content, timestamp) for role, content, timestamp in messages]
+        )
         cursor.execute(
-            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id ASC",
-            (session_id,)
+            "UPDATE sessions SET last_updated = ? WHERE session_id = ?",
+            (datetime.now(), session_id)
+        )
+        self.conn.commit()
+
+    @_locked
+    def load_history(self, session_id: str, offset: int = 0, with_timestamps: bool = False) -> List[Any]:
+        """
+        Loads the messages for a session (skipping the first `offset`) as LangChain message objects,
+        or as (stored timestamp, message) pairs with with_timestamps=True.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT role, content, timestamp FROM messages WHERE session_id = ? ORDER BY id ASC LIMIT -1 OFFSET ?",
+            (session_id, offset)
         )
         rows = cursor.fetchall()
 
         history = []
-        for role, content in rows:
+        for role, content, timestamp in rows:
             if role == "human":
-                history.append(HumanMessage(content=content))
+                message = HumanMessage(content=content)
             elif role == "ai":
-                history.append(AIMessage(content=content))
+                message = AIMessage(content=content)
+            else:
+                continue
+            history.append((timestamp, message) if with_timestamps else message)
         return history
 
+    @_locked
+    def load_summarized_history(
+        self, session_id: str, with_timestamps: bool = False
+    ) -> Tuple[Optional[str], int, List[Any]]:
+        """Returns (rolling summary, number of messages it covers, messages not yet summarized)."""
+        summary, summarized_count = None, 0
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT summary, summarized_count FROM session_summaries WHERE session_id = ?",
+            (session_id,)
+        )
+        row = cursor.fetchone()
+        if row:
+            summary, summarized_count = row
+        return summary, summarized_count, self.load_history(
+            session_id, offset=summarized_count, with_timestamps=with_timestamps
+        )
+
+    @_locked
+    def save_summary(self, session_id: str, summary: str, expected_count: int, new_count: int) -> bool:
+        """
+        Replaces the rolling summary, but only if it still covers `expected_count` messages,
+        so two overlapping folds cannot overwrite each other. Returns whether it was saved.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO session_summaries (session_id, summary, summarized_count, updated_at)
+            SELECT ?, ?, ?, ?
+            WHERE COALESCE(
+                (SELECT summarized_count FROM session_summaries WHERE session_id = ?), 0
+            ) = ?
+            ON CONFLICT(session_id) DO UPDATE SET
+                summary = excluded.summary,
+                summarized_count = excluded.summarized_count,
+                updated_at = excluded.updated_at
+            """,
+            (session_id, summary, new_count, datetime.now(), session_id, expected_count)
+        )
+        self.conn.commit()
+        return cursor.rowcount > 0
+
+    @_locked
     def rename_session(self, session_id: str, new_name: str):
         """Updates the friendly name of a session."""
         cursor = self.conn.cursor()
         cursor.execute("UPDATE sessions SET name = ? WHERE session_id = ?", (new_name, session_id))
         self.conn.commit()
 
-    def save_transcript(self, session_id: str, data: dict):
-        """Stores parsed transcript JSON for a session, replacing any existing entry."""
+    @_locked
+    def save_transcript(
+        self,
+        session_id: str,
+        data: dict,
+        advising_context: Optional[dict] = None,
+        context_version: Optional[str] = None,
+    ):
+        """Stores parsed transcript JSON (and optionally its advising context) for a session, replacing any existing entry."""
         cursor = self.conn.cursor()
         cursor.execute(
-            "INSERT OR REPLACE INTO transcripts (session_id, data, uploaded_at) VALUES (?, ?, ?)",
-            (session_id, json.dumps(data), datetime.now())
+            "INSERT OR REPLACE INTO transcripts "
+            "(session_id, data, uploaded_at, advising_context, context_version) VALUES (?, ?, ?, ?, ?)",
+            (
+                session_id,
+                json.dumps(data),
+                datetime.now(),
+                json.dumps(advising_context) if advising_context is not None else None,
+                context_version,
+            )
         )
         self.conn.commit()
 
+    @_locked
+    def save_advising_context(self, session_id: str, advising_context: dict, context_version: str):
+        """Replaces the stored advising context of an existing transcript."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "UPDATE transcripts SET advising_context = ?, context_version = ? WHERE session_id = ?",
+            (json.dumps(advising_context), context_version, session_id)
+        )
+        self.conn.commit()
+
+    @_locked
+    def load_transcript_with_context(self, session_id: str) -> Optional[Tuple[dict, Optional[dict], Optional[str]]]:
+        """Returns (transcript, advising context, context version) for a session, or None if not uploaded."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT data, advising_context, context_version FROM transcripts WHERE session_id = ?",
+            (session_id,)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return None
+        data, advising_context, context_version = row
+        return json.loads(data), json.loads(advising_context) if advising_context else None, context_version
+
+    @_locked
+    def transcript_uploaded_at(self, session_id: str) -> Optional[str]:
+        """Upload timestamp of a session's transcript, or None if not uploaded; a primary-key read, cheap enough per turn."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT uploaded_at FROM transcripts WHERE session_id = ?", (session_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    @_locked
     def load_transcript(self, session_id: str) -> Optional[dict]:
         """Returns the parsed transcript dict for a session, or None if not uploaded."""
         cursor = self.conn.cursor()
@@ -123,6 +268,7 @@ class SessionManager:
             return json.loads(row[0])
         return None
 
+    @_locked
     def clear_transcript(self, session_id: str):
         """Wipes the transcript for a session (call on session end)."""
         cursor = self.conn.cursor()
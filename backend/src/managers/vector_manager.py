@@ -1,7 +1,10 @@
 import os
+import threading
 import time
 import json
-from typing import List, Any
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Tuple
 import hashlib
 
 import click
@@ -14,7 +17,18 @@ from langchain_core.documents import Document
 from pinecone import Pinecone, ServerlessSpec
 
 from src.llm.llmswap import getLLM
-from src.models.query_route import RouteQuery
+from src.managers.catalog_availability import (
+    CATALOG_SOURCE_PREFIX,
+    SEATS_AVAILABLE_FIELD,
+    CatalogAvailabilityStore,
+    catalog_key,
+    get_catalog_availability_store,
+)
+from src.managers.embedding_cache import CachedEmbeddings
+from src.managers.ingest_ledger import IngestLedger
+from src.managers.ingest_pipeline import IngestPipeline
+from src.models.query_route import RouteDecision, RouteQuery
+from src.services.namespace_router import NamespaceRouter
 
 load_dotenv()
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
@@ -22,6 +36,13 @@ GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-3-flash-preview")
 GEMINI_EMBEDDING_MODEL = os.getenv("GEMINI_EMBEDDING_MODEL", "models/gemini-embedding-001")
 GEMINI_EMBEDDING_DIMENSION = int(os.getenv("GEMINI_EMBEDDING_DIMENSION", "3072"))
 SCHEMA_FILE = os.getenv("SCHEMA_FILE", "namespace_schemas.json")
+PINECONE_TEXT_KEY = "text"
+VECTOR_SEARCH_WORKERS = int(os.getenv("VECTOR_SEARCH_WORKERS", "4"))
+# Metadata field scrapers set to a stable record key, e.g. "reddit:<post_id>".
+SOURCE_KEY_FIELD = "source_key"
+# Stale vectors are only deleted automatically when they are at most this share of
+# the incoming documents, so a partial scrape cannot wipe a namespace.
+INGEST_GC_MAX_STALE_FRACTION = float(os.getenv("INGEST_GC_MAX_STALE_FRACTION", "0.5"))
 
 
 def _normalize_text_content(content: Any) -> str:
@@ -40,11 +61,35 @@ def _normalize_text_content(content: Any) -> str:
     return str(content).strip()
 
 
+def document_id(doc: Document) -> str:
+    """
+    Vector id for a document: a hash of its source key when the scraper set one,
+    so an edited record keeps its id and is overwritten in place, otherwise a
+    hash of its content.
+    """
+    source_key = doc.metadata.get(SOURCE_KEY_FIELD)
+    raw = f"{SOURCE_KEY_FIELD}:{source_key}" if source_key else doc.page_content
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def document_hash(doc: Document) -> str:
+    """Change-detection hash over the content and metadata that get upserted."""
+    payload = json.dumps([doc.page_content, doc.metadata], sort_keys=True, default=str)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
 class VectorManager:
     def __init__(self, api_key):
         self.pc = Pinecone(api_key=api_key)
-        self.embeddings = GoogleGenerativeAIEmbeddings(model=GEMINI_EMBEDDING_MODEL)
+        # Cached so repeated questions and re-ingested text skip the embedding API.
+        self.embeddings = CachedEmbeddings(
+            GoogleGenerativeAIEmbeddings(model=GEMINI_EMBEDDING_MODEL),
+            model_name=GEMINI_EMBEDDING_MODEL,
+            dimension=GEMINI_EMBEDDING_DIMENSION,
+        )
         self.llm = getLLM(provider="gemini", model_name=GEMINI_MODEL_NAME, temperature=0)
+        self.router = NamespaceRouter()
+        self._search_pool = ThreadPoolExecutor(max_workers=VECTOR_SEARCH_WORKERS, thread_name_prefix="pinecone-search")
 
         existing_indexes = [i.name for i in self.pc.list_indexes()]
         if PINECONE_INDEX_NAME not in existing_indexes:
@@ -69,8 +114,100 @@ class VectorManager:
 
         self.vector_store = PineconeVectorStore(
             index_name=PINECONE_INDEX_NAME,
-            embedding=self.embeddings
+            embedding=self.embeddings,
+            text_key=PINECONE_TEXT_KEY,
         )
+        self._ingest_pipeline: IngestPipeline | None = None
+        self._ingest_ledger: IngestLedger | None = None
+        self._catalog_availability: CatalogAvailabilityStore | None = None
+        # Schema registry and compiled self-query retrievers, rebuilt only when SCHEMA_FILE changes.
+        self._schema_lock = threading.Lock()
+        self._schema_registry: dict = {}
+        self._schema_version: int | None = None
+        self._schema_stale = True
+        self._retrievers: Dict[Tuple[str, int], SelfQueryRetriever] = {}
+        self.retriever_counters: Counter = Counter()
+
+    @property
+    def ingest_pipeline(self) -> IngestPipeline:
+        # No batch checkpoint: the ingest ledger records every landed batch, so a
+        # re-run after a crash only gets the documents that did not land.
+        if self._ingest_pipeline is None:
+            self._ingest_pipeline = IngestPipeline(
+                self.embeddings,
+                self.vector_store.index,
+                text_key=PINECONE_TEXT_KEY,
+            )
+        return self._ingest_pipeline
+
+    @property
+    def ingest_ledger(self) -> IngestLedger:
+        if self._ingest_ledger is None:
+            self._ingest_ledger = IngestLedger()
+        return self._ingest_ledger
+
+    @property
+    def catalog_availability(self) -> CatalogAvailabilityStore:
+        if self._catalog_availability is None:
+            self._catalog_availability = get_catalog_availability_store()
+        return self._catalog_availability
+
+    def _join_live(self, documents: List[Document]) -> List[Document]:
+        """Adds current seat counts to catalog results; other results pass through untouched."""
+        if not any(catalog_key(doc) for doc in documents):
+            return documents
+        return self.catalog_availability.join(documents)
+
+    def _with_seats_available(self, documents: List[Document]) -> List[Document]:
+        """
+        Copies of the catalog documents stamped with the current seats_available
+        flag (True when there is no snapshot yet, so unknown courses are not
+        filtered out). Applied after hashing, so a flip never re-embeds a course.
+        """
+        keys = [catalog_key(doc) for doc in documents]
+        if not any(keys):
+            return documents
+        live = self.catalog_availability.lookup(key for key in keys if key)
+        stamped = []
+        for doc, key in zip(documents, keys):
+            if key is None:
+                stamped.append(doc)
+                continue
+            availability = live.get(key)
+            metadata = {**doc.metadata, SEATS_AVAILABLE_FIELD: availability is None or availability["remaining"] > 0}
+            stamped.append(Document(page_content=doc.page_content, metadata=metadata))
+        return stamped
+
+    def sync_availability_flags(self, namespace: str) -> int:
+        """
+        Pushes seats_available flags that flipped since the last sync to the
+        catalog vectors as metadata-only updates, so self-query can filter on open
+        seats at retrieval time without a re-embed or a write per course per
+        refresh. Courses not in the index yet are only marked synced; ingest_data
+        stamps their current flag. Returns how many vectors were updated.
+        """
+        flags = self.catalog_availability.changed_flags()
+        if not flags:
+            return 0
+        ids = [
+            document_id(Document(page_content="", metadata={SOURCE_KEY_FIELD: f"{CATALOG_SOURCE_PREFIX}{course_id}"}))
+            for _, course_id, _ in flags
+        ]
+        known = self.ingest_ledger.known_ids(namespace, ids)
+        updated = set(self.ingest_pipeline.update_metadata(
+            {doc_id: {SEATS_AVAILABLE_FIELD: flag} for doc_id, (_, _, flag) in zip(ids, flags) if doc_id in known},
+            namespace,
+        ))
+        self.catalog_availability.mark_flags_synced(
+            entry for doc_id, entry in zip(ids, flags) if doc_id not in known or doc_id in updated
+        )
+        schema_fields = {item["name"] for item in self._schema_registry_snapshot().get(namespace, [])}
+        if updated and SEATS_AVAILABLE_FIELD not in schema_fields:
+            # Vectors ingested before the flag existed are never re-ingested, so add the field here.
+            self._infer_and_save_schema(
+                [Document(page_content="", metadata={SEATS_AVAILABLE_FIELD: True})], namespace
+            )
+        return len(updated)
 
     def _generate_field_description(self, key: str, sample_value: Any) -> str:
         """
@@ -102,11 +239,16 @@ class VectorManager:
 
         for doc in documents:
             for key, value in doc.metadata.items():
+                # Bookkeeping only; not something a self-query should filter on.
+                if key == SOURCE_KEY_FIELD:
+                    continue
                 if key not in current_schema:
                     click.secho(f"   ...Detecting new field '{key}'. Generating description...", fg="cyan")
 
                     type_name = "string"
-                    if isinstance(value, float):
+                    if isinstance(value, bool):
+                        type_name = "boolean"
+                    elif isinstance(value, float):
                         type_name = "float"
                     elif isinstance(value, int):
                         type_name = "integer"
@@ -124,61 +266,207 @@ class VectorManager:
             registry[namespace] = list(current_schema.values())
             with open(SCHEMA_FILE, "w") as f:
                 json.dump(registry, f, indent=2)
+            # Don't rely on the mtime alone; a rewrite within its resolution would look unchanged.
+            self.invalidate_schema_cache()
             click.secho(f"Schema for '{namespace}' updated with AI descriptions.", fg="green")
         else:
             print(f"No new schema fields detected for {namespace}.")
 
-    def ingest_data(self, documents: List[Document], namespace: str):
+    def ingest_data(
+        self,
+        documents: List[Document],
+        namespace: str,
+        force: bool = False,
+        prune: bool | None = None,
+    ) -> dict | None:
+        """
+        Embeds and upserts the documents that are new or changed since the ingest
+        ledger last saw them (all of them with force=True) through the batched
+        ingest pipeline. Documents with a source key keep their vector id, so a
+        changed record overwrites its old vector.
+
+        Ledger ids missing from `documents` are stale. They are deleted once every
+        batch landed, unless there are more than INGEST_GC_MAX_STALE_FRACTION of
+        the incoming documents; prune=True always deletes them, prune=False never.
+        Returns the pipeline stats plus `unchanged` (skipped), `stale_ids` and
+        `deleted` (how many stale vectors were removed).
+
+        The router centroid follows the same diff: written embeddings are added,
+        and the stored embeddings they overwrote or that were deleted are subtracted.
+        """
         if not documents:
-            return
+            return None
+
+        ids = [document_id(doc) for doc in documents]
+        hashes = [document_hash(doc) for doc in documents]
+
+        pending, stale_ids = self.ingest_ledger.diff(namespace, ids, hashes, force=force)
+        new_documents = self._with_seats_available([documents[position] for position in pending])
+        new_ids = [ids[position] for position in pending]
+        new_hashes = [hashes[position] for position in pending]
+        unchanged = len(documents) - len(pending)
+        vectors: List[List[float]] = []
+        replaced: List[List[float]] = []
+
+        if not new_documents:
+            click.secho(f"All {len(documents)} documents for '{namespace}' are unchanged; nothing to embed.", fg="green")
+            stats = {"documents": 0, "failed_batches": 0}
+        else:
+            click.secho(
+                f"Embedding and storing {len(new_documents)} new or changed documents into Pinecone "
+                f"({unchanged} unchanged skipped)...",
+                fg="yellow",
+            )
+            self._infer_and_save_schema(new_documents, namespace)
+            # Embeddings about to be overwritten, so the centroid does not count those documents twice.
+            previous = self.ingest_pipeline.fetch_vectors(
+                sorted(self.ingest_ledger.known_ids(namespace, new_ids)), namespace
+            )
+            landed: List[str] = []
 
-        ids = []
-        for doc in documents:
-            content_bytes = doc.page_content.encode('utf-8')
-            doc_hash = hashlib.md5(content_bytes).hexdigest()
-            ids.append(doc_hash)
-        click.secho(f"Embedding and storing {len(documents)} reviews into Pinecone...", fg="yellow")
-        self._infer_and_save_schema(documents, namespace)
-        self.vector_store.add_documents(documents=documents,
-                                        ids=ids,
-                                        namespace=namespace)
-        click.secho("Ingestion Complete!", fg="green")
-
-    def route_query(self, query: str) -> str:
+            def on_batch_written(start: int, end: int):
+                self.ingest_ledger.record(namespace, new_ids[start:end], new_hashes[start:end])
+                landed.extend(new_ids[start:end])
+
+            vectors, stats = self.ingest_pipeline.run(
+                new_documents, new_ids, namespace, on_batch_written=on_batch_written
+            )
+            replaced = [previous[doc_id] for doc_id in landed if doc_id in previous]
+            if stats["failed_batches"]:
+                click.secho(
+                    f"Ingestion finished with {stats['failed_batches']} failed batch(es); "
+                    "re-run to embed the documents that did not land.",
+                    fg="red",
+                )
+            else:
+                click.secho("Ingestion Complete!", fg="green")
+            click.secho(
+                f"{stats['documents']} docs in {stats['seconds']:.1f}s ({stats['docs_per_second']} docs/s, "
+                f"{stats['retries']} retries)",
+                fg="cyan",
+            )
+
+        stats["unchanged"] = unchanged
+        stats["stale_ids"] = stale_ids
+        deleted, deleted_vectors = self._prune_stale(namespace, stale_ids, len(set(ids)), stats["failed_batches"], prune)
+        stats["deleted"] = len(deleted)
+        self.router.update_centroid(namespace, vectors, replaced + deleted_vectors)
+        return stats
+
+    def _prune_stale(
+        self, namespace: str, stale_ids: List[str], incoming: int, failed_batches: int, prune: bool | None
+    ) -> Tuple[List[str], List[List[float]]]:
+        """Deletes the stale ids unless guarded; returns (deleted ids, their stored embeddings)."""
+        if not stale_ids or prune is False:
+            return [], []
+        if prune is None:
+            if failed_batches:
+                click.secho(f"Keeping {len(stale_ids)} stale vector(s) in '{namespace}' until ingestion succeeds.", fg="yellow")
+                return [], []
+            if len(stale_ids) > INGEST_GC_MAX_STALE_FRACTION * incoming:
+                click.secho(
+                    f"{len(stale_ids)} vector(s) in '{namespace}' are missing from a scrape of {incoming} documents; "
+                    "not deleting them automatically (re-run with prune=True if the scrape was complete).",
+                    fg="yellow",
+                )
+                return [], []
+
+        previous = self.ingest_pipeline.fetch_vectors(stale_ids, namespace)
+        deleted = self.ingest_pipeline.delete(stale_ids, namespace)
+        self.ingest_ledger.forget(namespace, deleted)
+        click.secho(f"Deleted {len(deleted)} stale vector(s) from '{namespace}'.", fg="green")
+        return deleted, [previous[doc_id] for doc_id in deleted if doc_id in previous]
+
+    def sweep_orphans(self, namespace: str, dry_run: bool = False) -> List[str]:
+        """
+        Deletes vectors in the namespace that the ingest ledger has no row for,
+        e.g. ones written under content-hash ids before records had source keys.
+        Refuses to run against an empty ledger, which would match every vector.
+        Returns the orphaned ids (deleted unless dry_run).
+        """
+        known = self.ingest_ledger.hashes(namespace)
+        if not known:
+            click.secho(f"The ingest ledger has no rows for '{namespace}'; skipping orphan sweep.", fg="yellow")
+            return []
+
+        orphans = [vector_id for vector_id in self.ingest_pipeline.list_ids(namespace) if vector_id not in known]
+        if dry_run:
+            click.secho(f"{len(orphans)} orphaned vector(s) in '{namespace}' (dry run).", fg="yellow")
+            return orphans
+        deleted = self.ingest_pipeline.delete(orphans, namespace) if orphans else []
+        click.secho(f"Deleted {len(deleted)}/{len(orphans)} orphaned vector(s) from '{namespace}'.", fg="green")
+        return orphans
+
+    def _llm_route(self, query: str) -> RouteDecision:
         structured_llm = self.llm.with_structured_output(RouteQuery)
         try:
             result = structured_llm.invoke(query)
-            print(f"[namespace]: {result.namespace}")
-            return result.namespace
+            return RouteDecision(namespace=result.namespace, source="llm", confidence=1.0)
 
         except Exception as e:
             print(f"Routing failed ({e}), defaulting to Professor data.")
-            return "professor_data"
+            return RouteDecision(namespace="professor_data", source="default")
 
-    def search(self, query: str, k=5):
+    def route_query_with_decision(self, query: str, query_vector: List[float] | None = None) -> RouteDecision:
         """
-        Dynamically loads schema and performs self-querying search.
+        Routes locally (rules, then embedding centroids) and only asks the LLM
+        when the local router is not confident.
         """
-        namespace = self.route_query(query)
-
-        if not os.path.exists(SCHEMA_FILE):
-            return self.vector_store.similarity_search(query, k=k, namespace=namespace)
-
-        with open(SCHEMA_FILE, "r") as f:
-            registry = json.load(f)
-
+        decision = self.router.route(query, query_vector)
+        if decision is None:
+            decision = self._llm_route(query)
+        self.router.record(decision)
+        print(f"[namespace]: {decision.namespace} (via {decision.source}, confidence={decision.confidence:.2f})")
+        return decision
+
+    def route_query(self, query: str, query_vector: List[float] | None = None) -> str:
+        return self.route_query_with_decision(query, query_vector).namespace
+
+    def invalidate_schema_cache(self):
+        """Makes the next search re-read SCHEMA_FILE and rebuild its retrievers."""
+        with self._schema_lock:
+            self._schema_stale = True
+
+    def _schema_registry_snapshot(self) -> dict:
+        """SCHEMA_FILE's contents, re-read only when its mtime changes or after invalidate_schema_cache()."""
+        try:
+            version = os.stat(SCHEMA_FILE).st_mtime_ns
+        except FileNotFoundError:
+            version = None
+
+        with self._schema_lock:
+            if self._schema_stale or version != self._schema_version:
+                registry = {}
+                if version is not None:
+                    with open(SCHEMA_FILE, "r") as f:
+                        registry = json.load(f)
+                self._schema_registry = registry
+                self._schema_version = version
+                self._schema_stale = False
+                self._retrievers.clear()
+                self.retriever_counters["schema_loads"] += 1
+            return self._schema_registry
+
+    def _self_query_retriever(self, namespace: str, k: int) -> SelfQueryRetriever | None:
+        """The compiled retriever for (namespace, k), or None when the namespace has no schema."""
+        registry = self._schema_registry_snapshot()
         if namespace not in registry:
-            return self.vector_store.similarity_search(query, k=k, namespace=namespace)
+            return None
+
+        with self._schema_lock:
+            retriever = self._retrievers.get((namespace, k))
+            if retriever is not None:
+                self.retriever_counters["hits"] += 1
+                return retriever
+            self.retriever_counters["misses"] += 1
 
-        schema_data = registry[namespace]
         metadata_field_info = [
             AttributeInfo(
                 name=item["name"],
                 description=item["description"],
                 type=item["type"]
-            ) for item in schema_data
+            ) for item in registry[namespace]
         ]
-
         retriever = SelfQueryRetriever.from_llm(
             llm=self.llm,
             vectorstore=self.vector_store,
@@ -188,26 +476,133 @@ class VectorManager:
             search_kwargs={"namespace": namespace, "k": k}
         )
 
+        with self._schema_lock:
+            # Only keep it if the schema was not reloaded while it was being built.
+            if registry is self._schema_registry:
+                self._retrievers[(namespace, k)] = retriever
+        return retriever
+
+    def search(self, query: str, k=5):
+        """
+        Performs self-querying search with the namespace's cached retriever, or a
+        plain similarity search when the namespace has no schema yet.
+        """
+        namespace = self.route_query(query)
+
+        retriever = self._self_query_retriever(namespace, k)
+        if retriever is None:
+            return self._join_live(self.vector_store.similarity_search(query, k=k, namespace=namespace))
+
         try:
-            return retriever.invoke(query)
+            return self._join_live(retriever.invoke(query))
         except Exception as e:
             click.secho(f"Self-query failed, falling back to basic search: {e}", fg="red")
-            return self.vector_store.similarity_search(query, k=k, namespace=namespace)
+            return self._join_live(self.vector_store.similarity_search(query, k=k, namespace=namespace))
 
     def std_search(self, query: str, k=5):
         """
         Performs standard similarity search within a routed namespace.
         """
-        namespace = self.route_query(query)
+        query_vector = self.embeddings.embed_query(query)
+        namespace = self.route_query(query, query_vector)
 
         try:
-            results = self.vector_store.similarity_search(
-                query=query,
+            results = self.vector_store.similarity_search_by_vector(
+                query_vector,
                 k=k,
                 namespace=namespace
             )
-            return results
+            return self._join_live(results)
 
         except Exception as e:
             click.secho(f"Search in namespace '{namespace}' failed: {e}", fg="red")
-            return self.vector_store.similarity_search(query, k=k)
+            return self._join_live(self.vector_store.similarity_search_by_vector(query_vector, k=k))
+
+    def _submit_search(self, query_vector: List[float], k: int, namespace: str, timings: Dict[str, float] | None):
+        def run():
+            started = time.perf_counter()
+            try:
+                return self._join_live(
+                    self.vector_store.similarity_search_by_vector(query_vector, k=k, namespace=namespace)
+                )
+            finally:
+                if timings is not None:
+                    timings[f"search:{namespace}"] = round((time.perf_counter() - started) * 1000, 1)
+
+        return self._search_pool.submit(run)
+
+    @staticmethod
+    def _collect(futures: Dict[str, Any]) -> Dict[str, List[Document]]:
+        results: Dict[str, List[Document]] = {}
+        for namespace, future in futures.items():
+            try:
+                results[namespace] = future.result()
+            except Exception as e:
+                click.secho(f"Search in namespace '{namespace}' failed: {e}", fg="red")
+                results[namespace] = []
+        return results
+
+    def multi_search(
+        self,
+        query: str,
+        namespaces: Dict[str, int],
+        query_vector: List[float] | None = None,
+        timings: Dict[str, float] | None = None,
+    ) -> Dict[str, List[Document]]:
+        """
+        Embeds the query once and runs similarity_search_by_vector against every
+        namespace concurrently. namespaces maps namespace -> k. A failing namespace
+        yields an empty list instead of failing the whole search.
+        """
+        if not namespaces:
+            return {}
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+
+        return self._collect({
+            namespace: self._submit_search(query_vector, k, namespace, timings)
+            for namespace, k in namespaces.items()
+        })
+
+    def routed_multi_search(
+        self,
+        query: str,
+        k: int = 4,
+        extra_namespaces: Dict[str, int] | None = None,
+        query_vector: List[float] | None = None,
+        timings: Dict[str, float] | None = None,
+    ) -> Tuple[str, Dict[str, List[Document]]]:
+        """
+        One embedding call for a whole chat turn. The extra namespace searches do not
+        depend on routing, so they are started before the query is routed and run
+        while routing (possibly an LLM call) is in flight; the routed namespace search
+        (k results) starts as soon as routing returns. Like std_search, a failed routed
+        search falls back to the whole index. When `timings` is given it is filled with
+        per-branch latencies in milliseconds.
+        Returns (routed_namespace, results grouped by namespace).
+        """
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+
+        extra_namespaces = extra_namespaces or {}
+        futures = {
+            extra_namespace: self._submit_search(query_vector, extra_k, extra_namespace, timings)
+            for extra_namespace, extra_k in extra_namespaces.items()
+        }
+
+        started = time.perf_counter()
+        namespace = self.route_query(query, query_vector)
+        if timings is not None:
+            timings["route"] = round((time.perf_counter() - started) * 1000, 1)
+
+        # Reuse an extra search of the routed namespace only if it already asked for enough results.
+        if extra_namespaces.get(namespace, 0) < k:
+            futures[namespace] = self._submit_search(query_vector, k, namespace, timings)
+
+        results = self._collect(futures)
+        if futures[namespace].exception() is not None:
+            try:
+                results[namespace] = self._join_live(self.vector_store.similarity_search_by_vector(query_vector, k=k))
+            except Exception as e:
+                click.secho(f"Fallback search across all namespaces failed: {e}", fg="red")
+        return namespace, results
@@ -11,3 +11,10 @@ class RouteQuery(BaseModel):
             "reddit_class_data for course-specific student experiences/discussion."
         )
     )
+
+
+class RouteDecision(BaseModel):
+    """Outcome of namespace routing, including which router produced it."""
+    namespace: Literal["professor_data", "school_reviews", "reddit_class_data"]
+    source: Literal["rules", "centroid", "llm", "default"]
+    confidence: float = 0.0
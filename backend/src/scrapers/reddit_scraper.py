@@ -169,6 +169,7 @@ def fetch_reddit_docs_for_course(
                         "subreddit": subreddit,
                         "course_code": course_code,
                         "post_id": post_id,
+                        "source_key": f"reddit:{post_id}",
                         "permalink": full_permalink,
                         "score": score,
                         "num_comments": num_comments,
@@ -221,6 +221,8 @@ def get_school_reviews(school_ql_id: str) -> list:
                 metadata={
                     "date": node.get("date"),
                     "source": "ratemyprofessors",
+                    # Stable vector id across re-scrapes; see VectorManager.ingest_data.
+                    "source_key": f"rmp-review:{node.get('legacyId') or node.get('id')}",
                 }
             )
             all_reviews.append(doc)
@@ -537,6 +539,7 @@ def get_school_professors(school_ql_id: str) -> list:
                     "would_take_again_percentage": node.get('wouldTakeAgainPercent'),
                     "department": node.get('department'),
                     "source": "ratemyprofessors",
+                    "source_key": f"rmp-professor:{node.get('legacyId') or node.get('id')}",
                 }
             )
             if RMP_VALIDATE_PROFESSOR_ACTIVITY:
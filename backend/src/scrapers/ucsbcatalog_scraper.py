@@ -41,10 +41,16 @@ class UCSBCatalogClient:
         return f"{year}{quarter}"
 
     @staticmethod
-    def _format_class_data(course: dict) -> str:
+    def _normalize_course_id(course_id: str | None) -> str:
+        """The API pads course ids ("CMPSC     8"); collapse them to "CMPSC 8"."""
+        return " ".join((course_id or "").split())
+
+    @staticmethod
+    def _format_class_data(course: dict, include_enrollment: bool = True) -> str:
         """
         Helper function to flatten nested class JSON into a coherent RAG-friendly string.
-        Safely handles null/None values from the API.
+        Safely handles null/None values from the API. include_enrollment=False leaves
+        out the seat counts, which change hourly, so the text stays the same all quarter.
         """
         course_id = (course.get("courseId") or "").strip()
         title = (course.get("title") or "").strip()
@@ -85,7 +91,10 @@ class UCSBCatalogClient:
 
                 time_str = " | ".join(time_locs) if time_locs else "TBA"
 
-                rag_text += f"  - Section: {section_id} (Code: {enroll_code}) | Instructor(s): {instructor_str} | Schedule: {time_str} | Capacity: {enrolled}/{max_enroll} Enrolled\n"
+                rag_text += f"  - Section: {section_id} (Code: {enroll_code}) | Instructor(s): {instructor_str} | Schedule: {time_str}"
+                if include_enrollment:
+                    rag_text += f" | Capacity: {enrolled}/{max_enroll} Enrolled"
+                rag_text += "\n"
 
         return rag_text.strip()
 
@@ -98,12 +107,9 @@ class UCSBCatalogClient:
             return self._format_class_data(response.json())
         return f"Failed to fetch class. Status: {response.status_code}, Response: {response.text}"
 
-    def get_all_classes_by_dept(self, dept_code: str = "") -> List[Document]:
-        """2) GET /v3/classes/search -> Converted to Langchain Documents (Paginated)"""
+    def _iter_classes(self, quarter: str, dept_code: str = ""):
+        """Pages through GET /v3/classes/search, yielding raw class dicts."""
         url = f"{self.base_url}/v3/classes/search"
-        quarter = self._get_current_quarter_id()
-        documents = []
-
         page_number = 1
         page_size = 100
 
@@ -136,39 +142,90 @@ class UCSBCatalogClient:
             if not classes:
                 break
 
-            for course in classes:
-                total_enrolled = 0
-                total_max = 0
-                for sec in course.get("classSections", []):
-                    enrolled = sec.get("enrolledTotal")
-                    max_cap = sec.get("maxEnroll")
+            yield from classes
 
-                    total_enrolled += (enrolled if enrolled is not None else 0)
-                    total_max += (max_cap if max_cap is not None else 0)
+            if len(classes) < page_size:
+                break
 
-                remaining_availability = max(0, total_max - total_enrolled)
+            page_number += 1
 
-                course_id = course.get("courseId", "").strip()
-                title = course.get("title", "").strip()
-                course_name = f"{course_id} - {title}"
+    def get_all_classes_by_dept(self, dept_code: str = "") -> List[Document]:
+        """
+        2) GET /v3/classes/search -> Converted to Langchain Documents (Paginated)
 
-                page_content = self._format_class_data(course)
-                doc = Document(
-                    page_content=page_content,
-                    metadata={
-                        "course_name": course_name,
-                        "remaining_total_availability": remaining_availability
-                    }
-                )
-                documents.append(doc)
+        Only the static course text (description, sections, instructors, times) is
+        embedded; it changes about once a quarter, so re-ingesting it is mostly
+        skipped by the ingest ledger. Seat counts come from get_enrollment_snapshot()
+        and are joined in at query time by CatalogAvailabilityStore.
 
-            if len(classes) < page_size:
-                break
+        The source key leaves out the quarter, so at the quarter rollover each
+        course overwrites last quarter's vector instead of leaving it stale.
+        """
+        quarter = self._get_current_quarter_id()
+        documents = []
 
-            page_number += 1
+        for course in self._iter_classes(quarter, dept_code):
+            course_id = self._normalize_course_id(course.get("courseId"))
+            title = (course.get("title") or "").strip()
+            course_name = f"{course_id} - {title}"
+
+            page_content = self._format_class_data(course, include_enrollment=False)
+            doc = Document(
+                page_content=page_content,
+                metadata={
+                    "course_name": course_name,
+                    "course_id": course_id,
+                    "quarter": quarter,
+                    "source_key": f"catalog:{course_id}",
+                }
+            )
+            documents.append(doc)
 
         return documents
 
+    def get_enrollment_snapshot(self, dept_code: str = "", quarter: str | None = None) -> List[Dict[str, Any]]:
+        """
+        Current seat counts per course from GET /v3/classspaceavailability/{quarter},
+        a much smaller payload than the class search. Rows are
+        {quarter, course_id, enrolled, max_enroll, remaining, sections}; courses
+        outside `dept_code` are dropped when it is given.
+        """
+        quarter = quarter or self._get_current_quarter_id()
+        url = f"{self.base_url}/v3/classspaceavailability/{quarter}"
+        response = self.session.get(url)
+
+        if response.status_code != 200:
+            print(f"Failed to fetch space availability. Status: {response.status_code}, Response: {response.text}")
+            return []
+
+        rows = []
+        for space in response.json().get("classSpaces", []):
+            course_id = self._normalize_course_id(space.get("courseId"))
+            if not course_id or (dept_code and course_id.rsplit(" ", 1)[0] != self._normalize_course_id(dept_code).upper()):
+                continue
+
+            sections = []
+            for avail in space.get("classSpaceAvailabilities", []):
+                sections.append({
+                    "section": (avail.get("section") or "").strip(),
+                    "enroll_code": (avail.get("enrollCode") or "").strip(),
+                    "enrolled": avail.get("enrolledTotal") or 0,
+                    "max_enroll": avail.get("maxEnroll") or 0,
+                })
+
+            enrolled = sum(sec["enrolled"] for sec in sections)
+            max_enroll = sum(sec["max_enroll"] for sec in sections)
+            rows.append({
+                "quarter": quarter,
+                "course_id": course_id,
+                "enrolled": enrolled,
+                "max_enroll": max_enroll,
+                "remaining": max(0, max_enroll - enrolled),
+                "sections": sections,
+            })
+
+        return rows
+
     def get_class_section(self, quarter: str, enrollcode: str) -> str:
         """3) GET /v3/classsection/{quarter}/{enrollcode}"""
         url = f"{self.base_url}/v3/classsection/{quarter}/{enrollcode}"
@@ -0,0 +1,124 @@
+import os
+from typing import Any, List, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "3000"))
+CHAT_HISTORY_KEEP_TURNS = int(os.getenv("CHAT_HISTORY_KEEP_TURNS", "4"))
+# Older messages are folded into the summary only once at least this many are pending,
+# so the summarizer runs every few turns instead of on every turn.
+CHAT_SUMMARY_FOLD_MESSAGES = int(os.getenv("CHAT_SUMMARY_FOLD_MESSAGES", "4"))
+CHAT_SUMMARY_MAX_WORDS = int(os.getenv("CHAT_SUMMARY_MAX_WORDS", "200"))
+
+SUMMARY_PREFIX = "SUMMARY OF EARLIER CONVERSATION:\n"
+
+
+def estimate_tokens(text: Any) -> int:
+    """Cheap token estimate (~4 characters per token); good enough for budgeting."""
+    return (len(str(text or "")) + 3) // 4
+
+
+def split_history(
+    messages: Sequence[BaseMessage],
+    summary: str | None = None,
+    keep_turns: int = CHAT_HISTORY_KEEP_TURNS,
+    token_budget: int = CHAT_HISTORY_TOKEN_BUDGET,
+) -> tuple[List[BaseMessage], List[BaseMessage]]:
+    """
+    Splits not-yet-summarized messages into (older, window).
+
+    The window is the newest messages, at most keep_turns human/ai pairs, that fit
+    in token_budget after the summary. Everything before it is `older` and is
+    what should be folded into the summary next.
+    """
+    remaining = token_budget - estimate_tokens(summary)
+    start = len(messages)
+    for message in reversed(messages[-keep_turns * 2:] if keep_turns > 0 else []):
+        cost = estimate_tokens(message.content)
+        if cost > remaining:
+            break
+        remaining -= cost
+        start -= 1
+    return list(messages[:start]), list(messages[start:])
+
+
+def build_history_messages(
+    summary: str | None,
+    window: Sequence[BaseMessage],
+    pending: Sequence[BaseMessage] = (),
+) -> List[BaseMessage]:
+    """
+    History as sent to the model: the rolling summary (if any), then `pending`
+    (older messages no fold has covered yet), then the verbatim window. Passing
+    the pending messages keeps every turn in the prompt while a fold is below its
+    threshold or still queued behind the turn's writes.
+    """
+    out: List[BaseMessage] = []
+    if summary:
+        out.append(SystemMessage(content=SUMMARY_PREFIX + summary))
+    out.extend(pending)
+    out.extend(window)
+    return out
+
+
+def _format_messages(messages: Sequence[BaseMessage]) -> str:
+    lines = []
+    for message in messages:
+        role = "Student" if isinstance(message, HumanMessage) else "Advisor"
+        lines.append(f"{role}: {message.content}")
+    return "\n".join(lines)
+
+
+def fold_summary(llm, previous_summary: str | None, messages: Sequence[BaseMessage]) -> str:
+    """Returns previous_summary updated with `messages` only; the rest of the history is not re-read."""
+    prompt = (
+        "You maintain a running summary of a UCSB academic advising chat.\n"
+        f"Update the summary with the new messages. Keep it under {CHAT_SUMMARY_MAX_WORDS} words and keep "
+        "concrete facts: courses taken or planned, preferences, constraints, and advice already given.\n"
+        "Return ONLY the updated summary.\n\n"
+        f"CURRENT SUMMARY:\n{previous_summary or '(none)'}\n\n"
+        f"NEW MESSAGES:\n{_format_messages(messages)}"
+    )
+    response = llm.invoke(prompt)
+    content = response.content
+    if isinstance(content, list):
+        content = "\n".join(
+            item.get("text", "") if isinstance(item, dict) else str(item) for item in content
+        )
+    return str(content).strip()
+
+
+def fold_session_history(
+    session_manager,
+    llm,
+    session_id: str,
+    previous_summary: str | None,
+    summarized_count: int,
+    messages: Sequence[BaseMessage],
+) -> bool:
+    """
+    Folds `messages` (the oldest unsummarized ones) into the stored summary.
+    Returns False when another fold for the session got there first.
+    """
+    try:
+        summary = fold_summary(llm, previous_summary, messages)
+    except Exception as e:
+        print(f"History summary failed for session {session_id}: {e}")
+        return False
+    if not summary:
+        return False
+    return session_manager.save_summary(session_id, summary, summarized_count, summarized_count + len(messages))
+
+
+def pending_fold(
+    unsummarized: Sequence[BaseMessage],
+    summary: str | None,
+    min_messages: int = CHAT_SUMMARY_FOLD_MESSAGES,
+) -> List[BaseMessage]:
+    """Messages that should be folded now, or [] while fewer than min_messages are pending."""
+    older, _ = split_history(unsummarized, summary)
+    return older if len(older) >= min_messages else []
+
+
+def turn_messages(user_text: str, ai_text: str) -> List[BaseMessage]:
+    return [HumanMessage(content=user_text), AIMessage(content=ai_text)]
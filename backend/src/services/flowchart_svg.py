@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import urlencode
+from xml.sax.saxutils import escape
+
+FLOWCHART_SVG_DIR = Path(os.getenv("FLOWCHART_SVG_DIR", "flowchart_svgs"))
+# Rendered files kept on disk; the least recently used ones (by mtime) are removed past this.
+FLOWCHART_SVG_MAX_FILES = int(os.getenv("FLOWCHART_SVG_MAX_FILES", "2000"))
+# Prefix for image URLs handed to the frontend, e.g. "https://api.example.com"; empty keeps them relative.
+PUBLIC_API_BASE_URL = os.getenv("PUBLIC_API_BASE_URL", "").rstrip("/")
+# Bump when the drawing changes so old files are not served for new layouts.
+RENDERER_VERSION = "1"
+
+NODE_HEIGHT = 36
+NODE_MIN_WIDTH = 84
+CHAR_WIDTH = 7.4
+H_GAP = 24
+V_GAP = 64
+MARGIN = 20
+
+_GRAPH_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def graph_hash(tiers: list[list[str]], edges: Iterable[tuple[str, str]], highlighted: Iterable[str] = ()) -> str:
+    payload = json.dumps(
+        [RENDERER_VERSION, tiers, sorted(map(list, edges)), sorted(highlighted)],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _node_width(label: str) -> float:
+    return max(NODE_MIN_WIDTH, len(label) * CHAR_WIDTH + 24)
+
+
+def _order_rows(tiers: list[list[str]], edges: list[tuple[str, str]]) -> list[list[str]]:
+    """One top-down barycenter sweep: each row follows the mean position of its parents above."""
+    parents: dict[str, list[str]] = {}
+    for source, target in edges:
+        parents.setdefault(target, []).append(source)
+
+    position: dict[str, float] = {}
+    rows = []
+    for tier in tiers:
+        keyed = []
+        for index, course in enumerate(tier):
+            placed = [position[parent] for parent in parents.get(course, ()) if parent in position]
+            keyed.append((sum(placed) / len(placed) if placed else float(index), index, course))
+        row = [course for _, _, course in sorted(keyed)]
+        for index, course in enumerate(row):
+            position[course] = index - (len(row) - 1) / 2
+        rows.append(row)
+    return rows
+
+
+def render_flowchart_svg(
+    tiers: list[list[str]],
+    edges: Iterable[tuple[str, str]],
+    highlighted: Iterable[str] = (),
+) -> str:
+    """
+    Draws tiers as top-to-bottom rows of boxes with an arrow per prerequisite edge.
+    Courses in `highlighted` (eligible now) are filled green.
+    """
+    edges = [edge for edge in edges]
+    highlighted = set(highlighted)
+    rows = _order_rows(tiers, edges)
+
+    row_widths = [sum(_node_width(course) for course in row) + H_GAP * max(len(row) - 1, 0) for row in rows]
+    width = max(row_widths, default=0) + 2 * MARGIN
+    height = len(rows) * NODE_HEIGHT + max(len(rows) - 1, 0) * V_GAP + 2 * MARGIN
+
+    boxes: dict[str, tuple[float, float, float]] = {}
+    for row_index, (row, row_width) in enumerate(zip(rows, row_widths)):
+        x = (width - row_width) / 2
+        y = MARGIN + row_index * (NODE_HEIGHT + V_GAP)
+        for course in row:
+            node_width = _node_width(course)
+            boxes[course] = (x, y, node_width)
+            x += node_width + H_GAP
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+        f'viewBox="0 0 {width:.0f} {height:.0f}" font-family="Helvetica, Arial, sans-serif" font-size="13">',
+        '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="7" markerHeight="7" '
+        'orient="auto-start-reverse"><path d="M0,0 L10,5 L0,10 z" fill="#64748b"/></marker></defs>',
+        '<rect width="100%" height="100%" fill="#ffffff"/>',
+        '<g fill="none" stroke="#94a3b8" stroke-width="1.4">',
+    ]
+    for source, target in edges:
+        if source not in boxes or target not in boxes:
+            continue
+        sx, sy, sw = boxes[source]
+        tx, ty, tw = boxes[target]
+        x1, y1 = sx + sw / 2, sy + NODE_HEIGHT
+        x2, y2 = tx + tw / 2, ty
+        bend = (y2 - y1) / 2
+        parts.append(
+            f'<path d="M{x1:.1f},{y1:.1f} C{x1:.1f},{y1 + bend:.1f} {x2:.1f},{y2 - bend:.1f} {x2:.1f},{y2:.1f}" '
+            f'marker-end="url(#arrow)"/>'
+        )
+    parts.append("</g>")
+
+    for course, (x, y, node_width) in boxes.items():
+        fill, stroke = ("#dcfce7", "#16a34a") if course in highlighted else ("#eef2ff", "#6366f1")
+        parts.append(
+            f'<g><rect x="{x:.1f}" y="{y:.1f}" width="{node_width:.1f}" height="{NODE_HEIGHT}" rx="6" '
+            f'fill="{fill}" stroke="{stroke}"/>'
+            f'<text x="{x + node_width / 2:.1f}" y="{y + NODE_HEIGHT / 2 + 4.5:.1f}" text-anchor="middle" '
+            f'fill="#0f172a">{escape(course)}</text></g>'
+        )
+    parts.append("</svg>")
+    return "\n".join(parts) + "\n"
+
+
+def svg_path(digest: str, directory: Path | None = None) -> Path | None:
+    """Cached file for a graph hash, or None for anything that is not a hash (no path tricks)."""
+    if not isinstance(digest, str) or not _GRAPH_HASH_RE.match(digest):
+        return None
+    return (directory or FLOWCHART_SVG_DIR) / f"{digest}.svg"
+
+
+def _evict_old_svgs(directory: Path, max_files: int, keep: Path):
+    """Deletes the oldest files (by mtime) so at most max_files remain, never `keep`."""
+    files = []
+    for path in directory.glob("*.svg"):
+        if path == keep:
+            continue
+        try:
+            files.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    files.sort()
+    for _, path in files[:max(len(files) + 1 - max_files, 0)]:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def write_flowchart_svg(
+    tiers: list[list[str]],
+    edges: Iterable[tuple[str, str]],
+    highlighted: Iterable[str] = (),
+    directory: Path | None = None,
+    max_files: int | None = None,
+) -> str:
+    """
+    Renders the graph to the disk cache unless that layout is already there; returns its hash.
+    A cache hit refreshes the file's mtime, and a new file evicts the oldest ones
+    past FLOWCHART_SVG_MAX_FILES.
+    """
+    edges, highlighted = list(edges), list(highlighted)
+    digest = graph_hash(tiers, edges, highlighted)
+    path = svg_path(digest, directory)
+    if path.exists():
+        try:
+            os.utime(path)
+            return digest
+        except FileNotFoundError:
+            pass  # Evicted between the check and the touch; render it again.
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write-then-rename so a concurrent reader never sees a half-written file.
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(render_flowchart_svg(tiers, edges, highlighted))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _evict_old_svgs(path.parent, FLOWCHART_SVG_MAX_FILES if max_files is None else max_files, keep=path)
+    return digest
+
+
+def flowchart_svg_url(digest: str) -> str:
+    return f"{PUBLIC_API_BASE_URL}/transcript/flowchart.svg?graph={digest}"
+
+
+def remaining_path_svg_url(completed: Iterable[str]) -> str:
+    """
+    URL that re-renders the remaining-path graph from the completed courses on a cache miss.
+    Use this for links that outlive the on-disk SVG, e.g. chat answers persisted to history.
+    """
+    query = urlencode([("completed", code) for code in completed])
+    return f"{PUBLIC_API_BASE_URL}/transcript/flowchart.svg" + (f"?{query}" if query else "")
@@ -0,0 +1,216 @@
+import json
+import math
+import operator
+import os
+import re
+import threading
+from collections import Counter
+from typing import Iterable, Sequence, get_args
+
+from src.models.query_route import RouteDecision, RouteQuery
+
+ROUTER_CENTROIDS_FILE = os.getenv("ROUTER_CENTROIDS_FILE", "namespace_centroids.json")
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.55"))
+ROUTER_CENTROID_MARGIN = float(os.getenv("ROUTER_CENTROID_MARGIN", "0.03"))
+
+ROUTABLE_NAMESPACES: tuple[str, ...] = get_args(RouteQuery.model_fields["namespace"].annotation)
+
+_COURSE_SUBJECTS = (
+    "cmpsc|cs|math|pstat|ece|engr|econ|phys|chem|mcdb|eemb|psy|comm|writ|geog|hist|phil|soc|"
+    "anth|pols|ling|engl|mus|mat|ccs|tmp|actg|glob|span|ger|jpn|chin"
+)
+# Subjects that are also everyday words ("me 2", "art 1") only count in upper case.
+_UPPERCASE_COURSE_SUBJECTS = "ART|ES|ME|FR"
+
+# (pattern, namespace, weight). Weights only matter relative to each other.
+_RULES: list[tuple[re.Pattern, str, float]] = [
+    (
+        re.compile(rf"\b(?:(?i:{_COURSE_SUBJECTS})|{_UPPERCASE_COURSE_SUBJECTS})\s?-?\d{{1,3}}[A-Za-z]{{0,2}}\b"),
+        "reddit_class_data",
+        3.0,
+    ),
+    (
+        re.compile(
+            r"\b(?:class(?:es)?|courses?|midterms?|finals?|exams?|homework|hw|lectures?|sections?|"
+            r"curve[sd]?|workload|syllabus|grading|upper[- ]div|lower[- ]div|prereqs?)\b",
+            re.IGNORECASE,
+        ),
+        "reddit_class_data",
+        1.0,
+    ),
+    (
+        re.compile(
+            r"\b(?:prof|profs|professors?|instructors?|lecturers?|teach(?:es|ing|er|ers)?|taught|"
+            r"rmp|rate ?my ?prof(?:essor)?s?|dr\.?)\b",
+            re.IGNORECASE,
+        ),
+        "professor_data",
+        4.0,
+    ),
+    (
+        re.compile(
+            r"\b(?:campus|dorms?|housing|dining|food|safety|safe|social|party|parties|isla vista|iv|"
+            r"library|clubs?|internet|wifi|facilities|happiness|happy|location|opportunit(?:y|ies)|"
+            r"reputation|student life|vibes?)\b",
+            re.IGNORECASE,
+        ),
+        "school_reviews",
+        2.0,
+    ),
+]
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+def _unit(vector: Sequence[float]) -> list[float]:
+    norm = math.sqrt(_dot(vector, vector))
+    if norm == 0:
+        return list(vector)
+    return [v / norm for v in vector]
+
+
+class NamespaceRouter:
+    """
+    Local replacement for the structured-output LLM router.
+
+    Routing runs in two cheap stages:
+      1) keyword/course-code rules over the query text;
+      2) cosine similarity between the query embedding and a per-namespace
+         centroid of everything ingested into that namespace.
+    route() returns None when neither stage is confident, so the caller can
+    fall back to the LLM. stats counts which path served each query.
+    """
+
+    def __init__(
+        self,
+        centroids_path: str = ROUTER_CENTROIDS_FILE,
+        confidence_threshold: float = ROUTER_CONFIDENCE_THRESHOLD,
+        centroid_margin: float = ROUTER_CENTROID_MARGIN,
+    ):
+        self.centroids_path = centroids_path
+        self.confidence_threshold = confidence_threshold
+        self.centroid_margin = centroid_margin
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        self._sums: dict[str, list[float]] = {}
+        self._counts: dict[str, int] = {}
+        self._unit_centroids: dict[str, list[float]] = {}
+        self._load_centroids()
+
+    def _load_centroids(self):
+        if not self.centroids_path or not os.path.exists(self.centroids_path):
+            return
+        try:
+            with open(self.centroids_path, "r") as f:
+                raw = json.load(f)
+        except Exception as e:
+            print(f"Could not load router centroids ({e}); centroid routing disabled.")
+            return
+
+        for namespace, entry in raw.items():
+            vector_sum = entry.get("sum")
+            count = entry.get("count", 0)
+            if not vector_sum or count <= 0:
+                continue
+            self._sums[namespace] = vector_sum
+            self._counts[namespace] = count
+            self._unit_centroids[namespace] = _unit(vector_sum)
+
+    def _save_centroids(self):
+        if not self.centroids_path:
+            return
+        payload = {
+            namespace: {"count": self._counts[namespace], "sum": self._sums[namespace]}
+            for namespace in self._sums
+        }
+        with open(self.centroids_path, "w") as f:
+            json.dump(payload, f)
+
+    def update_centroid(
+        self,
+        namespace: str,
+        vectors: Iterable[Sequence[float]],
+        removed: Iterable[Sequence[float]] = (),
+    ):
+        """
+        Applies one ingest to the namespace centroid: adds the embeddings that were
+        written and subtracts the ones they overwrote or that were deleted, so a
+        re-embedded document is counted once. Saves the file once per call.
+        """
+        vectors = list(vectors)
+        removed = list(removed)
+        if not vectors and not removed:
+            return
+
+        with self._lock:
+            vector_sum = self._sums.get(namespace)
+            if vectors and (vector_sum is None or len(vector_sum) != len(vectors[0])):
+                # First ingest, or the embedding model changed: start over.
+                vector_sum = [0.0] * len(vectors[0])
+                self._counts[namespace] = 0
+            if vector_sum is None:
+                return
+            removed = [vector for vector in removed if len(vector) == len(vector_sum)]
+            for vector in vectors:
+                vector_sum = list(map(operator.add, vector_sum, vector))
+            for vector in removed:
+                vector_sum = list(map(operator.sub, vector_sum, vector))
+            count = self._counts[namespace] + len(vectors) - len(removed)
+            if count > 0:
+                self._sums[namespace] = vector_sum
+                self._counts[namespace] = count
+                self._unit_centroids[namespace] = _unit(vector_sum)
+            else:
+                self._sums.pop(namespace, None)
+                self._counts.pop(namespace, None)
+                self._unit_centroids.pop(namespace, None)
+            self._save_centroids()
+
+    def rule_scores(self, query: str) -> dict[str, float]:
+        scores = {namespace: 0.0 for namespace in ROUTABLE_NAMESPACES}
+        for pattern, namespace, weight in _RULES:
+            if pattern.search(query or ""):
+                scores[namespace] += weight
+        return scores
+
+    def centroid_scores(self, query_vector: Sequence[float]) -> dict[str, float]:
+        query_norm = math.sqrt(_dot(query_vector, query_vector)) or 1.0
+        return {
+            namespace: _dot(query_vector, centroid) / query_norm
+            for namespace, centroid in self._unit_centroids.items()
+            if namespace in ROUTABLE_NAMESPACES and len(centroid) == len(query_vector)
+        }
+
+    def route(self, query: str, query_vector: Sequence[float] | None = None) -> RouteDecision | None:
+        scores = self.rule_scores(query)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_ns, best = ranked[0]
+        runner_up = ranked[1][1]
+        if best > 0:
+            confidence = best / (best + runner_up)
+            if confidence >= self.confidence_threshold:
+                return RouteDecision(namespace=best_ns, source="rules", confidence=confidence)
+
+        if query_vector is not None:
+            similarities = self.centroid_scores(query_vector)
+            if len(similarities) >= 2:
+                ranked = sorted(similarities.items(), key=lambda item: item[1], reverse=True)
+                margin = ranked[0][1] - ranked[1][1]
+                if margin >= self.centroid_margin:
+                    return RouteDecision(namespace=ranked[0][0], source="centroid", confidence=margin)
+
+        return None
+
+    def record(self, decision: RouteDecision):
+        with self._lock:
+            self.stats[decision.source] += 1
+
+    def stats_snapshot(self) -> dict:
+        with self._lock:
+            total = sum(self.stats.values())
+            snapshot = {source: self.stats.get(source, 0) for source in ("rules", "centroid", "llm", "default")}
+        snapshot["total"] = total
+        snapshot["llm_fallback_rate"] = (snapshot["llm"] + snapshot["default"]) / total if total else 0.0
+        return snapshot
@@ -0,0 +1,225 @@
+"""
+Offline compiler for the catalog's prerequisite text.
+
+Turns each course's `prereq_raw` sentence into an AND-of-OR requirement list
+with minimum-grade and concurrency annotations, and writes it next to the
+source data as cmpsc_prereqs.compiled.json. Runtime code loads that artifact
+through prereq_engine.get_prereq_graph() and never parses prerequisite text.
+
+Run from the backend directory after the prerequisite data changes:
+
+    python -m src.services.prereq_compiler
+"""
+import hashlib
+import itertools
+import json
+import re
+import sys
+from pathlib import Path
+
+from .prereq_engine import COMPILED_FORMAT, PREREQ_COMPILED_PATH, PREREQ_DATA_PATH, normalize_course_code
+
+
+# Longest names first so "Electrical Engineering" wins over "Engineering".
+SUBJECT_ALIASES = [
+    ("ELECTRICAL ENGINEERING", "ECE"),
+    ("COMPUTER SCIENCE", "CMPSC"),
+    ("MATHEMATICS", "MATH"),
+    ("ENGINEERING", "ENGR"),
+    ("STATISTICS", "PSTAT"),
+    ("PHYSICS", "PHYS"),
+    ("CMPSC", "CMPSC"),
+    ("PSTAT", "PSTAT"),
+    ("MATH", "MATH"),
+    ("CH E", "CH E"),
+    ("ECE", "ECE"),
+    ("CS", "CMPSC"),
+    ("ME", "ME"),
+]
+
+_SUBJECT_RE = "|".join(re.escape(name) for name, _ in SUBJECT_ALIASES)
+_NUMBER_RE = r"\d{1,3}[A-Z]{0,2}(?:-[A-Z])?"
+_COURSE_RE = re.compile(rf"\b(?:({_SUBJECT_RE})\s*)?({_NUMBER_RE})\b")
+_SUBJECT_CODES = dict(SUBJECT_ALIASES)
+
+_GRADE_AFTER_RE = re.compile(r"\s*with a (?:minimum )?grade of ([A-D][+-]?) or better", re.IGNORECASE)
+_GRADE_BEFORE_RE = re.compile(r"^(?:a )?(?:minimum )?grade of ([A-D][+-]?) or better in\s+", re.IGNORECASE)
+_CONCURRENT_RE = re.compile(r"\s*\(may be taken concurrently\)", re.IGNORECASE)
+_COREQ_RE = re.compile(r"^co-?requisites?:?\s+", re.IGNORECASE)
+_EXAMPLE_RE = re.compile(r"\s*\((?:e\.g\.|for example)[^)]*\)", re.IGNORECASE)
+
+_CLAUSE_SPLIT_RE = re.compile(r";|\.\s+(?=[A-Z(])")
+_AND_SPLIT_RE = re.compile(r"\s*,?\s*\band\b,?\s*|\s*,(?!\s*or\b)\s*", re.IGNORECASE)
+_OR_SPLIT_RE = re.compile(r"\s*,?\s*\bor\b\s*", re.IGNORECASE)
+
+
+def _expand_number(subject: str, number: str) -> list[str]:
+    """'130A-B' -> ['CMPSC 130A', 'CMPSC 130B']; a range means both courses are required."""
+    m = re.fullmatch(r"(\d+)([A-Z]?)-([A-Z])", number)
+    if not m:
+        return [normalize_course_code(f"{subject} {number}")]
+    base, first, last = m.groups()
+    letters = [chr(c) for c in range(ord(first or "A"), ord(last) + 1)]
+    return [normalize_course_code(f"{subject} {base}{letter}") for letter in letters]
+
+
+def _parse_option(text: str, last_subject: str | None) -> tuple[list[str], str | None]:
+    """
+    Returns (courses, last_subject) for one OR option. courses is the conjunction
+    the option stands for; [] means the option is not a course (e.g. consent).
+    """
+    courses: list[str] = []
+    upper = text.upper()
+    for m in _COURSE_RE.finditer(upper):
+        subject_name, number = m.groups()
+        if subject_name:
+            last_subject = _SUBJECT_CODES[subject_name]
+        elif not last_subject:
+            # A bare number with no subject in sight ("(1) have attained ...") is not a course.
+            continue
+        courses.extend(_expand_number(last_subject, number))
+    return courses, last_subject
+
+
+def _to_groups(options: list[tuple[list[str], dict]]) -> list[list[tuple[str, dict]]]:
+    """Distributes an OR of conjunctions into AND-of-OR groups."""
+    course_options = [(courses, meta) for courses, meta in options if courses]
+    if not course_options:
+        return []
+    groups = []
+    for combo in itertools.product(*[[(course, meta) for course in courses] for courses, meta in course_options]):
+        group: list[tuple[str, dict]] = []
+        for course, meta in combo:
+            if all(existing != course for existing, _ in group):
+                group.append((course, meta))
+        groups.append(group)
+    return groups
+
+
+def compile_prereq_text(text: str | None) -> dict:
+    """
+    Compiles one prereq_raw string into {"requires": [...], "notes": [...]}.
+
+    Each entry of "requires" is an OR-group {"any_of": [option, ...]} where an option
+    is {"course", "min_grade", "concurrent"}; all groups must be met. A group also gets
+    "alternatives" when the text offers a non-course way out ("or consent of instructor").
+    Clauses without course numbers (standing, majors only, consent) go to "notes".
+    """
+    requires: list[dict] = []
+    notes: list[str] = []
+    if not isinstance(text, str) or not text.strip() or text.strip().lower() == "none":
+        return {"requires": requires, "notes": notes}
+
+    for example in _EXAMPLE_RE.findall(text):
+        notes.append(example.strip())
+    text = _EXAMPLE_RE.sub("", text)
+
+    for clause in _CLAUSE_SPLIT_RE.split(text):
+        clause = clause.strip().rstrip(".").strip()
+        if not clause:
+            continue
+
+        clause_concurrent = bool(_COREQ_RE.match(clause))
+        clause = _COREQ_RE.sub("", clause)
+        clause_grade = None
+        m = _GRADE_BEFORE_RE.match(clause)
+        if m:
+            clause_grade = m.group(1).upper()
+            clause = clause[m.end():]
+
+        if not _parse_option(clause, None)[0]:
+            notes.append(clause)
+            continue
+
+        parts = []
+        last_subject = None
+        for part in _AND_SPLIT_RE.split(clause):
+            if not part or not part.strip():
+                continue
+            grade = _GRADE_AFTER_RE.search(part)
+            concurrent = bool(_CONCURRENT_RE.search(part))
+            part = _CONCURRENT_RE.sub("", _GRADE_AFTER_RE.sub("", part)).strip(" ,")
+
+            options = []
+            alternatives = []
+            for option_text in _OR_SPLIT_RE.split(part):
+                option_text = option_text.strip(" ,")
+                if not option_text:
+                    continue
+                courses, last_subject = _parse_option(option_text, last_subject)
+                if courses:
+                    options.append(courses)
+                else:
+                    alternatives.append(option_text)
+
+            if not options:
+                notes.append(part)
+                continue
+            parts.append(
+                {
+                    "options": options,
+                    "alternatives": alternatives,
+                    "min_grade": grade.group(1).upper() if grade else None,
+                    "concurrent": concurrent,
+                }
+            )
+
+        # "Computer Science 24 and 32 with a grade of C or better": the grade covers both.
+        trailing_grade = None
+        for part in reversed(parts):
+            if part["min_grade"]:
+                trailing_grade = part["min_grade"]
+            elif trailing_grade:
+                part["min_grade"] = trailing_grade
+
+        for part in parts:
+            meta = {
+                "min_grade": part["min_grade"] or clause_grade,
+                "concurrent": part["concurrent"] or clause_concurrent,
+            }
+            for group in _to_groups([(courses, meta) for courses in part["options"]]):
+                entry = {
+                    "any_of": [
+                        {"course": course, "min_grade": option_meta["min_grade"], "concurrent": option_meta["concurrent"]}
+                        for course, option_meta in group
+                    ]
+                }
+                if part["alternatives"]:
+                    entry["alternatives"] = part["alternatives"]
+                if entry not in requires:
+                    requires.append(entry)
+
+    return {"requires": requires, "notes": notes}
+
+
+def compile_prereq_data(raw_data: dict, source_sha256: str | None = None) -> dict:
+    courses = {}
+    for course, details in raw_data.items():
+        if not isinstance(course, str) or not isinstance(details, dict):
+            continue
+        compiled = compile_prereq_text(details.get("prereq_raw"))
+        courses[course] = {"code": normalize_course_code(course), **compiled}
+    return {"format": COMPILED_FORMAT, "source_sha256": source_sha256, "courses": courses}
+
+
+def compile_prereq_file(source: Path | str = PREREQ_DATA_PATH, target: Path | str = PREREQ_COMPILED_PATH) -> dict:
+    source_bytes = Path(source).read_bytes()
+    artifact = compile_prereq_data(json.loads(source_bytes), hashlib.sha256(source_bytes).hexdigest())
+    with open(target, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=2)
+        f.write("\n")
+    return artifact
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    source = Path(args[0]) if args else PREREQ_DATA_PATH
+    target = Path(args[1]) if len(args) > 1 else PREREQ_COMPILED_PATH
+    artifact = compile_prereq_file(source, target)
+    groups = sum(len(course["requires"]) for course in artifact["courses"].values())
+    print(f"Compiled {len(artifact['courses'])} courses ({groups} requirement groups) into {target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+import hashlib
+import json
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
+
+
+PREREQ_DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "cmpsc_prereqs.json"
+# Written by prereq_compiler from the prereq_raw text in PREREQ_DATA_PATH.
+PREREQ_COMPILED_PATH = PREREQ_DATA_PATH.with_name("cmpsc_prereqs.compiled.json")
+COMPILED_FORMAT = 1
+
+_EXPLICIT_CODE_RE = re.compile(r"^[A-Z]{1,6}(?:\s+[A-Z]{1,6})?\s+\d+[A-Z0-9]*$")
+_BARE_NUMBER_RE = re.compile(r"^\d+[A-Z0-9]*$")
+_CONNECTOR_RE = re.compile(r"^(OR|AND)\s+", re.IGNORECASE)
+
+
+def normalize_course_code(course_code: str) -> str:
+    """
+    Normalizes course codes into a consistent format for matching.
+    Examples:
+      - CS130A -> CMPSC 130A
+      - cs 16  -> CMPSC 16
+    """
+    code = re.sub(r"\s+", " ", course_code.upper()).strip()
+    code = re.sub(r"^([A-Z]+)\s*([0-9].*)$", r"\1 \2", code)
+
+    if code.startswith("CS "):
+        code = code.replace("CS ", "CMPSC ", 1)
+
+    return code
+
+
+def _resolve_token(token: str, last_subject: str | None, known_courses: set[str]) -> str | None:
+    t = _CONNECTOR_RE.sub("", token.strip().upper()).strip()
+    if not t:
+        return None
+
+    # e.g. "2A" listed after "MATH 3A" -> "MATH 2A"; without a subject, assume CMPSC.
+    if _BARE_NUMBER_RE.match(t):
+        if last_subject:
+            return normalize_course_code(f"{last_subject} {t}")
+        alias = f"CMPSC {t}"
+        return alias if alias in known_courses else None
+
+    # e.g. "CS130A" without space
+    t = re.sub(r"^([A-Z]+)(\d)", r"\1 \2", t)
+    t = re.sub(r"\s+", " ", t).strip()
+
+    if _EXPLICIT_CODE_RE.match(t):
+        return normalize_course_code(t)
+    return None
+
+
+def parse_prereq_groups(prereqs: Iterable[str], known_courses: set[str] = frozenset()) -> list[list[str]]:
+    """
+    Parses a flat prereq_courses list into AND-of-OR groups of normalized codes.
+    A token prefixed with "OR" joins the previous group; anything else starts a new one.
+    """
+    groups: list[list[str]] = []
+    last_subject = None
+
+    for raw in prereqs:
+        if not isinstance(raw, str):
+            continue
+        stripped = raw.strip()
+        if not stripped:
+            continue
+
+        is_or = bool(re.match(r"^OR\s+", stripped, re.IGNORECASE))
+        normalized = _resolve_token(stripped, last_subject, known_courses)
+        if not normalized:
+            continue
+
+        last_subject = normalized.split()[0]
+        if is_or and groups:
+            if normalized not in groups[-1]:
+                groups[-1].append(normalized)
+        else:
+            groups.append([normalized])
+
+    return groups
+
+
+def compile_prereq_courses(raw_data: dict) -> dict:
+    """
+    Converts raw catalog data into the compiled course format using the flat
+    prereq_courses lists. Used when no compiled artifact is available.
+    """
+    courses = {
+        course: details
+        for course, details in raw_data.items()
+        if isinstance(course, str) and isinstance(details, dict)
+    }
+    known_courses = {normalize_course_code(course) for course in courses}
+    compiled = {}
+    for course, details in courses.items():
+        prereq_list = details.get("prereq_courses", [])
+        groups = parse_prereq_groups(prereq_list if isinstance(prereq_list, list) else [], known_courses)
+        compiled[course] = {
+            "requires": [
+                {"any_of": [{"course": code, "min_grade": None, "concurrent": False} for code in group]}
+                for group in groups
+            ],
+            "notes": [],
+        }
+    return compiled
+
+
+def load_compiled_prereqs(path: Path | str = PREREQ_COMPILED_PATH, source: Path | str = PREREQ_DATA_PATH) -> dict | None:
+    """The compiled artifact, or None when it is missing or was built from other source data."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        artifact = json.load(f)
+    with open(source, "rb") as f:
+        source_sha256 = hashlib.sha256(f.read()).hexdigest()
+    if artifact.get("format") != COMPILED_FORMAT or artifact.get("source_sha256") != source_sha256:
+        print(f"Ignoring stale {path.name}; run `python -m src.services.prereq_compiler` to rebuild it.")
+        return None
+    return artifact
+
+
+class PrereqGraph:
+    """
+    Prerequisite data compiled once per process.
+
+    Course codes are normalized and interned, and every course or prerequisite
+    gets an integer node id. Each catalog course keeps its prerequisites as
+    AND-of-OR groups of node ids, and `dependents` is the reverse adjacency
+    list. Eligibility, flowchart and Mermaid code all read this object instead
+    of re-reading and re-parsing the JSON file.
+
+    For eligibility a set of courses is an int bitmask (bit i = node i) and each
+    OR-group is compiled to the mask of its options, so a course is eligible
+    when every group mask shares a bit with the completed mask. Options that may
+    be taken concurrently also get a second mask checked against in-progress
+    courses. Minimum grades stay in the compiled artifact but are not enforced:
+    any passing grade satisfies a prerequisite.
+
+    `compiled_courses` maps catalog keys to {"requires": [{"any_of": [option]}],
+    "notes": [...]}, the format written by prereq_compiler.
+    """
+
+    def __init__(self, compiled_courses: dict):
+        self.codes: list[str] = []
+        self.index: dict[str, int] = {}
+        # Original spelling of catalog keys, used as display labels.
+        self.labels: dict[int, str] = {}
+        self.catalog_ids: list[int] = []
+        self.groups: dict[int, tuple[tuple[int, ...], ...]] = {}
+        self.dependents: dict[int, list[int]] = {}
+        self.notes: dict[int, list[str]] = {}
+        # Catalog node -> (options mask, concurrent options mask) per OR-group, in catalog order.
+        self.group_masks: dict[int, tuple[tuple[int, int], ...]] = {}
+
+        for course in compiled_courses:
+            node = self._intern(normalize_course_code(course))
+            if node not in self.labels:
+                self.labels[node] = course
+                self.catalog_ids.append(node)
+
+        for course, details in compiled_courses.items():
+            node = self.index[normalize_course_code(course)]
+            groups = []
+            masks = []
+            for requirement in details.get("requires", []):
+                group = []
+                concurrent = []
+                for option in requirement.get("any_of", []):
+                    prereq = self._intern(normalize_course_code(option["course"]))
+                    if prereq in group:
+                        continue
+                    group.append(prereq)
+                    if option.get("concurrent"):
+                        concurrent.append(prereq)
+                if group:
+                    groups.append(tuple(group))
+                    masks.append((self.mask_of(group), self.mask_of(concurrent)))
+            self.groups[node] = tuple(groups)
+            self.group_masks[node] = tuple(masks)
+            self.notes[node] = list(details.get("notes", []))
+
+        for node in self.groups:
+            for prereq in self.prereq_ids(node):
+                self.dependents.setdefault(prereq, []).append(node)
+
+    @classmethod
+    def from_data(cls, raw_data: dict) -> "PrereqGraph":
+        """Builds the graph from raw catalog data's prereq_courses lists."""
+        return cls(compile_prereq_courses(raw_data))
+
+    @classmethod
+    def from_compiled(cls, artifact: dict) -> "PrereqGraph":
+        return cls(artifact.get("courses", {}))
+
+    @classmethod
+    def from_file(cls, path: Path | str = PREREQ_DATA_PATH) -> "PrereqGraph":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_data(json.load(f))
+
+    def _intern(self, code: str) -> int:
+        node = self.index.get(code)
+        if node is None:
+            node = len(self.codes)
+            code = sys.intern(code)
+            self.codes.append(code)
+            self.index[code] = node
+        return node
+
+    def __len__(self) -> int:
+        return len(self.catalog_ids)
+
+    def __contains__(self, course_code: str) -> bool:
+        node = self.index.get(normalize_course_code(course_code))
+        return node is not None and node in self.labels
+
+    def id_of(self, course_code: str) -> int | None:
+        return self.index.get(normalize_course_code(course_code))
+
+    def is_catalog(self, node: int) -> bool:
+        return node in self.labels
+
+    def prereq_ids(self, node: int) -> list[int]:
+        """Distinct prerequisite node ids of a course, in listing order."""
+        seen: dict[int, None] = {}
+        for group in self.groups.get(node, ()):
+            for option in group:
+                seen.setdefault(option, None)
+        return list(seen)
+
+    def to_ids(self, course_codes: Iterable[str]) -> set[int]:
+        """Node ids of the given codes; codes the graph has never seen are ignored."""
+        out = set()
+        for code in course_codes or ():
+            if not isinstance(code, str):
+                continue
+            # Most callers already pass normalized codes; skip the regexes for those.
+            node = self.index.get(code)
+            if node is None and code.strip():
+                node = self.index.get(normalize_course_code(code))
+            if node is not None:
+                out.add(node)
+        return out
+
+    @staticmethod
+    def mask_of(node_ids: Iterable[int]) -> int:
+        node_ids = list(node_ids)
+        if not node_ids:
+            return 0
+        # One bytearray pass instead of repeated big-int ORs, which grow with the catalog.
+        bits = bytearray((max(node_ids) >> 3) + 1)
+        for node in node_ids:
+            bits[node >> 3] |= 1 << (node & 7)
+        return int.from_bytes(bits, "little")
+
+    def to_mask(self, course_codes: Iterable[str]) -> int:
+        return self.mask_of(self.to_ids(course_codes))
+
+    def unmet_groups(self, node: int, satisfied: set[int], in_progress: set[int] = frozenset()) -> list[tuple[int, ...]]:
+        """
+        OR-groups of a course with no completed option, by the is_eligible() rule:
+        an in-progress course only meets an option that may be taken concurrently.
+        """
+        unmet = []
+        for group, (_, concurrent_mask) in zip(self.groups.get(node, ()), self.group_masks.get(node, ())):
+            if not any(
+                option in satisfied or (option in in_progress and concurrent_mask >> option & 1)
+                for option in group
+            ):
+                unmet.append(group)
+        return unmet
+
+    def is_eligible(self, node: int, satisfied_mask: int, concurrent_mask: int = 0) -> bool:
+        return all(
+            group_mask & satisfied_mask or concurrent_group_mask & concurrent_mask
+            for group_mask, concurrent_group_mask in self.group_masks.get(node, ())
+        )
+
+    def eligible_ids(
+        self,
+        satisfied_mask: int,
+        excluded: set[int] = frozenset(),
+        concurrent_mask: int = 0,
+    ) -> list[int]:
+        """
+        Catalog nodes, in catalog order, whose every prerequisite group intersects
+        satisfied_mask. concurrent_mask (in-progress courses) also satisfies options
+        that may be taken concurrently.
+        """
+        eligible = []
+        for node, group_masks in self.group_masks.items():
+            if node in excluded:
+                continue
+            for group_mask, concurrent_group_mask in group_masks:
+                if not (group_mask & satisfied_mask or concurrent_group_mask & concurrent_mask):
+                    break
+            else:
+                eligible.append(node)
+        return eligible
+
+    def eligible_courses(
+        self,
+        completed: Iterable[str],
+        excluded: Iterable[str] = (),
+        in_progress: Iterable[str] = (),
+    ) -> list[str]:
+        """Catalog courses whose every prerequisite group has a completed option, in catalog order."""
+        eligible = self.eligible_ids(self.to_mask(completed), self.to_ids(excluded), self.to_mask(in_progress))
+        return [self.codes[node] for node in eligible]
+
+
+@lru_cache(maxsize=1)
+def get_prereq_graph() -> PrereqGraph:
+    """
+    The process-wide graph for the bundled prerequisite data: the compiled artifact
+    when it is current, otherwise the flat prereq_courses lists.
+    """
+    artifact = load_compiled_prereqs()
+    if artifact is not None:
+        return PrereqGraph.from_compiled(artifact)
+    return PrereqGraph.from_file(PREREQ_DATA_PATH)
@@ -1,11 +1,13 @@
-import base64
-import json
 import re
-from pathlib import Path
+from collections import deque
+from functools import lru_cache
 from typing import Iterable
 
+from .flowchart_svg import remaining_path_svg_url, write_flowchart_svg
+from .prereq_engine import PREREQ_DATA_PATH, PrereqGraph, get_prereq_graph, normalize_course_code
 
-DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "cmpsc_prereqs.json"
+
+DATA_PATH = PREREQ_DATA_PATH
 
 INCOMPLETE_OR_FAILING_GRADES = {
     "",
@@ -24,22 +26,6 @@ INCOMPLETE_OR_FAILING_GRADES = {
 }
 
 
-def normalize_course_code(course_code: str) -> str:
-    """
-    Normalizes course codes into a consistent format for matching.
-    Examples:
-      - CS130A -> CMPSC 130A
-      - cs 16  -> CMPSC 16
-    """
-    code = re.sub(r"\s+", " ", course_code.upper()).strip()
-    code = re.sub(r"^([A-Z]+)\s*([0-9].*)$", r"\1 \2", code)
-
-    if code.startswith("CS "):
-        code = code.replace("CS ", "CMPSC ", 1)
-
-    return code
-
-
 def extract_completed_courses_from_transcript(transcript_data: dict) -> list[str]:
     completed: set[str] = set()
 
@@ -130,34 +116,7 @@ def _node_id(label: str) -> str:
     return safe
 
 
-def _clean_prereq_label(prereq: str) -> str:
-    cleaned = prereq.strip()
-    cleaned = re.sub(r"^(OR|AND)\s+", "", cleaned, flags=re.IGNORECASE)
-    return cleaned.strip()
-
-
-def _resolve_prereq_label(prereq: str, known_courses: set[str]) -> tuple[str | None, bool]:
-    if not isinstance(prereq, str):
-        return None, False
-
-    cleaned = _clean_prereq_label(prereq)
-    if not cleaned:
-        return None, False
-
-    normalized = normalize_course_code(cleaned)
-    if normalized in known_courses:
-        return normalized, True
-
-    compact = cleaned.upper()
-    compact = re.sub(r"^(CMPSC|CS)\s*", "", compact).strip()
-    if re.fullmatch(r"\d+[A-Z]?", compact):
-        alias = f"CMPSC {compact}"
-        if alias in known_courses:
-            return alias, True
-
-    return normalized, False
-
-
+@lru_cache(maxsize=8192)
 def _course_sort_key(course: str) -> tuple[int, int, str]:
     normalized = normalize_course_code(course)
     m = re.match(r"^CMPSC\s+(\d+)([A-Z]?)$", normalized)
@@ -169,32 +128,128 @@ def _course_sort_key(course: str) -> tuple[int, int, str]:
     return (number, suffix_rank, normalized)
 
 
-def _compute_subset_levels(
-    subset_courses: list[str], edges: set[tuple[str, str]]
-) -> dict[str, int]:
-    indegree = {course: 0 for course in subset_courses}
-    outgoing: dict[str, set[str]] = {course: set() for course in subset_courses}
+LAYERING_MODES = ("longest_path", "alap")
 
-    for source, target in edges:
-        if source not in indegree or target not in indegree:
+
+def _course_ranks(courses: Iterable[str]) -> dict[str, int]:
+    """Position of each course in _course_sort_key order; sorts once so later ordering is integer-only."""
+    return {course: rank for rank, course in enumerate(sorted(set(courses), key=_course_sort_key))}
+
+
+def _find_cycles(nodes: list[int], outgoing: list[list[int]]) -> list[list[int]]:
+    """Strongly connected components with more than one node (or a self-loop), iterative Tarjan."""
+    index_of: dict[int, int] = {}
+    lowlink: dict[int, int] = {}
+    on_stack: set[int] = set()
+    stack: list[int] = []
+    cycles: list[list[int]] = []
+    counter = 0
+
+    for root in nodes:
+        if root in index_of:
             continue
-        if target in outgoing[source]:
+        work = [(root, 0)]
+        while work:
+            node, child_pos = work[-1]
+            if child_pos == 0:
+                index_of[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack.add(node)
+            children = outgoing[node]
+            if child_pos < len(children):
+                work[-1] = (node, child_pos + 1)
+                child = children[child_pos]
+                if child not in index_of:
+                    work.append((child, 0))
+                elif child in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[child])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                if len(component) > 1 or node in outgoing[node]:
+                    cycles.append(sorted(component))
+
+    return cycles
+
+
+def layer_courses(
+    subset_courses: list[str],
+    edges: set[tuple[str, str]],
+    mode: str = "longest_path",
+    ranks: dict[str, int] | None = None,
+) -> tuple[dict[str, int], list[list[str]]]:
+    """
+    Assigns every course a tier so each edge points to a higher tier; returns (levels, cycles).
+
+    "longest_path" puts a course one tier after its longest prerequisite chain, so
+    tier 0 holds courses with no remaining prerequisites. "alap" layers the same
+    way from the other end and then flips, pulling courses down next to the
+    courses they unlock. Runs in O(V + E) with a deque over integer ids; pass
+    `ranks` from _course_ranks to reuse precomputed sort keys.
+
+    Courses on a prerequisite cycle (malformed data) can't be ordered; they keep the
+    tier reached so far and are reported as cycles.
+    """
+    if mode not in LAYERING_MODES:
+        raise ValueError(f"Unknown layering mode {mode!r}; expected one of {', '.join(LAYERING_MODES)}")
+
+    if ranks is None:
+        ranks = _course_ranks(subset_courses)
+    courses = sorted(set(subset_courses), key=ranks.__getitem__)
+    ranks = {course: node for node, course in enumerate(courses)}
+    n = len(courses)
+    outgoing: list[list[int]] = [[] for _ in range(n)]
+    incoming: list[list[int]] = [[] for _ in range(n)]
+    seen_edges: set[tuple[int, int]] = set()
+
+    for source, target in edges:
+        source_id = ranks.get(source)
+        target_id = ranks.get(target)
+        if source_id is None or target_id is None or (source_id, target_id) in seen_edges:
             continue
-        outgoing[source].add(target)
-        indegree[target] += 1
+        seen_edges.add((source_id, target_id))
+        outgoing[source_id].append(target_id)
+        incoming[target_id].append(source_id)
 
-    queue = sorted([course for course, degree in indegree.items() if degree == 0], key=_course_sort_key)
-    levels = {course: 0 for course in subset_courses}
+    forward, backward = (outgoing, incoming) if mode == "longest_path" else (incoming, outgoing)
+    indegree = [len(predecessors) for predecessors in backward]
+    levels = [0] * n
+    queue = deque(node for node in range(n) if indegree[node] == 0)
+    processed = 0
 
     while queue:
-        node = queue.pop(0)
-        for neighbor in sorted(outgoing[node], key=_course_sort_key):
-            levels[neighbor] = max(levels[neighbor], levels[node] + 1)
+        node = queue.popleft()
+        processed += 1
+        next_level = levels[node] + 1
+        for neighbor in forward[node]:
+            if levels[neighbor] < next_level:
+                levels[neighbor] = next_level
             indegree[neighbor] -= 1
             if indegree[neighbor] == 0:
                 queue.append(neighbor)
 
-    return levels
+    if mode == "alap":
+        depth = max(levels, default=0)
+        levels = [depth - level for level in levels]
+
+    cycles: list[list[str]] = []
+    if processed < n:
+        cycles = [[courses[node] for node in cycle] for cycle in _find_cycles(list(range(n)), outgoing)]
+        print(f"Prerequisite cycle(s) found while layering flowchart: {cycles}")
+
+    return {course: levels[node] for node, course in enumerate(courses)}, cycles
 
 
 def _is_cmpsc_0_to_199(course_code: str) -> bool:
@@ -217,48 +272,37 @@ def _prereq_sort_key(course: str) -> tuple[int, int, int, str]:
     return (1, 9999, 9999, normalized)
 
 
-def build_mermaid_markup(completed_courses: Iterable[str] | None = None) -> str:
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    completed = {
-        normalize_course_code(code)
-        for code in (completed_courses or [])
-        if isinstance(code, str) and code.strip()
-    }
+def build_mermaid_markup(
+    completed_courses: Iterable[str] | None = None,
+    graph: PrereqGraph | None = None,
+) -> str:
+    graph = graph or get_prereq_graph()
+    completed = graph.to_ids(completed_courses or [])
 
     mermaid_markup = ["graph TD"]
     nodes_added = 0
-    external_nodes: set[str] = set()
+    external_nodes: set[int] = set()
 
-    for course, details in data.items():
-        course_norm = normalize_course_code(course)
-
-        if course_norm in completed:
+    for course in graph.catalog_ids:
+        if course in completed:
             continue
 
-        target = _node_id(course)
-        mermaid_markup.append(f'    {target}["{course}"]')
+        label = graph.labels[course]
+        target = _node_id(label)
+        mermaid_markup.append(f'    {target}["{label}"]')
         nodes_added += 1
 
-        prereqs = details.get("prereq_courses", [])
-        for prereq in prereqs:
-            if not isinstance(prereq, str):
+        for prereq in graph.prereq_ids(course):
+            if prereq in completed:
                 continue
 
-            clean_prereq = _clean_prereq_label(prereq)
-            if not clean_prereq:
-                continue
-
-            clean_prereq_norm = normalize_course_code(clean_prereq)
-            if clean_prereq_norm in completed:
-                continue
-
-            source = _node_id(clean_prereq)
-
-            if clean_prereq not in data and source not in external_nodes:
-                mermaid_markup.append(f'    {source}["{clean_prereq}"]')
-                external_nodes.add(source)
+            if graph.is_catalog(prereq):
+                source = _node_id(graph.labels[prereq])
+            else:
+                source = _node_id(graph.codes[prereq])
+                if prereq not in external_nodes:
+                    mermaid_markup.append(f'    {source}["{graph.codes[prereq]}"]')
+                    external_nodes.add(prereq)
 
             mermaid_markup.append(f"    {source} --> {target}")
 
@@ -268,10 +312,47 @@ def build_mermaid_markup(completed_courses: Iterable[str] | None = None) -> str:
     return "\n".join(mermaid_markup) + "\n"
 
 
-def mermaid_image_url(mermaid_markup: str) -> str:
-    graph_bytes = mermaid_markup.encode("utf-8")
-    encoded = base64.urlsafe_b64encode(graph_bytes).decode("ascii")
-    return f"https://mermaid.ink/img/{encoded}"
+def build_remaining_path_layout(
+    completed_courses: Iterable[str] | None = None,
+    graph: PrereqGraph | None = None,
+) -> tuple[list[list[str]], list[tuple[str, str]]]:
+    """
+    (tiers, edges) for the same graph build_mermaid_markup draws: every remaining
+    catalog course plus the outside prerequisites that point into it.
+    """
+    graph = graph or get_prereq_graph()
+    completed = graph.to_ids(completed_courses or [])
+
+    nodes: list[str] = []
+    seen: set[str] = set()
+    edges: set[tuple[str, str]] = set()
+    for course in graph.catalog_ids:
+        if course in completed:
+            continue
+        target = graph.labels[course]
+        if target not in seen:
+            seen.add(target)
+            nodes.append(target)
+        for prereq in graph.prereq_ids(course):
+            if prereq in completed:
+                continue
+            source = graph.labels[prereq] if graph.is_catalog(prereq) else graph.codes[prereq]
+            if source not in seen:
+                seen.add(source)
+                nodes.append(source)
+            edges.add((source, target))
+
+    if not nodes:
+        return [], []
+
+    ranks = _course_ranks(nodes)
+    nodes.sort(key=ranks.__getitem__)
+    levels, _ = layer_courses(nodes, edges, ranks=ranks)
+    tiers_by_level: dict[int, list[str]] = {}
+    for course in nodes:
+        tiers_by_level.setdefault(levels.get(course, 0), []).append(course)
+    tiers = [tiers_by_level[level] for level in sorted(tiers_by_level)]
+    return tiers, sorted(edges, key=lambda edge: (ranks[edge[0]], ranks[edge[1]]))
 
 
 def generate_remaining_path_image(
@@ -279,39 +360,52 @@ def generate_remaining_path_image(
 ) -> tuple[str | None, str]:
     """
     Returns (image_url, message).
-    image_url is None when no remaining courses exist.
+    image_url re-renders from the completed courses when the SVG file is gone and is None
+    when no remaining courses exist.
     """
-    markup = build_mermaid_markup(completed_courses)
-    if not markup:
+    completed_courses = list(completed_courses or [])
+    tiers, edges = build_remaining_path_layout(completed_courses)
+    if not tiers:
         return None, "The student has completed all courses in the prerequisite database."
-    return mermaid_image_url(markup), "Flowchart generated successfully."
+    write_flowchart_svg(tiers, edges)
+    return remaining_path_svg_url(completed_courses), "Flowchart generated successfully."
+
+
+def write_upper_division_flowchart_svg(flowchart_data: dict) -> str:
+    """Renders build_upper_division_flowchart_data output (remaining tiers, eligible courses green); returns the graph hash."""
+    remaining = {node["id"] for node in flowchart_data["nodes"] if not node["taken"]}
+    edges = [
+        (edge["from"], edge["to"])
+        for edge in flowchart_data["edges"]
+        if edge["from"] in remaining and edge["to"] in remaining
+    ]
+    eligible = [node["id"] for node in flowchart_data["nodes"] if node["eligible_now"]]
+    return write_flowchart_svg(flowchart_data["tiers"], edges, eligible)
 
 
 def build_upper_division_flowchart_data(
     completed_courses: Iterable[str] | None = None,
     accounted_courses: Iterable[str] | None = None,
+    graph: PrereqGraph | None = None,
+    layering: str = "longest_path",
 ) -> dict:
     """
     Returns frontend-friendly flowchart data for CMPSC courses in the 0-199 range.
+    A course is eligible now when every prerequisite group has a completed option,
+    or an in-progress option (accounted but not completed) that may be taken
+    concurrently: PrereqGraph.is_eligible(), the rule the transcript advisor uses.
+    `layering` is one of LAYERING_MODES.
     """
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        raw_data = json.load(f)
-
-    data: dict[str, dict] = {}
-    for course, details in raw_data.items():
-        if not isinstance(course, str) or not isinstance(details, dict):
-            continue
-        data[normalize_course_code(course)] = details
+    graph = graph or get_prereq_graph()
 
     completed = {
         normalize_course_code(code)
         for code in (completed_courses or [])
         if isinstance(code, str) and code.strip()
     }
-    known_courses = set(data.keys())
 
     target_courses = sorted(
-        [course for course in known_courses if _is_cmpsc_0_to_199(course)],
+        [graph.codes[node] for node in graph.catalog_ids if _is_cmpsc_0_to_199(graph.codes[node])],
         key=_course_sort_key,
     )
 
@@ -332,6 +426,7 @@ def build_upper_division_flowchart_data(
             "edges": [],
             "tiers": [],
             "taken_courses": [],
+            "cycles": [],
             "summary": {
                 "remaining_cmpsc_0_199_courses": 0,
                 "remaining_upper_division_courses": 0,
@@ -343,46 +438,33 @@ def build_upper_division_flowchart_data(
     edges: set[tuple[str, str]] = set()
     node_meta: dict[str, dict] = {}
 
-    for course in target_remaining:
-        prereq_rows = data.get(course, {}).get("prereq_courses", [])
-        remaining_prereqs: set[str] = set()
-
-        for prereq in prereq_rows:
-            resolved, is_internal = _resolve_prereq_label(prereq, known_courses)
-            if not resolved:
-                continue
+    satisfied = graph.to_ids(completed)
+    in_progress = graph.to_ids(accounted_set - completed)
 
-            resolved_norm = normalize_course_code(resolved)
-            if is_internal and resolved_norm in target_taken_set:
-                edges.add((resolved_norm, course))
-                continue
-
-            if resolved_norm in completed:
-                continue
-
-            remaining_prereqs.add(resolved_norm)
+    for course in target_remaining:
+        node = graph.index[course]
 
-            if is_internal and resolved_norm in target_remaining_set:
-                edges.add((resolved_norm, course))
+        for prereq in graph.prereq_ids(node):
+            prereq_code = graph.codes[prereq]
+            if prereq_code in target_taken_set or prereq_code in target_remaining_set:
+                edges.add((prereq_code, course))
 
-        unmet_count = len(remaining_prereqs)
+        unmet_groups = graph.unmet_groups(node, satisfied, in_progress)
+        remaining_prereqs = {graph.codes[option] for group in unmet_groups for option in group}
         node_meta[course] = {
             "remaining_prereqs": sorted(remaining_prereqs, key=_prereq_sort_key),
-            "unmet_prereq_count": unmet_count,
-            "eligible_now": unmet_count == 0,
+            "unmet_prereq_count": len(unmet_groups),
+            "eligible_now": not unmet_groups,
         }
 
-    levels = _compute_subset_levels(target_remaining, edges) if target_remaining else {}
-    max_level = max((levels.get(course, 0) for course in target_remaining), default=-1)
+    ranks = _course_ranks(target_courses)
+    levels, cycles = layer_courses(target_remaining, edges, layering, ranks) if target_remaining else ({}, [])
 
-    tiers: list[list[str]] = []
-    for level in range(max_level + 1 if max_level >= 0 else 0):
-        tier_nodes = sorted(
-            [course for course in target_remaining if levels.get(course, 0) == level],
-            key=_course_sort_key,
-        )
-        if tier_nodes:
-            tiers.append(tier_nodes)
+    tiers_by_level: dict[int, list[str]] = {}
+    for course in target_remaining:
+        tiers_by_level.setdefault(levels.get(course, 0), []).append(course)
+    # target_remaining is already in _course_sort_key order, so each tier is too.
+    tiers = [tiers_by_level[level] for level in sorted(tiers_by_level)]
 
     nodes = []
     for course in target_taken:
@@ -398,7 +480,7 @@ def build_upper_division_flowchart_data(
             }
         )
 
-    for course in sorted(target_remaining, key=lambda c: (levels.get(c, 0), _course_sort_key(c))):
+    for course in [course for tier in tiers for course in tier]:
         meta = node_meta.get(course, {})
         nodes.append(
             {
@@ -414,10 +496,7 @@ def build_upper_division_flowchart_data(
 
     edge_list = [
         {"from": source, "to": target}
-        for source, target in sorted(
-            edges,
-            key=lambda edge: (_course_sort_key(edge[0]), _course_sort_key(edge[1])),
-        )
+        for source, target in sorted(edges, key=lambda edge: (ranks[edge[0]], ranks[edge[1]]))
     ]
 
     eligible_now_count = sum(1 for node in nodes if node["eligible_now"])
@@ -427,6 +506,7 @@ def build_upper_division_flowchart_data(
         "edges": edge_list,
         "tiers": tiers,
         "taken_courses": target_taken,
+        "cycles": cycles,
         "summary": {
             "remaining_cmpsc_0_199_courses": len(target_remaining),
             "remaining_upper_division_courses": len(target_remaining),
@@ -0,0 +1,424 @@
+import math
+import os
+import time
+from typing import Iterable
+
+from .prereq_engine import PrereqGraph, get_prereq_graph, normalize_course_code
+from .prereq_graph import _course_sort_key
+from .prereq_reachability import ReachabilityIndex, get_reachability_index
+
+PLANNER_TIME_BUDGET_MS = float(os.getenv("PLANNER_TIME_BUDGET_MS", "250"))
+PLANNER_DEFAULT_UNITS = int(os.getenv("PLANNER_DEFAULT_UNITS", "4"))
+PLANNER_MAX_QUARTERS = int(os.getenv("PLANNER_MAX_QUARTERS", "24"))
+
+SEASONS = ("Fall", "Winter", "Spring")
+_SEASON_ALIASES = {"F": 0, "FALL": 0, "W": 1, "WINTER": 1, "S": 2, "SPRING": 2}
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def season_index(season: str) -> int:
+    key = season.strip().upper() if isinstance(season, str) else ""
+    if key not in _SEASON_ALIASES:
+        raise ValueError(f"Unknown quarter {season!r}; expected one of {', '.join(SEASONS)}")
+    return _SEASON_ALIASES[key]
+
+
+class DegreePlanner:
+    """
+    Finds the fewest quarters needed to finish a set of courses.
+
+    Courses get local bit ids and a plan state is (courses done mask, season).
+    The search is iterative deepening on the quarter count, starting from a lower
+    bound (the longer of the critical path, stretched to the quarters each course
+    is offered, and total units / unit cap) and capped by a greedy
+    critical-path-first schedule. Each quarter only tries maximal sets of
+    available courses, since taking a course earlier never hurts, and
+    (state, quarters left) pairs that failed are memoized. When the time budget
+    runs out the greedy schedule is returned with optimal=False.
+
+    Prerequisites must be finished in an earlier quarter, except options the
+    catalog allows concurrently, which may share the quarter. A prerequisite group
+    the student has not met and that no planned course covers gets its cheapest
+    option added to the plan; picks another planned course made redundant are
+    dropped again.
+    """
+
+    def __init__(
+        self,
+        completed: Iterable[str] | None,
+        targets: Iterable[str],
+        max_units: int = 16,
+        offerings: dict[str, Iterable[str]] | None = None,
+        units: dict[str, int] | None = None,
+        start_season: str = "Fall",
+        time_budget_ms: float = PLANNER_TIME_BUDGET_MS,
+        graph: PrereqGraph | None = None,
+        index: ReachabilityIndex | None = None,
+    ):
+        if max_units <= 0:
+            raise ValueError("The unit cap per quarter must be positive.")
+        self.graph = graph or get_prereq_graph()
+        self.index = index or (get_reachability_index() if graph is None else ReachabilityIndex(self.graph))
+        self.max_units = max_units
+        self.start_season = season_index(start_season)
+        self.time_budget_ms = time_budget_ms
+        self._offerings = {
+            normalize_course_code(code): {season_index(season) for season in seasons}
+            for code, seasons in (offerings or {}).items()
+        }
+        self._units = {normalize_course_code(code): value for code, value in (units or {}).items()}
+
+        graph = self.graph
+        self.completed = graph.to_ids(completed or [])
+        requested = [normalize_course_code(code) for code in targets if isinstance(code, str) and code.strip()]
+        self.unknown = sorted({code for code in requested if code not in graph.index}, key=_course_sort_key)
+        self.already_done = sorted(
+            {code for code in requested if graph.index.get(code) in self.completed},
+            key=_course_sort_key,
+        )
+        self.added_prerequisites: list[str] = []
+        self.unschedulable: list[str] = []
+        self._build_plan_courses({graph.index[code] for code in requested if code in graph.index} - self.completed)
+
+    # --- setup ---
+
+    def _course_units(self, node: int) -> int:
+        return int(self._units.get(self.graph.codes[node], PLANNER_DEFAULT_UNITS))
+
+    def _course_seasons(self, node: int) -> set[int]:
+        return self._offerings.get(self.graph.codes[node], set(range(len(SEASONS))))
+
+    def _option_cost(self, node: int) -> tuple[int, int, tuple]:
+        # Prefer catalog courses with the shortest prerequisite tree.
+        return (0 if self.graph.is_catalog(node) else 1, bin(self.index.ancestors[node]).count("1"), _course_sort_key(self.graph.codes[node]))
+
+    def _build_plan_courses(self, targets: set[int]):
+        graph = self.graph
+        planned = set(targets)
+        pending = list(planned)
+        while pending:
+            node = pending.pop()
+            for group in graph.groups.get(node, ()):
+                if any(option in self.completed or option in planned for option in group):
+                    continue
+                choice = min(group, key=self._option_cost)
+                planned.add(choice)
+                pending.append(choice)
+                self.added_prerequisites.append(graph.codes[choice])
+
+        # Drop courses that can never be scheduled, and everything that depends on them.
+        blocked = {
+            node for node in planned
+            if not self._course_seasons(node) or self._course_units(node) > self.max_units
+        }
+        changed = bool(blocked)
+        while changed:
+            changed = False
+            for node in planned - blocked:
+                for group in graph.groups.get(node, ()):
+                    if any(option in self.completed for option in group):
+                        continue
+                    if all(option in blocked or option not in planned for option in group):
+                        blocked.add(node)
+                        changed = True
+                        break
+        self.unschedulable = sorted((graph.codes[node] for node in blocked), key=_course_sort_key)
+
+        # Keep only what a schedulable target still needs, then drop picks whose
+        # groups another needed course already covers (e.g. CMPSC 9 once CMPSC 24 is planned).
+        roots = targets - blocked
+        usable = planned - blocked
+        needed = self._needed(roots, usable)
+        picks = {graph.index[code] for code in self.added_prerequisites}
+        for pick in sorted(picks & needed, key=self._option_cost, reverse=True):
+            if pick not in needed:
+                continue
+            trimmed = self._needed(roots, usable - {pick})
+            if self._covers(trimmed):
+                needed, usable = trimmed, usable - {pick}
+        self.added_prerequisites = sorted(
+            {code for code in self.added_prerequisites if graph.index[code] in needed},
+            key=_course_sort_key,
+        )
+
+        self.nodes = sorted(needed, key=lambda node: _course_sort_key(graph.codes[node]))
+        local = {node: bit for bit, node in enumerate(self.nodes)}
+        self.full_mask = (1 << len(self.nodes)) - 1
+        self._topo_order = sorted(range(len(self.nodes)), key=lambda bit: self.index.topo_rank[self.nodes[bit]])
+        self.unit_of = [self._course_units(node) for node in self.nodes]
+        self.season_masks = [0] * len(SEASONS)
+        for bit, node in enumerate(self.nodes):
+            for season in self._course_seasons(node):
+                self.season_masks[season] |= 1 << bit
+
+        # Per course, the unmet prerequisite groups as (planned options mask,
+        # options that may be taken in the same quarter mask).
+        self.requirements: list[list[tuple[int, int]]] = []
+        for node in self.nodes:
+            groups = []
+            for group, (_, concurrent) in zip(graph.groups.get(node, ()), graph.group_masks.get(node, ())):
+                if any(option in self.completed for option in group):
+                    continue
+                options = [option for option in group if option in local]
+                groups.append((
+                    sum(1 << local[option] for option in options),
+                    sum(1 << local[option] for option in options if concurrent >> option & 1),
+                ))
+            self.requirements.append(groups)
+
+    def _needed(self, roots: set[int], usable: set[int]) -> set[int]:
+        needed = set(roots)
+        pending = list(needed)
+        while pending:
+            node = pending.pop()
+            for prereq in self.graph.prereq_ids(node):
+                if prereq in usable and prereq not in needed:
+                    needed.add(prereq)
+                    pending.append(prereq)
+        return needed
+
+    def _covers(self, needed: set[int]) -> bool:
+        """Whether every group of every needed course is met by a completed or needed course."""
+        return all(
+            any(option in self.completed or option in needed for option in group)
+            for node in needed
+            for group in self.graph.groups.get(node, ())
+        )
+
+    # --- bounds ---
+
+    def _heights(self, done: int, quarter: int = 0) -> list[int]:
+        """
+        Earliest number of quarters, counted from `quarter`, in which each remaining
+        course can be finished given `done`: its critical path length stretched by
+        the quarters it is offered in, ignoring the unit cap.
+        """
+        heights = [0] * len(self.nodes)
+        season_count = len(SEASONS)
+        for bit in self._topo_order:
+            if done >> bit & 1:
+                continue
+            start = 0
+            for group_mask, concurrent_mask in self.requirements[bit]:
+                if group_mask & done:
+                    continue
+                cheapest = min(
+                    (
+                        heights[option] - (concurrent_mask >> option & 1)
+                        for option in range(len(self.nodes))
+                        if group_mask >> option & 1
+                    ),
+                    default=0,
+                )
+                start = max(start, cheapest)
+            finish = start + 1
+            for _ in range(season_count):
+                if self.season_masks[(self.start_season + quarter + finish - 1) % season_count] >> bit & 1:
+                    break
+                finish += 1
+            heights[bit] = finish
+        return heights
+
+    def _lower_bound(self, done: int, quarter: int = 0) -> int:
+        remaining_units = sum(self.unit_of[bit] for bit in range(len(self.nodes)) if not done >> bit & 1)
+        return max(
+            max(self._heights(done, quarter), default=0),
+            math.ceil(remaining_units / self.max_units) if self.max_units else 0,
+        )
+
+    def _met(self, bit: int, done: int, taking: int = 0) -> bool:
+        """Every group is met by a finished course, or by a concurrent option in `taking`."""
+        return all(
+            group_mask & done or concurrent_mask & taking
+            for group_mask, concurrent_mask in self.requirements[bit]
+        )
+
+    def _available(self, done: int, season: int) -> list[int]:
+        offered = [
+            bit
+            for bit in range(len(self.nodes))
+            if not done >> bit & 1 and self.season_masks[season] >> bit & 1
+        ]
+        # Grow from the courses met by `done` to those a co-taken course unlocks.
+        ready = 0
+        changed = True
+        while changed:
+            changed = False
+            for bit in offered:
+                if not ready >> bit & 1 and self._met(bit, done, ready):
+                    ready |= 1 << bit
+                    changed = True
+        return [bit for bit in offered if ready >> bit & 1]
+
+    def _coreq_closed(self, picked: list[int], done: int) -> list[int]:
+        """Drops picked courses whose concurrent-only requirement did not make it into the quarter."""
+        picked = list(picked)
+        changed = True
+        while changed:
+            taking = sum(1 << bit for bit in picked)
+            kept = [bit for bit in picked if self._met(bit, done, taking)]
+            changed = len(kept) != len(picked)
+            picked = kept
+        return picked
+
+    # --- search ---
+
+    def _maximal_sets(self, candidates: list[int]):
+        """Sets of candidates within the unit cap that no other candidate still fits into."""
+        chosen: list[int] = []
+
+        def extend(position: int, used: int, skipped: list[int]):
+            if position == len(candidates):
+                if all(used + self.unit_of[bit] > self.max_units for bit in skipped):
+                    yield list(chosen)
+                return
+            bit = candidates[position]
+            if used + self.unit_of[bit] <= self.max_units:
+                chosen.append(bit)
+                yield from extend(position + 1, used + self.unit_of[bit], skipped)
+                chosen.pop()
+            yield from extend(position + 1, used, skipped + [bit])
+
+        yield from extend(0, 0, [])
+
+    def _greedy(self) -> list[list[int]]:
+        quarters: list[list[int]] = []
+        done = 0
+        idle = 0
+        while done != self.full_mask and len(quarters) < PLANNER_MAX_QUARTERS:
+            season = (self.start_season + len(quarters)) % len(SEASONS)
+            heights = self._heights(done, len(quarters))
+            picked, used = [], 0
+            # Ties go to prerequisites first, so a concurrent option is picked before its dependent.
+            available = self._available(done, season)
+            for bit in sorted(available, key=lambda b: (-heights[b], self.index.topo_rank[self.nodes[b]])):
+                if used + self.unit_of[bit] <= self.max_units:
+                    picked.append(bit)
+                    used += self.unit_of[bit]
+            picked = self._coreq_closed(picked, done)
+            quarters.append(picked)
+            idle = 0 if picked else idle + 1
+            if idle > len(SEASONS):
+                break
+            for bit in picked:
+                done |= 1 << bit
+        return quarters
+
+    def _search(self, quarter_count: int, deadline: float) -> list[list[int]] | None:
+        failed: dict[tuple[int, int], int] = {}
+
+        def solve(done: int, quarter: int) -> list[list[int]] | None:
+            if done == self.full_mask:
+                return []
+            quarters_left = quarter_count - quarter
+            season = (self.start_season + quarter) % len(SEASONS)
+            if quarters_left <= 0 or self._lower_bound(done, quarter) > quarters_left:
+                return None
+            key = (done, season)
+            if failed.get(key, -1) >= quarters_left:
+                return None
+            if time.perf_counter() > deadline:
+                raise _OutOfTime()
+
+            heights = self._heights(done, quarter)
+            candidates = sorted(self._available(done, season), key=lambda bit: (-heights[bit], bit))
+            tried: set[int] = set()
+            for picked in self._maximal_sets(candidates) if candidates else [[]]:
+                picked = self._coreq_closed(picked, done)
+                picked_mask = sum(1 << bit for bit in picked)
+                if picked_mask in tried:
+                    continue
+                tried.add(picked_mask)
+                next_done = done
+                for bit in picked:
+                    next_done |= 1 << bit
+                rest = solve(next_done, quarter + 1)
+                if rest is not None:
+                    return [picked] + rest
+            failed[key] = quarters_left
+            return None
+
+        return solve(0, 0)
+
+    def _critical_path(self) -> list[str]:
+        """The chain of courses that sets the earliest possible finish, first course first."""
+        heights = self._heights(0)
+        if not heights:
+            return []
+        # On ties end at the later course, e.g. CMPSC 170 rather than its concurrent CMPSC 154.
+        bit = max(range(len(self.nodes)), key=lambda b: (heights[b], self.index.topo_rank[self.nodes[b]], -b))
+        path = []
+        while bit is not None:
+            path.append(self.graph.codes[self.nodes[bit]])
+            previous, latest = None, (-1, 0)
+            for group_mask, concurrent_mask in self.requirements[bit]:
+                options = [option for option in range(len(self.nodes)) if group_mask >> option & 1]
+                if not options:
+                    continue
+
+                def start_after(option: int) -> int:
+                    return heights[option] - (concurrent_mask >> option & 1)
+
+                best = min(options, key=start_after)
+                if (start_after(best), heights[best]) > latest:
+                    previous, latest = best, (start_after(best), heights[best])
+            bit = previous
+        return path[::-1]
+
+    def plan(self) -> dict:
+        started = time.perf_counter()
+        lower_bound = self._lower_bound(0) if self.nodes else 0
+        greedy = self._greedy() if self.nodes else []
+        best, optimal = greedy, True
+        if greedy and sum(len(q) for q in greedy) < len(self.nodes):
+            optimal = False
+
+        deadline = started + self.time_budget_ms / 1000
+        try:
+            for quarter_count in range(lower_bound, len(greedy)):
+                found = self._search(quarter_count, deadline)
+                if found is not None:
+                    best = found
+                    break
+        except _OutOfTime:
+            optimal = False
+
+        quarters = []
+        for offset, picked in enumerate(best):
+            codes = sorted((self.graph.codes[self.nodes[bit]] for bit in picked), key=_course_sort_key)
+            quarters.append(
+                {
+                    "quarter": offset + 1,
+                    "season": SEASONS[(self.start_season + offset) % len(SEASONS)],
+                    "courses": codes,
+                    "units": sum(self.unit_of[bit] for bit in picked),
+                }
+            )
+
+        return {
+            "quarters": quarters,
+            "quarter_count": len(quarters),
+            "lower_bound": lower_bound,
+            "optimal": optimal,
+            "critical_path": self._critical_path(),
+            "added_prerequisites": self.added_prerequisites,
+            "already_completed": self.already_done,
+            "unknown_courses": self.unknown,
+            "unschedulable": self.unschedulable,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+
+def plan_degree_path(
+    completed: Iterable[str] | None,
+    targets: Iterable[str],
+    max_units: int = 16,
+    offerings: dict[str, Iterable[str]] | None = None,
+    units: dict[str, int] | None = None,
+    start_season: str = "Fall",
+    time_budget_ms: float = PLANNER_TIME_BUDGET_MS,
+) -> dict:
+    return DegreePlanner(completed, targets, max_units, offerings, units, start_season, time_budget_ms).plan()
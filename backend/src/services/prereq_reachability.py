@@ -0,0 +1,175 @@
+from collections import deque
+from functools import lru_cache
+
+from .prereq_engine import PrereqGraph, get_prereq_graph
+
+
+def _iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class ReachabilityIndex:
+    """
+    Transitive closure of a PrereqGraph, stored as one int bitset per node.
+
+    `ancestors[n]` holds every course that appears anywhere below n in the
+    prerequisite tree (any option of any group counts), `descendants[n]` every
+    course n eventually unlocks. Both are built once in topological order, so a
+    lookup is a dict access plus decoding the set bits.
+    """
+
+    def __init__(self, graph: PrereqGraph):
+        self.graph = graph
+        size = len(graph.codes)
+        prereqs = [graph.prereq_ids(node) for node in range(size)]
+        dependents = [graph.dependents.get(node, []) for node in range(size)]
+
+        order = self._topological_order(prereqs, dependents)
+        self.acyclic = len(order) == size
+        # Position of each node in a prerequisite-first order; only meaningful when acyclic.
+        self.topo_rank: list[int] = [0] * size
+        for rank, node in enumerate(order):
+            self.topo_rank[node] = rank
+        self.ancestors: list[int] = [0] * size
+        for node in order:
+            mask = 0
+            for prereq in prereqs[node]:
+                mask |= self.ancestors[prereq] | (1 << prereq)
+            self.ancestors[node] = mask
+
+        self.descendants: list[int] = [0] * size
+        for node in reversed(order):
+            mask = 0
+            for dependent in dependents[node]:
+                mask |= self.descendants[dependent] | (1 << dependent)
+            self.descendants[node] = mask
+
+        self._fix_cycles(prereqs, dependents, not self.acyclic)
+
+    @staticmethod
+    def _topological_order(prereqs: list[list[int]], dependents: list[list[int]]) -> list[int]:
+        indegree = [len(p) for p in prereqs]
+        queue = deque(node for node, degree in enumerate(indegree) if degree == 0)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for dependent in dependents[node]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    queue.append(dependent)
+        return order
+
+    def _fix_cycles(self, prereqs: list[list[int]], dependents: list[list[int]], has_cycle: bool):
+        """Malformed data with a prerequisite cycle: iterate to a fixed point instead."""
+        if not has_cycle:
+            return
+        changed = True
+        while changed:
+            changed = False
+            for node in range(len(prereqs)):
+                ancestors = self.ancestors[node]
+                for prereq in prereqs[node]:
+                    ancestors |= self.ancestors[prereq] | (1 << prereq)
+                descendants = self.descendants[node]
+                for dependent in dependents[node]:
+                    descendants |= self.descendants[dependent] | (1 << dependent)
+                if ancestors != self.ancestors[node] or descendants != self.descendants[node]:
+                    self.ancestors[node] = ancestors
+                    self.descendants[node] = descendants
+                    changed = True
+
+    def _codes(self, mask: int) -> list[str]:
+        return [self.graph.codes[node] for node in sorted(_iter_bits(mask))]
+
+    def _require(self, course_code: str) -> int:
+        node = self.graph.id_of(course_code)
+        if node is None:
+            raise KeyError(course_code)
+        return node
+
+    def prerequisites(self, course_code: str) -> list[str]:
+        """Every course in the prerequisite tree of course_code."""
+        return self._codes(self.ancestors[self._require(course_code)])
+
+    def unlocks(self, course_code: str) -> list[str]:
+        """Every course that course_code is a direct or indirect prerequisite for."""
+        return self._codes(self.descendants[self._require(course_code)])
+
+    def requires(self, course_code: str, prerequisite: str) -> bool:
+        return bool(self.ancestors[self._require(course_code)] >> self._require(prerequisite) & 1)
+
+    def shortest_chain(self, course_code: str, start: str | None = None) -> list[str]:
+        """
+        Fewest-courses prerequisite chain ending at course_code, first course first.
+
+        With `start`, the chain begins at that course ([] if it is not a prerequisite
+        of course_code); otherwise it begins at the nearest course with no prerequisites.
+        """
+        target = self._require(course_code)
+        graph = self.graph
+
+        if start is not None:
+            source = self._require(start)
+            if source == target:
+                return [graph.codes[target]]
+            if not self.ancestors[target] >> source & 1:
+                return []
+            # Walk forward, only through courses that still lead to the target.
+            allowed = self.ancestors[target] | (1 << target)
+            parents = {source: None}
+            queue = deque([source])
+            while queue:
+                node = queue.popleft()
+                if node == target:
+                    break
+                for dependent in graph.dependents.get(node, ()):
+                    if dependent not in parents and allowed >> dependent & 1:
+                        parents[dependent] = node
+                        queue.append(dependent)
+            chain = []
+            node = target
+            while node is not None:
+                chain.append(graph.codes[node])
+                node = parents[node]
+            return chain[::-1]
+
+        # Walk backward to the nearest course with no prerequisites of its own.
+        children = {target: None}
+        queue = deque([target])
+        while queue:
+            node = queue.popleft()
+            prereqs = graph.prereq_ids(node)
+            if not prereqs:
+                chain = []
+                while node is not None:
+                    chain.append(graph.codes[node])
+                    node = children[node]
+                return chain
+            for prereq in prereqs:
+                if prereq not in children:
+                    children[prereq] = node
+                    queue.append(prereq)
+        return [graph.codes[target]]
+
+    def describe(self, course_code: str, start: str | None = None) -> dict:
+        node = self._require(course_code)
+        graph = self.graph
+        return {
+            "course": graph.codes[node],
+            "in_catalog": graph.is_catalog(node),
+            "prerequisite_groups": [[graph.codes[option] for option in group] for group in graph.groups.get(node, ())],
+            "all_prerequisites": self._codes(self.ancestors[node]),
+            "directly_unlocks": [graph.codes[dependent] for dependent in graph.dependents.get(node, [])],
+            "unlocks": self._codes(self.descendants[node]),
+            "shortest_chain": self.shortest_chain(course_code, start),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_reachability_index() -> ReachabilityIndex:
+    """Reachability index for the process-wide prerequisite graph."""
+    return ReachabilityIndex(get_prereq_graph())
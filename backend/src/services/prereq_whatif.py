@@ -0,0 +1,191 @@
+import hashlib
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Iterable
+
+from .prereq_engine import PrereqGraph, get_prereq_graph, normalize_course_code
+from .prereq_graph import (
+    _course_sort_key,
+    build_upper_division_flowchart_data,
+    extract_completed_courses_from_transcript,
+    extract_taken_or_in_progress_courses_from_transcript,
+)
+from .prereq_reachability import ReachabilityIndex, get_reachability_index
+
+WHAT_IF_CACHE_SIZE = int(os.getenv("WHAT_IF_CACHE_SIZE", "256"))
+
+
+def _normalized(codes: Iterable[str] | None) -> set[str]:
+    return {normalize_course_code(code) for code in (codes or []) if isinstance(code, str) and code.strip()}
+
+
+class WhatIfBase:
+    """
+    A student's flowchart state (eligible courses and tiers), kept so what-if
+    scenarios can be answered as a delta against it.
+
+    what_if() only re-evaluates the courses a scenario can affect: eligibility
+    for the direct dependents of the added/removed courses, and tiers for their
+    descendants (from the reachability index), in topological order. Everything
+    else is carried over from the base.
+    """
+
+    def __init__(
+        self,
+        completed: Iterable[str] | None,
+        accounted: Iterable[str] | None = None,
+        graph: PrereqGraph | None = None,
+        index: ReachabilityIndex | None = None,
+    ):
+        self.graph = graph or get_prereq_graph()
+        self.index = index or (get_reachability_index() if graph is None else ReachabilityIndex(self.graph))
+        self.completed = _normalized(completed)
+        self.accounted = _normalized(accounted) if accounted else set(self.completed)
+
+        flow = build_upper_division_flowchart_data(self.completed, self.accounted, graph=self.graph)
+        index_of = self.graph.index
+        self.targets = {index_of[node["id"]] for node in flow["nodes"]}
+        self.levels = {index_of[node["id"]]: node["tier"] for node in flow["nodes"] if not node["taken"]}
+        self.eligible = {index_of[node["id"]] for node in flow["nodes"] if node["eligible_now"]}
+        self.completed_ids = self.graph.to_ids(self.completed)
+        self.accounted_ids = self.graph.to_ids(self.accounted)
+
+    def _sorted_codes(self, nodes: Iterable[int]) -> list[str]:
+        return sorted((self.graph.codes[node] for node in nodes), key=_course_sort_key)
+
+    def what_if(self, added: Iterable[str] | None = None, removed: Iterable[str] | None = None) -> dict:
+        """
+        Effect of finishing `added` and dropping `removed` (a course in both counts as added).
+        Tier changes use None for courses that are off the remaining chart (taken).
+        """
+        graph = self.graph
+        added_codes, removed_codes = _normalized(added), _normalized(removed)
+        removed_codes -= added_codes
+        added_ids, removed_ids = graph.to_ids(added_codes), graph.to_ids(removed_codes)
+        ignored = sorted(
+            (code for code in added_codes | removed_codes if code not in graph.index),
+            key=_course_sort_key,
+        )
+        changed = added_ids | removed_ids
+
+        if not self.index.acyclic:
+            # Malformed data: tiers can't be updated in topological order, so rebuild.
+            scenario = WhatIfBase(
+                (self.completed - removed_codes) | added_codes,
+                (self.accounted - removed_codes) | added_codes,
+                graph=graph,
+                index=self.index,
+            )
+            remaining = set(scenario.levels)
+            return self._delta(added_codes, removed_codes, ignored, scenario.eligible, scenario.levels, remaining, self.targets)
+
+        accounted_ids = (self.accounted_ids - removed_ids) | added_ids
+        completed_ids = (self.completed_ids - removed_ids) | added_ids
+        remaining = self.targets - accounted_ids
+        satisfied_mask = graph.mask_of(completed_ids)
+        in_progress_mask = graph.mask_of(accounted_ids - completed_ids)
+
+        recheck = set(changed)
+        for node in changed:
+            recheck.update(graph.dependents.get(node, ()))
+        eligible = {node for node in self.eligible if node in remaining and node not in recheck}
+        for node in recheck:
+            if node in remaining and graph.is_eligible(node, satisfied_mask, in_progress_mask):
+                eligible.add(node)
+
+        descendants = 0
+        for node in changed:
+            descendants |= self.index.descendants[node]
+        affected = {node for node in self.targets if node in changed or descendants >> node & 1}
+
+        levels = {node: level for node, level in self.levels.items() if node in remaining and node not in affected}
+        for node in sorted(affected, key=self.index.topo_rank.__getitem__):
+            if node not in remaining:
+                continue
+            levels[node] = max(
+                (levels[prereq] + 1 for prereq in graph.prereq_ids(node) if prereq in remaining),
+                default=0,
+            )
+
+        return self._delta(added_codes, removed_codes, ignored, eligible, levels, remaining, affected)
+
+    def _delta(
+        self,
+        added: set[str],
+        removed: set[str],
+        ignored: list[str],
+        eligible: set[int],
+        levels: dict[int, int],
+        remaining: set[int],
+        candidates: set[int],
+    ) -> dict:
+        tier_changes = []
+        for node in self._sorted_ids(candidates):
+            before, after = self.levels.get(node), levels.get(node)
+            if before != after:
+                tier_changes.append({"course": self.graph.codes[node], "from": before, "to": after})
+
+        return {
+            "added": sorted(added, key=_course_sort_key),
+            "removed": sorted(removed, key=_course_sort_key),
+            "ignored_courses": ignored,
+            "newly_eligible": self._sorted_codes(eligible - self.eligible),
+            "newly_blocked": self._sorted_codes((self.eligible & remaining) - eligible),
+            "tier_changes": tier_changes,
+            "eligible_now": len(eligible),
+            "remaining_courses": len(remaining),
+        }
+
+    def _sorted_ids(self, nodes: Iterable[int]) -> list[int]:
+        return sorted(nodes, key=lambda node: _course_sort_key(self.graph.codes[node]))
+
+
+class WhatIfBaseCache:
+    """Per-session LRU of WhatIfBase, rebuilt when the session's course sets change."""
+
+    def __init__(self, max_entries: int = WHAT_IF_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.counters: Counter = Counter()
+        # session_id -> (course-set fingerprint, base)
+        self._entries: "OrderedDict[str, tuple[str, WhatIfBase]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(completed: list[str], accounted: list[str]) -> str:
+        raw = "|".join(completed) + "#" + "|".join(accounted)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, session_id: str, transcript: dict) -> WhatIfBase:
+        completed = extract_completed_courses_from_transcript(transcript)
+        accounted = extract_taken_or_in_progress_courses_from_transcript(transcript)
+        fingerprint = self._fingerprint(completed, accounted)
+
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(session_id)
+                self.counters["hits"] += 1
+                return entry[1]
+
+        self.counters["builds"] += 1
+        base = WhatIfBase(completed, accounted)
+        with self._lock:
+            self._entries[session_id] = (fingerprint, base)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return base
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "hits": self.counters.get("hits", 0),
+            "builds": self.counters.get("builds", 0),
+        }
@@ -1,14 +1,11 @@
-import json
+import hashlib
 import re
 from functools import lru_cache
-from pathlib import Path
 from typing import Any
 
-from .prereq_graph import normalize_course_code
+from .prereq_engine import PREREQ_COMPILED_PATH, PREREQ_DATA_PATH, get_prereq_graph, normalize_course_code
 
 
-PREREQ_DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "cmpsc_prereqs.json"
-
 PASSING_GRADES = {"A+", "A", "A-", "B+", "B", "B-", "C+", "C", "C-", "P", "S"}
 IN_PROGRESS_GRADES = {"IP", "I"}
 FAILING_GRADES = {"F", "NP", "U", "D", "D+", "D-"}
@@ -67,76 +64,23 @@ def _course_number(course_code: str) -> int | None:
     return int(m.group(1))
 
 
-def _is_explicit_course_code(token: str) -> bool:
-    return bool(re.match(r"^[A-Z]{1,6}(?:\s+[A-Z]{1,6})?\s+\d+[A-Z0-9]*$", token))
-
-
-def _normalize_prereq_token(token: str, last_subject: str | None) -> str | None:
-    t = token.strip().upper()
-    t = re.sub(r"^(OR|AND)\s+", "", t).strip()
-    if not t:
-        return None
-
-    # e.g. "2A" paired after "MATH 3A" -> "MATH 2A"
-    if re.match(r"^\d+[A-Z0-9]*$", t) and last_subject:
-        return normalize_course_code(f"{last_subject} {t}")
-
-    # e.g. "CS130A" without space
-    t = re.sub(r"^([A-Z]+)(\d)", r"\1 \2", t)
-    t = re.sub(r"\s+", " ", t).strip()
-
-    if _is_explicit_course_code(t):
-        return normalize_course_code(t)
-    return None
-
-
-def _prereq_groups(prereqs: list[str]) -> list[list[str]]:
-    groups: list[list[str]] = []
-    last_subject = None
-
-    for raw in prereqs:
-        if not isinstance(raw, str):
-            continue
-        stripped = raw.strip()
-        if not stripped:
-            continue
-
-        is_or = bool(re.match(r"^OR\s+", stripped, re.IGNORECASE))
-        cleaned = re.sub(r"^(OR|AND)\s+", "", stripped, flags=re.IGNORECASE).strip()
-        normalized = _normalize_prereq_token(cleaned, last_subject)
-        if not normalized:
-            continue
-
-        last_subject = normalized.split()[0]
-        if is_or and groups:
-            groups[-1].append(normalized)
-        else:
-            groups.append([normalized])
-
-    return groups
-
-
 @lru_cache(maxsize=1)
-def _load_prereq_data() -> dict:
-    with open(PREREQ_DATA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def _eligible_courses(completed_set: set[str], excluded_set: set[str]) -> list[str]:
-    data = _load_prereq_data()
-    eligible: list[str] = []
-
-    for course_code, details in data.items():
-        normalized_course = normalize_course_code(course_code)
-        if normalized_course in excluded_set:
-            continue
-
-        prereq_list = details.get("prereq_courses", [])
-        groups = _prereq_groups(prereq_list if isinstance(prereq_list, list) else [])
-        is_eligible = all(any(option in completed_set for option in group) for group in groups)
-        if is_eligible:
-            eligible.append(normalized_course)
-
+def prereq_data_version() -> str:
+    """Hash of the prerequisite data; advising contexts computed under another hash are stale."""
+    digest = hashlib.sha256()
+    for path in (PREREQ_DATA_PATH, PREREQ_COMPILED_PATH):
+        if path.exists():
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _eligible_courses(
+    completed_set: set[str],
+    excluded_set: set[str],
+    in_progress_set: set[str] = frozenset(),
+) -> list[str]:
+    eligible = get_prereq_graph().eligible_courses(completed_set, excluded_set, in_progress_set)
     eligible.sort(key=_course_sort_key)
     return eligible
 
@@ -182,7 +126,7 @@ def build_transcript_advising_context(transcript_data: dict) -> dict:
     not_passed_set -= completed_set
 
     excluded_from_recs = completed_set | in_progress_set
-    eligible_next = _eligible_courses(completed_set, excluded_from_recs)
+    eligible_next = _eligible_courses(completed_set, excluded_from_recs, in_progress_set)
 
     # If the student is already in upper-division CMPSC, avoid noisy lower-division recommendations.
     has_upper_division_cs = any(
@@ -196,10 +196,11 @@ function App() {
         return <span key={idx} className="assistant-line assistant-break" />;
       }
 
-      const imageMatch = line.match(/^!\[([^\]]*)\]\((https?:\/\/[^\s)]+)\)$/);
+      const imageMatch = line.match(/^!\[([^\]]*)\]\((https?:\/\/[^\s)]+|\/[^\s)]+)\)$/);
       if (imageMatch) {
         const altText = imageMatch[1] || "Generated image";
-        const imageUrl = imageMatch[2];
+        // Graphs rendered by the backend come back as API-relative paths.
+        const imageUrl = imageMatch[2].startsWith("/") ? apiUrl(imageMatch[2]) : imageMatch[2];
         return (
           <span key={idx} className="assistant-line assistant-image-wrap">
             <a href={imageUrl} target="_blank" rel="noreferrer">
@@ -133,7 +133,9 @@ function FlowchartPage({ apiUrl, getIdToken }) {
 
       const payload = await res.json();
       setStatusMessage(payload?.message || "Flowchart generated.");
-      setImageUrl(typeof payload?.image_url === "string" ? payload.image_url : "");
+      // The backend renders the chart itself and returns a path on the API host.
+      const rawImageUrl = typeof payload?.image_url === "string" ? payload.image_url : "";
+      setImageUrl(rawImageUrl.startsWith("/") ? apiUrl(rawImageUrl) : rawImageUrl);
       setPlanData(
         payload?.upper_division_plan && typeof payload.upper_division_plan === "object"
           ? payload.upper_division_plan
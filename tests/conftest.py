@@ -3,8 +3,16 @@ import sqlite3
 import sys
 import os
 from unittest.mock import MagicMock, patch
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from fastapi.testclient import TestClient
+from backend.src.container import AppContainer
 from backend.src.main import app
+from backend.src.managers.advising_context_cache import AdvisingContextCache
+from backend.src.managers.async_manager import AsyncManager
+from backend.src.managers.chat_write_behind import ChatWriteBehindQueue
+from backend.src.managers.flowchart_cache import FlowchartCache
+from backend.src.services.prereq_whatif import WhatIfBaseCache
 
 
 @pytest.fixture
@@ -50,3 +58,36 @@ def mock_vector_manager():
 @pytest.fixture
 def client():
     return TestClient(app)
+
+
+def make_fake_container(**deps):
+    """MagicMock container whose async facades and I/O pool behave like AppContainer's."""
+    container = MagicMock(**deps)
+    container.io_pool = ThreadPoolExecutor(max_workers=4)
+    container.async_session_manager = AsyncManager(container.session_manager, container.io_pool)
+    container.async_firebase_history = AsyncManager(container.firebase_history, container.io_pool)
+    container.run_blocking = partial(AppContainer.run_blocking, container)
+    container.chat_writer = ChatWriteBehindQueue(
+        lambda: container.session_manager, lambda: container.firebase_history, linger_seconds=0
+    )
+    container.advising_contexts = AdvisingContextCache(lambda: container.session_manager)
+    container.what_if_bases = WhatIfBaseCache()
+    container.flowcharts = FlowchartCache()
+    return container
+
+
+@pytest.fixture
+def svg_dir(tmp_path, monkeypatch):
+    """Points the flowchart SVG disk cache at tmp_path (the app imports it as `src`, tests as `backend.src`)."""
+    for name in ("src.services.flowchart_svg", "backend.src.services.flowchart_svg"):
+        if name in sys.modules:
+            monkeypatch.setattr(sys.modules[name], "FLOWCHART_SVG_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def reset_app_container():
+    """Drops any container a test installed on app.state so tests stay isolated."""
+    yield
+    if hasattr(app.state, "container"):
+        del app.state.container
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from langchain_core.messages import AIMessage
+
+from backend.src.main import app
+from backend.src.managers.response_cache import SemanticResponseCache
+from tests.conftest import make_fake_container
+
+
+def _slow_for(session_id: str, value=None, delay: float = 0.5):
+    def call(requested_session_id, *args):
+        if requested_session_id == session_id:
+            time.sleep(delay)
+        return value
+    return call
+
+
+@pytest.fixture
+def async_container():
+    container = make_fake_container()
+    container.session_manager.load_transcript_with_context.return_value = None
+    container.session_manager.load_summarized_history.return_value = (None, 0, [])
+    container.vector_manager.embeddings.embed_query.return_value = [0.3, 0.4]
+    container.vector_manager.routed_multi_search.return_value = ("professor_data", {})
+    container.response_cache = SemanticResponseCache(enabled=False)
+
+    async def answer(*args, **kwargs):
+        return {"messages": [AIMessage(content="ok")]}
+
+    agent = MagicMock()
+    agent.ainvoke.side_effect = answer
+    container.get_agent.return_value = agent
+    app.state.container = container
+    yield container
+    container.chat_writer.close()
+    container.io_pool.shutdown()
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_chat_requests_progress_while_transcript_store_is_slow(async_container):
+    async_container.session_manager.load_transcript_with_context.side_effect = _slow_for("slow")
+
+    async with _client() as client:
+        slow = asyncio.create_task(
+            client.post("/chat/response", json={"chat_session_id": "slow", "message": "hi"})
+        )
+        await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        fast = await client.post("/chat/response", json={"chat_session_id": "fast", "message": "hi"})
+        fast_elapsed = time.perf_counter() - started
+
+        assert fast.json()["response"] == "ok"
+        assert not slow.done()
+        assert fast_elapsed < 0.3
+        assert (await slow).json()["response"] == "ok"
+
+
+@pytest.mark.asyncio
+async def test_chat_response_does_not_wait_for_slow_history_write(async_container):
+    def slow_save(session_id, rows):
+        time.sleep(0.5)
+
+    async_container.session_manager.save_messages.side_effect = slow_save
+
+    async with _client() as client:
+        started = time.perf_counter()
+        response = await client.post("/chat/response", json={"chat_session_id": "slow", "message": "hi"})
+        elapsed = time.perf_counter() - started
+
+        assert response.json()["response"] == "ok"
+        assert elapsed < 0.3
+
+        cleared = await client.delete("/transcript/clear", params={"session_id": "other"})
+        assert cleared.status_code == 200
+
+    assert async_container.chat_writer.flush()
+    async_container.session_manager.save_messages.assert_called_once()
+    async_container.session_manager.clear_transcript.assert_called_once_with("other")
@@ -0,0 +1,113 @@
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from backend.src.managers.session_manager import SessionManager
+from backend.src.services.chat_context import (
+    build_history_messages,
+    estimate_tokens,
+    fold_session_history,
+    pending_fold,
+    split_history,
+    turn_messages,
+)
+
+
+def _turns(count: int, size: int = 40):
+    messages = []
+    for i in range(count):
+        messages.append(HumanMessage(content=f"q{i} " + "x" * size))
+        messages.append(AIMessage(content=f"a{i} " + "y" * size))
+    return messages
+
+
+def _session_manager():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    with patch("backend.src.managers.session_manager.sqlite3.connect", return_value=conn):
+        return SessionManager()
+
+
+def test_split_history_keeps_last_turns_within_budget():
+    messages = _turns(6)
+
+    older, window = split_history(messages, keep_turns=2, token_budget=10_000)
+    assert window == messages[-4:]
+    assert older == messages[:-4]
+
+    per_message = estimate_tokens(messages[-1].content)
+    older, window = split_history(messages, keep_turns=2, token_budget=per_message * 3)
+    assert window == messages[-3:]
+
+    # The summary counts against the same budget.
+    _, window = split_history(messages, summary="s" * 4 * per_message, keep_turns=2, token_budget=per_message * 3)
+    assert len(window) < 3
+
+
+def test_build_history_messages_prepends_summary():
+    window = _turns(1)
+    out = build_history_messages("Student finished CMPSC 16.", window)
+    assert isinstance(out[0], SystemMessage)
+    assert "CMPSC 16" in out[0].content
+    assert out[1:] == window
+    assert build_history_messages(None, window) == window
+
+
+def test_build_history_messages_keeps_unfolded_older_messages():
+    older, window = _turns(1), _turns(2)[2:]
+    out = build_history_messages("summary", window, pending=older)
+    assert out[1:] == older + window
+
+
+def test_no_turn_is_dropped_from_the_prompt_while_folds_lag():
+    sm = _session_manager()
+    llm = MagicMock()
+    # The fake summarizer keeps everything it was shown, so folded turns stay visible.
+    llm.invoke.side_effect = lambda prompt: AIMessage(content=prompt.split("CURRENT SUMMARY:\n", 1)[1])
+    queued_fold = None
+
+    for turn in range(12):
+        summary, count, unsummarized = sm.load_summarized_history("s-1")
+        older, window = split_history(unsummarized, summary)
+        prompt = "\n".join(str(m.content) for m in build_history_messages(summary, window, pending=older))
+        for earlier in range(turn):
+            assert f"q{earlier} " in prompt, f"turn {earlier} missing from the prompt at turn {turn}"
+
+        sm.save_message("s-1", "human", f"q{turn} question")
+        sm.save_message("s-1", "ai", f"a{turn} answer")
+        # Folds run behind the turn's writes, i.e. after the next prompt was built.
+        if queued_fold:
+            fold_session_history(sm, llm, "s-1", *queued_fold)
+        to_fold = pending_fold(unsummarized + turn_messages(f"q{turn} question", f"a{turn} answer"), summary)
+        queued_fold = (summary, count, to_fold) if to_fold else None
+
+
+def test_pending_fold_waits_for_enough_older_messages():
+    assert pending_fold(_turns(5), None, min_messages=4) == []
+    assert len(pending_fold(_turns(6), None, min_messages=4)) == 4
+
+
+def test_fold_session_history_is_incremental_and_guarded():
+    sm = _session_manager()
+    for message in _turns(6):
+        sm.save_message("s-1", "human" if isinstance(message, HumanMessage) else "ai", message.content)
+
+    llm = MagicMock()
+    llm.invoke.return_value = AIMessage(content="Discussed q0 and q1.")
+
+    summary, count, unsummarized = sm.load_summarized_history("s-1")
+    older = pending_fold(unsummarized, summary, min_messages=4)
+    assert fold_session_history(sm, llm, "s-1", summary, count, older)
+
+    summary, count, unsummarized = sm.load_summarized_history("s-1")
+    assert summary == "Discussed q0 and q1."
+    assert count == 4
+    assert len(unsummarized) == 8
+
+    # Only the new messages and the previous summary are sent to the summarizer.
+    prompt = llm.invoke.call_args.args[0]
+    assert "q0" in prompt and "q2" not in prompt
+
+    # A fold computed from a stale count is rejected instead of clobbering the newer summary.
+    assert not fold_session_history(sm, llm, "s-1", None, 0, older)
+    assert sm.load_summarized_history("s-1")[1] == 4
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain.agents import create_agent
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from backend.src.api.chat import CHAT_TOOLS, _prepare_chat_turn
+from backend.src.main import app
+from backend.src.managers.response_cache import SemanticResponseCache
+from backend.src.models.chat_request_dto import ChatRequestDTO
+from tests.conftest import make_fake_container
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Returns canned AIMessages in order, including tool calls."""
+
+    responses: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.responses.pop(0))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def stream_container():
+    container = make_fake_container()
+    container.vector_manager.routed_multi_search.return_value = ("professor_data", {})
+    container.session_manager.load_transcript_with_context.return_value = None
+    container.session_manager.load_summarized_history.return_value = (None, 0, [])
+    container.vector_manager.embeddings.embed_query.return_value = [0.3, 0.4]
+    container.response_cache = SemanticResponseCache(threshold=0.95)
+    app.state.container = container
+    yield container
+    container.chat_writer.close()
+    container.io_pool.shutdown()
+
+
+def test_stream_emits_tokens_then_done_and_persists(stream_container):
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="Take CMPSC 130A next")]))
+    stream_container.get_agent.return_value = create_agent(model, [])
+
+    response = TestClient(app).post(
+        "/chat/stream",
+        json={"chat_session_id": "s-1", "message": "what next?", "model_name": "test-model"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = _parse_sse(response.text)
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "Take CMPSC 130A next"
+    assert events[-1] == ("done", {"response": "Take CMPSC 130A next", "model_name": "test-model"})
+
+    assert stream_container.chat_writer.flush()
+    session_id, rows = stream_container.session_manager.save_messages.call_args.args
+    assert session_id == "s-1"
+    assert [(role, content) for role, content, _ in rows] == [("human", "what next?"), ("ai", "Take CMPSC 130A next")]
+
+
+def test_stream_reports_tool_progress(stream_container, svg_dir):
+    model = ScriptedChatModel(responses=[
+        AIMessage(
+            content="",
+            tool_calls=[{
+                "name": "generate_course_prereqs_graph",
+                "args": {"completed_courses": ["CMPSC 8"]},
+                "id": "call-1",
+            }],
+        ),
+        AIMessage(content="Here is your graph"),
+    ])
+    stream_container.get_agent.return_value = create_agent(model, CHAT_TOOLS)
+
+    response = TestClient(app).post("/chat/stream", json={"chat_session_id": "s-2", "message": "graph please"})
+    events = _parse_sse(response.text)
+    names = [name for name, _ in events]
+
+    assert names.index("tool_start") < names.index("tool_end") < names.index("done")
+    assert events[names.index("tool_start")][1]["name"] == "generate_course_prereqs_graph"
+    assert events[-1][1]["response"] == "Here is your graph"
+
+
+def test_repeat_first_turn_question_is_served_from_response_cache(stream_container):
+    agent = MagicMock()
+
+    async def answer(*args, **kwargs):
+        return {"messages": [AIMessage(content="CMPSC 130A is tough but fair")]}
+
+    agent.ainvoke.side_effect = answer
+    stream_container.get_agent.return_value = agent
+    stream_container.vector_manager.routed_multi_search.return_value = ("reddit_class_data", {"reddit_class_data": []})
+    client = TestClient(app)
+    payload = {"chat_session_id": "s-3", "message": "is CMPSC 130A hard", "model_name": "test-model"}
+
+    first = client.post("/chat/response", json=payload).json()
+    second = client.post("/chat/response", json={**payload, "chat_session_id": "s-4"}).json()
+
+    assert first["response"] == second["response"] == "CMPSC 130A is tough but fair"
+    assert agent.ainvoke.call_count == 1
+    assert stream_container.vector_manager.routed_multi_search.call_count == 1
+
+    # Re-ingesting a namespace the answer came from evicts it.
+    assert stream_container.response_cache.invalidate_namespace("reddit_class_data") == 1
+    client.post("/chat/response", json={**payload, "chat_session_id": "s-5"})
+    assert agent.ainvoke.call_count == 2
+
+
+def test_prepare_turn_overlaps_slow_retrieval_branches(stream_container):
+    def slow(value):
+        def call(*args, **kwargs):
+            time.sleep(0.2)
+            return value
+        return call
+
+    stream_container.session_manager.load_transcript_with_context.side_effect = slow(None)
+    stream_container.session_manager.load_summarized_history.side_effect = slow((None, 0, []))
+    stream_container.vector_manager.embeddings.embed_query.side_effect = slow([0.3, 0.4])
+    http_request = MagicMock(headers={})
+    request = ChatRequestDTO(chat_session_id="s-7", message="is CMPSC 130A hard")
+
+    started = time.perf_counter()
+    turn = asyncio.run(_prepare_chat_turn(request, http_request, stream_container, "test-model"))
+    elapsed = time.perf_counter() - started
+
+    assert turn["messages"] is not None
+    assert elapsed < 0.45
+    for branch in ("transcript", "history", "embedding", "retrieval", "total"):
+        assert branch in turn["timings"]
+    assert turn["timings"]["transcript"] >= 200
+
+
+def test_deterministic_transcript_answer_does_not_wait_for_the_embedding(stream_container):
+    release = threading.Event()
+
+    def stuck_embedding(text):
+        release.wait(2)
+        raise RuntimeError("embedding quota exceeded")
+
+    stream_container.advising_contexts = MagicMock()
+    stream_container.advising_contexts.load.return_value = ({"courses": []}, {"major": "Computer Science"})
+    stream_container.vector_manager.embeddings.embed_query.side_effect = stuck_embedding
+    request = ChatRequestDTO(chat_session_id="s-8", message="what should I take next?")
+
+    started = time.perf_counter()
+    turn = asyncio.run(_prepare_chat_turn(request, MagicMock(headers={}), stream_container, "test-model"))
+    release.set()
+
+    assert "Transcript-Based CS Plan" in turn["deterministic_response"]
+    assert time.perf_counter() - started < 1.0
+
+
+def test_embedding_failure_falls_back_to_text_search(stream_container):
+    stream_container.vector_manager.embeddings.embed_query.side_effect = RuntimeError("embedding quota exceeded")
+    request = ChatRequestDTO(chat_session_id="s-9", message="is CMPSC 130A hard")
+
+    turn = asyncio.run(_prepare_chat_turn(request, MagicMock(headers={}), stream_container, "test-model"))
+
+    assert turn["messages"] is not None and turn["cache_vector"] is None
+    assert stream_container.vector_manager.routed_multi_search.call_args.kwargs["query_vector"] is None
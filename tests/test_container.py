@@ -0,0 +1,62 @@
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from backend.src.container import AppContainer
+from backend.src.main import app
+
+
+def test_container_builds_dependencies_once():
+    with patch("backend.src.container.VectorManager") as MockVM, \
+            patch("backend.src.container.SessionManager") as MockSM, \
+            patch("backend.src.container.FirebaseChatHistoryManager") as MockFB:
+        container = AppContainer(pinecone_api_key="fake-key")
+
+        assert container.vector_manager is container.vector_manager
+        assert container.session_manager is container.session_manager
+        assert container.firebase_history is container.firebase_history
+
+        MockVM.assert_called_once_with("fake-key")
+        MockSM.assert_called_once()
+        MockFB.assert_called_once()
+
+
+def test_agents_are_cached_per_model_name():
+    container = AppContainer(pinecone_api_key="fake-key")
+    llm_factory = MagicMock(side_effect=lambda name: f"llm:{name}")
+    agent_factory = MagicMock(side_effect=lambda llm: f"agent:{llm}")
+
+    first = container.get_agent("gemini-a", agent_factory, llm_factory)
+    again = container.get_agent("gemini-a", agent_factory, llm_factory)
+    other = container.get_agent("gemini-b", agent_factory, llm_factory)
+
+    assert first == again == "agent:llm:gemini-a"
+    assert other == "agent:llm:gemini-b"
+    assert llm_factory.call_count == 2
+    assert agent_factory.call_count == 2
+
+
+def test_metrics_summarise_recent_turn_timings():
+    container = AppContainer(pinecone_api_key="fake-key")
+    for total in (10.0, 20.0, 30.0):
+        container.record_turn_timings({"embedding": 5.0, "total": total})
+
+    timings = container.metrics()["turn_timings_ms"]
+    assert timings["total"] == {"p50": 20.0, "p95": 30.0, "samples": 3}
+    assert timings["embedding"]["p50"] == 5.0
+
+
+def test_lifespan_installs_container_and_routes_reuse_it():
+    with TestClient(app) as client:
+        container = app.state.container
+        assert type(container).__name__ == "AppContainer"
+
+        fake_sm = MagicMock()
+        container._session_manager = fake_sm
+
+        for _ in range(2):
+            response = client.delete("/transcript/clear", params={"session_id": "s-1"})
+            assert response.status_code == 200
+
+        assert app.state.container is container
+        assert fake_sm.clear_transcript.call_count == 2
@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+from backend.src.managers.flowchart_cache import FlowchartCache
+from backend.src.services.prereq_graph import build_mermaid_markup, build_upper_division_flowchart_data
+
+
+def test_equivalent_course_sets_share_an_entry():
+    cache = FlowchartCache()
+
+    first = cache.flowchart_data(["CMPSC 16", "cs8"], ["CMPSC 8", "CMPSC 16"])
+    second = cache.flowchart_data(["cmpsc 8", "CMPSC 16", "CMPSC 16"], ["CMPSC 16", "CMPSC 8"])
+
+    assert second is first
+    assert first == build_upper_division_flowchart_data(["CMPSC 8", "CMPSC 16"])
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_layering_and_kind_are_part_of_the_key(svg_dir):
+    cache = FlowchartCache()
+
+    cache.flowchart_data(["CMPSC 16"])
+    cache.flowchart_data(["CMPSC 16"], layering="alap")
+    markup = cache.mermaid_markup(["CMPSC 16"])
+
+    assert markup == build_mermaid_markup(["CMPSC 16"])
+    assert cache.stats()["misses"] == 3
+    image_url, _ = cache.remaining_path_image(["CMPSC 16"])
+    cache.remaining_path_image(["CMPSC 16"])
+    assert image_url == "/transcript/flowchart.svg?completed=CMPSC+16"
+    assert cache.stats()["misses"] == 4
+    assert cache.stats()["hits"] == 1
+
+
+def test_prereq_data_change_misses_and_lru_evicts():
+    cache = FlowchartCache(max_entries=1)
+
+    cache.mermaid_markup(["CMPSC 8"])
+    with patch("backend.src.managers.flowchart_cache.prereq_data_version", return_value="new-data"):
+        cache.mermaid_markup(["CMPSC 8"])
+    cache.mermaid_markup(["CMPSC 8"])
+
+    assert cache.stats() == {"entries": 1, "hits": 0, "misses": 3, "hit_rate": 0.0}
+
+
+def test_remaining_path_image_url_survives_svg_eviction(client, svg_dir):
+    image_url, _ = FlowchartCache().remaining_path_image(["cmpsc 16", "CMPSC 8"])
+    assert image_url == "/transcript/flowchart.svg?completed=CMPSC+16&completed=CMPSC+8"
+    first = client.get(image_url)
+
+    for path in svg_dir.glob("*.svg"):
+        path.unlink()
+
+    again = client.get(image_url)
+    assert first.status_code == again.status_code == 200
+    assert again.text == first.text
+    assert "CMPSC 130A" in again.text
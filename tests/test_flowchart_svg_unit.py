@@ -0,0 +1,77 @@
+import os
+import xml.dom.minidom
+from unittest.mock import patch
+
+from backend.src.services import flowchart_svg
+from backend.src.services.flowchart_svg import render_flowchart_svg, svg_path, write_flowchart_svg
+from backend.src.services.prereq_graph import build_remaining_path_layout
+
+TIERS = [["CMPSC 8", "MATH 3A"], ["CMPSC 16"], ["CMPSC 24", "CMPSC 40"]]
+EDGES = [("CMPSC 8", "CMPSC 16"), ("MATH 3A", "CMPSC 16"), ("CMPSC 16", "CMPSC 24"), ("CMPSC 16", "CMPSC 40")]
+
+
+def test_render_draws_every_course_and_edge():
+    svg = render_flowchart_svg(TIERS, EDGES, highlighted=["CMPSC 24"])
+
+    document = xml.dom.minidom.parseString(svg)
+    labels = [text.firstChild.data for text in document.getElementsByTagName("text")]
+    assert sorted(labels) == sorted(sum(TIERS, []))
+    assert len(document.getElementsByTagName("path")) == len(EDGES) + 1  # + arrowhead marker
+    assert svg.count('fill="#dcfce7"') == 1
+
+
+def test_labels_are_escaped():
+    svg = render_flowchart_svg([["A&B <1>"]], [])
+
+    assert "A&amp;B &lt;1&gt;" in svg
+    xml.dom.minidom.parseString(svg)
+
+
+def test_write_is_cached_by_graph_hash(svg_dir):
+    digest = write_flowchart_svg(TIERS, EDGES)
+    assert (svg_dir / f"{digest}.svg").exists()
+
+    with patch.object(flowchart_svg, "render_flowchart_svg") as render:
+        assert write_flowchart_svg(TIERS, list(reversed(EDGES))) == digest
+    render.assert_not_called()
+    assert write_flowchart_svg(TIERS, EDGES, highlighted=["CMPSC 16"]) != digest
+
+
+def test_disk_cache_evicts_least_recently_used_files(svg_dir):
+    first = write_flowchart_svg([["CMPSC 8"]], [], max_files=2)
+    second = write_flowchart_svg([["CMPSC 16"]], [], max_files=2)
+    os.utime(svg_dir / f"{first}.svg", (1, 1))
+    os.utime(svg_dir / f"{second}.svg", (2, 2))
+    write_flowchart_svg([["CMPSC 8"]], [], max_files=2)  # cache hit refreshes first's mtime
+
+    third = write_flowchart_svg([["CMPSC 24"]], [], max_files=2)
+
+    assert sorted(path.stem for path in svg_dir.glob("*.svg")) == sorted([first, third])
+
+
+def test_svg_path_only_accepts_hashes(svg_dir):
+    assert svg_path("../../etc/passwd") is None
+    assert svg_path("a" * 64) == svg_dir / f"{'a' * 64}.svg"
+
+
+def test_remaining_path_layout_tiers_follow_prerequisites():
+    tiers, edges = build_remaining_path_layout(["CMPSC 8", "CMPSC 16"])
+    tier_of = {course: index for index, tier in enumerate(tiers) for course in tier}
+
+    assert "CMPSC 16" not in tier_of
+    assert edges and all(tier_of[source] < tier_of[target] for source, target in edges)
+
+
+def test_flowchart_svg_route(client, svg_dir):
+    response = client.get("/transcript/flowchart.svg", params={"completed": ["CMPSC 8", "CMPSC 16"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("image/svg+xml")
+    assert "CMPSC 130A" in response.text
+
+    digest = next(svg_dir.glob("*.svg")).stem
+    again = client.get("/transcript/flowchart.svg", params={"graph": digest})
+    assert again.status_code == 200
+    assert again.text == response.text
+
+    assert client.get("/transcript/flowchart.svg", params={"graph": "../secrets"}).status_code == 400
+    assert client.get("/transcript/flowchart.svg", params={"graph": "0" * 64}).status_code == 404
@@ -1,6 +1,25 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
+
+from langchain_core.documents import Document
+from backend.src.managers.catalog_availability import CatalogAvailabilityStore
+from backend.src.managers.chat_write_behind import ChatWriteBehindQueue
+from backend.src.managers.embedding_cache import CachedEmbeddings
+from backend.src.managers.firebase_chat_history_manager import FirebaseChatHistoryManager
+from backend.src.managers.ingest_ledger import IngestLedger
+from backend.src.managers.ingest_pipeline import IngestCheckpoint, IngestPipeline
+from backend.src.managers.response_cache import SemanticResponseCache
 from backend.src.managers.session_manager import SessionManager
-from backend.src.managers.vector_manager import VectorManager
+from backend.src.managers.vector_manager import VectorManager, document_id
+from backend.src.services.namespace_router import NamespaceRouter
 
 
 # --- SESSION MANAGER TESTS ---
@@ -21,42 +40,867 @@ def test_session_crud(mock_db_connection):
 
 
 # --- VECTOR MANAGER TESTS ---
+@contextmanager
+def _offline_vector_manager_deps():
+    """Patches Pinecone, Gemini and the local cache files so VectorManager builds offline."""
+    with patch("backend.src.managers.vector_manager.Pinecone"), \
+            patch("backend.src.managers.vector_manager.GoogleGenerativeAIEmbeddings"), \
+            patch("backend.src.managers.vector_manager.PineconeVectorStore"), \
+            patch("backend.src.managers.vector_manager.time"), \
+            patch("backend.src.managers.vector_manager.NamespaceRouter",
+                  lambda: NamespaceRouter(centroids_path=None)), \
+            patch("backend.src.managers.vector_manager.CachedEmbeddings",
+                  lambda inner, **kwargs: CachedEmbeddings(inner, db_path=None, **kwargs)), \
+            patch("backend.src.managers.vector_manager.getLLM") as MockGetLLM:
+        yield MockGetLLM
+
+
 def test_vector_manager_routing():
     """Test that the route_query method selects the correct namespace."""
-
-    # We mock the internal components of VectorManager
-    with patch("backend.src.managers.vector_manager.Pinecone"), \
-            patch("backend.src.managers.vector_manager.OllamaEmbeddings"), \
-            patch("backend.src.managers.vector_manager.ChatOllama") as MockOllama:
+    with _offline_vector_manager_deps() as MockGetLLM:
         # Setup the mock LLM for routing
-        mock_llm = MockOllama.return_value
+        mock_llm = MockGetLLM.return_value
 
         # Create a dummy object to mimic the Pydantic model output
         class MockRoute:
-            namespace = "professor_data"
+            namespace = "school_reviews"
 
         mock_llm.with_structured_output.return_value.invoke.return_value = MockRoute()
 
         vm = VectorManager(api_key="fake-key")
 
-        # Test routing
+        # Clear keyword signal: answered locally, no LLM round trip.
         namespace = vm.route_query("Who is Professor Smith?")
         assert namespace == "professor_data"
+        mock_llm.with_structured_output.return_value.invoke.assert_not_called()
+
+        # No signal at all: falls back to the LLM router.
+        decision = vm.route_query_with_decision("hello there")
+        assert decision.namespace == "school_reviews"
+        assert decision.source == "llm"
+
+        stats = vm.router.stats_snapshot()
+        assert stats["rules"] == 1
+        assert stats["llm"] == 1
+        assert stats["llm_fallback_rate"] == 0.5
 
 
 def test_vector_manager_search_fallback():
-    with patch("backend.src.managers.vector_manager.Pinecone"), \
-            patch("backend.src.managers.vector_manager.OllamaEmbeddings"), \
-            patch("backend.src.managers.vector_manager.ChatOllama") as MockOllama:
+    with _offline_vector_manager_deps():
         vm = VectorManager(api_key="fake-key")
         vm.route_query = MagicMock(return_value="professor_data")
+        vm.embeddings = MagicMock()
+        vm.embeddings.embed_query.return_value = [0.1, 0.2]
 
         vm.vector_store = MagicMock()
-        vm.vector_store.similarity_search.side_effect = [
+        vm.vector_store.similarity_search_by_vector.side_effect = [
             Exception("Namespace error"),
             ["Fallback Doc"]
         ]
 
         results = vm.std_search("query")
 
-        assert results == ["Fallback Doc"]
\ No newline at end of file
+        assert results == ["Fallback Doc"]
+        vm.embeddings.embed_query.assert_called_once_with("query")
+
+
+def test_search_reuses_self_query_retriever_until_schema_changes(tmp_path, monkeypatch):
+    schema_file = tmp_path / "schemas.json"
+    schema_file.write_text('{"professor_data": [{"name": "department", "description": "Dept", "type": "string"}]}')
+    monkeypatch.setattr("backend.src.managers.vector_manager.SCHEMA_FILE", str(schema_file))
+    with _offline_vector_manager_deps():
+        vm = VectorManager(api_key="fake-key")
+    vm.route_query = MagicMock(return_value="professor_data")
+    vm.vector_store = MagicMock()
+
+    with patch("backend.src.managers.vector_manager.SelfQueryRetriever") as MockRetriever:
+        MockRetriever.from_llm.return_value.invoke.return_value = [Document(page_content="Prof A")]
+        assert vm.search("cs profs", k=4)[0].page_content == "Prof A"
+        vm.search("math profs", k=4)
+        assert MockRetriever.from_llm.call_count == 1
+        vm.search("math profs", k=2)
+        assert MockRetriever.from_llm.call_count == 2
+
+        schema_file.write_text('{"professor_data": [{"name": "rating", "description": "Stars", "type": "float"}]}')
+        stat = schema_file.stat()
+        os.utime(schema_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        vm.search("cs profs", k=4)
+        assert MockRetriever.from_llm.call_count == 3
+        assert MockRetriever.from_llm.call_args.kwargs["metadata_field_info"][0].name == "rating"
+
+        vm.llm = MagicMock()
+        vm.llm.invoke.return_value.content = "Course taught"
+        vm._infer_and_save_schema([Document(page_content="x", metadata={"course": "CMPSC 8"})], "professor_data")
+        vm.search("cs profs", k=4)
+        assert MockRetriever.from_llm.call_count == 4
+
+    assert vm.retriever_counters["hits"] == 1 and vm.retriever_counters["misses"] == 4
+    vm.route_query.return_value = "school_reviews"
+    vm.search("dorms")
+    vm.vector_store.similarity_search.assert_called_once_with("dorms", k=5, namespace="school_reviews")
+
+
+def test_ingest_data_runs_pipeline_and_updates_centroid():
+    with _offline_vector_manager_deps():
+        vm = VectorManager(api_key="fake-key")
+    vm._infer_and_save_schema = MagicMock()
+    vm._ingest_pipeline = IngestPipeline(CountingEmbeddings(), MagicMock(), embed_batch_size=2)
+    vm._ingest_ledger = IngestLedger(":memory:")
+    docs = [Document(page_content="Great lectures"), Document(page_content="Hard midterms")]
+
+    stats = vm.ingest_data(docs, "professor_data")
+
+    assert stats["documents"] == 2 and stats["failed_batches"] == 0
+    upserted = vm._ingest_pipeline.index.upsert.call_args.kwargs["vectors"]
+    assert [record[0] for record in upserted] == [hashlib.md5(doc.page_content.encode()).hexdigest() for doc in docs]
+    assert vm.router._counts["professor_data"] == 2
+
+
+class FakeIndex:
+    """Pinecone index stand-in that keeps upserted values so fetch() can return them."""
+
+    def __init__(self):
+        self.values = {}
+
+    def upsert(self, vectors, namespace):
+        for vector_id, values, _metadata in vectors:
+            self.values[vector_id] = values
+
+    def fetch(self, ids, namespace):
+        return SimpleNamespace(vectors={
+            vector_id: SimpleNamespace(values=self.values[vector_id]) for vector_id in ids if vector_id in self.values
+        })
+
+    def delete(self, ids, namespace):
+        for vector_id in ids:
+            self.values.pop(vector_id, None)
+
+
+def test_ingest_data_keeps_the_centroid_equal_to_the_stored_vectors():
+    vm = _ledgered_vector_manager()
+    index = FakeIndex()
+    vm._ingest_pipeline.index = index
+    vm.ingest_data([_reddit_post("a1", "CS 16"), _reddit_post("b2", "Take 24"), _reddit_post("c3", "PSTAT")], "reddit")
+
+    # a1 is re-embedded with a new body and c3 is deleted.
+    stats = vm.ingest_data(
+        [_reddit_post("a1", "CS 16 is a lot of work"), _reddit_post("b2", "Take 24")], "reddit", prune=True
+    )
+
+    assert stats["documents"] == 1 and stats["deleted"] == 1
+    assert vm.router._counts["reddit"] == len(index.values) == 2
+    assert vm.router._sums["reddit"] == [sum(values[0] for values in index.values.values()), 0.0]
+
+
+def test_ingest_data_only_embeds_documents_missing_from_the_ledger():
+    with _offline_vector_manager_deps():
+        vm = VectorManager(api_key="fake-key")
+    vm._infer_and_save_schema = MagicMock()
+    embeddings = CountingEmbeddings()
+    vm._ingest_pipeline = IngestPipeline(embeddings, MagicMock(), embed_batch_size=10)
+    vm._ingest_ledger = IngestLedger(":memory:")
+    nightly = [Document(page_content=f"review {i}") for i in range(20)]
+
+    vm.ingest_data(nightly, "school_reviews")
+    refreshed = nightly[1:] + [Document(page_content="review 20"), Document(page_content="review 20")]
+    stats = vm.ingest_data(refreshed, "school_reviews")
+
+    assert embeddings.document_calls[-1] == ["review 20"]
+    assert stats["unchanged"] == 20
+    assert stats["stale_ids"] == [hashlib.md5(b"review 0").hexdigest()]
+    assert stats["deleted"] == 1
+    vm._ingest_pipeline.index.delete.assert_called_once_with(ids=stats["stale_ids"], namespace="school_reviews")
+    assert vm._infer_and_save_schema.call_args.args[0] == [refreshed[-2]]
+
+    unchanged = vm.ingest_data(refreshed, "school_reviews")
+    assert unchanged["documents"] == 0 and len(embeddings.document_calls) == 3
+
+    forced = vm.ingest_data(refreshed, "school_reviews", force=True)
+    assert forced["documents"] == 20
+
+
+def _ledgered_vector_manager(embeddings=None):
+    with _offline_vector_manager_deps():
+        vm = VectorManager(api_key="fake-key")
+    vm._infer_and_save_schema = MagicMock()
+    vm._ingest_pipeline = IngestPipeline(embeddings or CountingEmbeddings(), MagicMock(), embed_batch_size=10)
+    vm._ingest_ledger = IngestLedger(":memory:")
+    vm._catalog_availability = CatalogAvailabilityStore(":memory:")
+    return vm
+
+
+def _reddit_post(post_id, text, score=1):
+    return Document(page_content=text, metadata={"post_id": post_id, "score": score, "source_key": f"reddit:{post_id}"})
+
+
+def test_ingest_data_overwrites_changed_records_under_their_source_key():
+    embeddings = CountingEmbeddings()
+    vm = _ledgered_vector_manager(embeddings)
+    index = vm._ingest_pipeline.index
+
+    vm.ingest_data([_reddit_post("a1", "CS 16 is fine"), _reddit_post("b2", "Take 24 early")], "reddit_class_data")
+    first_ids = [record[0] for record in index.upsert.call_args.kwargs["vectors"]]
+
+    # Edited body for a1, new vote count for b2: both re-upserted under the ids they already had.
+    stats = vm.ingest_data(
+        [_reddit_post("a1", "CS 16 is fine (edit: hard)"), _reddit_post("b2", "Take 24 early", score=9)],
+        "reddit_class_data",
+    )
+
+    assert [record[0] for record in index.upsert.call_args.kwargs["vectors"]] == first_ids
+    assert stats["documents"] == 2 and stats["stale_ids"] == [] and stats["deleted"] == 0
+    index.delete.assert_not_called()
+    assert vm.ingest_data([_reddit_post("a1", "CS 16 is fine (edit: hard)")], "reddit_class_data", prune=False)[
+        "stale_ids"
+    ] == first_ids[1:]
+
+
+def test_catalog_quarter_rollover_overwrites_last_quarters_vectors():
+    vm = _ledgered_vector_manager()
+    index = vm._ingest_pipeline.index
+    courses = [f"CMPSC {n}" for n in (8, 16, 24, 32)]
+    vm.ingest_data([_catalog_doc(course, quarter="20264") for course in courses], "catalog_class_data")
+    first_ids = [record[0] for record in index.upsert.call_args.kwargs["vectors"]]
+
+    # Next quarter drops CMPSC 8: the other courses are overwritten in place, only CMPSC 8 is stale.
+    stats = vm.ingest_data([_catalog_doc(course, quarter="20271") for course in courses[1:]], "catalog_class_data")
+
+    assert [record[0] for record in index.upsert.call_args.kwargs["vectors"]] == first_ids[1:]
+    assert stats["stale_ids"] == first_ids[:1] and stats["deleted"] == 1
+    assert sorted(vm._ingest_ledger.hashes("catalog_class_data")) == sorted(first_ids[1:])
+
+
+def test_ingest_data_keeps_stale_vectors_after_a_partial_scrape_unless_pruned():
+    vm = _ledgered_vector_manager()
+    index = vm._ingest_pipeline.index
+    posts = [_reddit_post(f"p{i}", f"post {i}") for i in range(10)]
+    vm.ingest_data(posts, "reddit_class_data")
+
+    partial = vm.ingest_data(posts[:3], "reddit_class_data")
+    assert len(partial["stale_ids"]) == 7 and partial["deleted"] == 0
+    index.delete.assert_not_called()
+
+    pruned = vm.ingest_data(posts[:3], "reddit_class_data", prune=True)
+    assert pruned["deleted"] == 7
+    assert sorted(vm._ingest_ledger.hashes("reddit_class_data")) == sorted(
+        record[0] for record in index.upsert.call_args_list[0].kwargs["vectors"][:3]
+    )
+
+
+def test_sweep_orphans_deletes_vectors_missing_from_the_ledger():
+    vm = _ledgered_vector_manager()
+    index = vm._ingest_pipeline.index
+    vm.ingest_data([_reddit_post("a1", "kept")], "reddit_class_data")
+    kept_id = index.upsert.call_args.kwargs["vectors"][0][0]
+    index.list.return_value = iter([[kept_id, "legacy-content-hash"], ["another-orphan"]])
+
+    assert vm.sweep_orphans("reddit_class_data", dry_run=True) == ["legacy-content-hash", "another-orphan"]
+    index.delete.assert_not_called()
+
+    index.list.return_value = iter([[kept_id, "legacy-content-hash"], ["another-orphan"]])
+    vm.sweep_orphans("reddit_class_data")
+    index.delete.assert_called_once_with(ids=["legacy-content-hash", "another-orphan"], namespace="reddit_class_data")
+    assert vm.sweep_orphans("empty_namespace") == []
+
+
+# --- NAMESPACE ROUTER TESTS ---
+def test_router_rules_pick_namespace_from_keywords():
+    router = NamespaceRouter(centroids_path=None)
+
+    assert router.route("is CMPSC 130A hard?").namespace == "reddit_class_data"
+    assert router.route("best prof for PSTAT 120A").namespace == "professor_data"
+    assert router.route("how are the dorms in IV").namespace == "school_reviews"
+    assert router.route("hello there") is None
+
+
+def test_router_course_rule_needs_upper_case_for_word_like_subjects():
+    router = NamespaceRouter(centroids_path=None)
+    assert router.rule_scores("is cmpsc 130a hard?")["reddit_class_data"] == 3.0
+    assert router.rule_scores("is ME 15 hard?")["reddit_class_data"] == 3.0
+    assert router.rule_scores("can you help me 2 pick")["reddit_class_data"] == 0.0
+    assert router.rule_scores("is art 1 easy")["reddit_class_data"] == 0.0
+
+
+def test_router_centroids_route_and_persist(tmp_path):
+    path = str(tmp_path / "centroids.json")
+    router = NamespaceRouter(centroids_path=path)
+    router.update_centroid("professor_data", [[1.0, 0.0, 0.0], [0.9, 0.1, 0.0]])
+    router.update_centroid("school_reviews", [[0.0, 1.0, 0.0]])
+    router.update_centroid("reddit_class_data", [[0.0, 0.0, 1.0]])
+
+    reloaded = NamespaceRouter(centroids_path=path)
+    decision = reloaded.route("hello there", query_vector=[0.05, 0.02, 0.9])
+    assert decision.namespace == "reddit_class_data"
+    assert decision.source == "centroid"
+
+    # Equidistant from two centroids: not confident, caller should use the LLM.
+    assert reloaded.route("hello there", query_vector=[0.0, 1.0, 1.0]) is None
+
+
+def test_routed_multi_search_embeds_query_once():
+    with _offline_vector_manager_deps():
+        vm = VectorManager(api_key="fake-key")
+        vm.embeddings = MagicMock()
+        vm.embeddings.embed_query.return_value = [0.1, 0.2]
+        vm.vector_store = MagicMock()
+        vm.vector_store.similarity_search_by_vector.side_effect = (
+            lambda vector, k, namespace: [f"{namespace}:{k}"]
+        )
+
+        namespace, results = vm.routed_multi_search(
+            "Who teaches CMPSC 130A?",
+            k=4,
+            extra_namespaces={"reddit_class_data": 3, "catalog_class_data": 3},
+        )
+
+        assert namespace == "professor_data"
+        assert results == {
+            "professor_data": ["professor_data:4"],
+            "reddit_class_data": ["reddit_class_data:3"],
+            "catalog_class_data": ["catalog_class_data:3"],
+        }
+        vm.embeddings.embed_query.assert_called_once_with("Who teaches CMPSC 130A?")
+        for call in vm.vector_store.similarity_search_by_vector.call_args_list:
+            assert call.args[0] == [0.1, 0.2]
+
+
+def test_routed_multi_search_runs_extra_searches_during_routing():
+    with _offline_vector_manager_deps():
+        vm = VectorManager(api_key="fake-key")
+
+        def slow_route(query, query_vector=None):
+            time.sleep(0.2)
+            return "professor_data"
+
+        def slow_search(vector, k, namespace):
+            time.sleep(0.2)
+            return [f"{namespace}:{k}"]
+
+        vm.route_query = slow_route
+        vm.vector_store = MagicMock()
+        vm.vector_store.similarity_search_by_vector.side_effect = slow_search
+
+        started = time.perf_counter()
+        namespace, results = vm.routed_multi_search(
+            "hello there",
+            k=4,
+            extra_namespaces={"reddit_class_data": 3, "professor_data": 4},
+            query_vector=[0.1, 0.2],
+        )
+        elapsed = time.perf_counter() - started
+
+        assert namespace == "professor_data"
+        assert results == {"reddit_class_data": ["reddit_class_data:3"], "professor_data": ["professor_data:4"]}
+        # The routed namespace was already searched with enough results, so it is not searched twice.
+        assert vm.vector_store.similarity_search_by_vector.call_count == 2
+        assert elapsed < 0.35
+
+
+def test_routed_multi_search_falls_back_to_whole_index():
+    with _offline_vector_manager_deps():
+        vm = VectorManager(api_key="fake-key")
+
+        def search(vector, k, namespace=None):
+            if namespace == "professor_data":
+                raise RuntimeError("namespace unavailable")
+            return [f"{namespace or 'index'}:{k}"]
+
+        vm.vector_store = MagicMock()
+        vm.vector_store.similarity_search_by_vector.side_effect = search
+
+        namespace, results = vm.routed_multi_search(
+            "Who teaches CMPSC 130A?",
+            k=4,
+            extra_namespaces={"reddit_class_data": 3},
+            query_vector=[0.1, 0.2],
+        )
+
+        assert namespace == "professor_data"
+        assert results == {"reddit_class_data": ["reddit_class_data:3"], "professor_data": ["index:4"]}
+
+
+# --- EMBEDDING CACHE TESTS ---
+class CountingEmbeddings:
+    def __init__(self):
+        self.query_calls = []
+        self.document_calls = []
+
+    def embed_query(self, text):
+        self.query_calls.append(text)
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts):
+        self.document_calls.append(list(texts))
+        return [[float(len(text)), 0.0] for text in texts]
+
+
+def test_embedding_cache_hits_memory_then_disk(tmp_path):
+    db_path = str(tmp_path / "embeddings.db")
+    inner = CountingEmbeddings()
+    cache = CachedEmbeddings(inner, model_name="m", dimension=2, db_path=db_path)
+
+    first = cache.embed_query("Is CMPSC 130A hard?")
+    again = cache.embed_query("  is cmpsc 130a   HARD? ")
+    assert first == again
+    assert len(inner.query_calls) == 1
+
+    # A fresh process-level cache still finds the vector in sqlite.
+    restarted = CachedEmbeddings(inner, model_name="m", dimension=2, db_path=db_path)
+    assert restarted.embed_query("is cmpsc 130a hard?") == first
+    assert len(inner.query_calls) == 1
+    assert restarted.stats()["disk_hits"] == 1
+
+    # Different model or dimension never shares entries.
+    other_model = CachedEmbeddings(inner, model_name="m2", dimension=2, db_path=db_path)
+    other_model.embed_query("is cmpsc 130a hard?")
+    assert len(inner.query_calls) == 2
+
+
+def test_embedding_cache_stores_float32_and_caps_disk_rows(tmp_path):
+    db_path = str(tmp_path / "embeddings.db")
+    inner = CountingEmbeddings()
+    cache = CachedEmbeddings(inner, model_name="m", dimension=2, db_path=db_path, max_disk_rows=2)
+
+    for text in ("first", "second", "third"):
+        cache.embed_query(text)
+
+    rows = cache.conn.execute("SELECT cache_key, vector FROM embeddings").fetchall()
+    assert {key for key, _ in rows} == {cache._key("second", "query"), cache._key("third", "query")}
+    assert all(len(blob) == 2 * 4 for _, blob in rows)
+
+    # Rows written as float64 by older versions still decode.
+    legacy_key = cache._key("legacy", "query")
+    cache.conn.execute(
+        "INSERT INTO embeddings (cache_key, vector, created_at) VALUES (?, ?, ?)",
+        (legacy_key, array("d", [0.1, 0.2]).tobytes(), datetime.now()),
+    )
+    cache.conn.commit()
+    restarted = CachedEmbeddings(inner, model_name="m", dimension=2, db_path=db_path, max_disk_rows=10)
+    assert restarted.embed_query("legacy") == [0.1, 0.2]
+    assert "legacy" not in inner.query_calls
+
+
+def test_embedding_cache_only_embeds_new_documents():
+    inner = CountingEmbeddings()
+    cache = CachedEmbeddings(inner, model_name="m", dimension=2, db_path=None)
+
+    cache.embed_documents(["review a", "review b"])
+    vectors = cache.embed_documents(["review a", "review c", "review c"])
+
+    assert inner.document_calls == [["review a", "review b"], ["review c"]]
+    assert vectors[1] == vectors[2]
+    stats = cache.stats()
+    assert stats["misses"] == 3
+    assert stats["memory_hits"] == 1
+
+
+# --- INGEST PIPELINE TESTS ---
+class FlakyEmbeddings(CountingEmbeddings):
+    """Fails the first `failures` calls, and every call containing `poison`."""
+
+    def __init__(self, failures=0, poison=None):
+        super().__init__()
+        self.failures = failures
+        self.poison = poison
+
+    def embed_documents(self, texts):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("429 quota")
+        if self.poison in texts:
+            raise RuntimeError("bad document")
+        return super().embed_documents(texts)
+
+
+def _ingest_docs(count):
+    docs = [Document(page_content=f"review {i}", metadata={"n": i}) for i in range(count)]
+    return docs, [f"id-{i}" for i in range(count)]
+
+
+def test_ingest_pipeline_batches_embeds_and_upserts():
+    index = MagicMock()
+    embeddings = CountingEmbeddings()
+    pipeline = IngestPipeline(embeddings, index, embed_batch_size=3, embed_workers=3, upsert_batch_size=2)
+    docs, ids = _ingest_docs(10)
+
+    vectors, stats = pipeline.run(docs, ids, "school_reviews")
+
+    assert sorted(len(batch) for batch in embeddings.document_calls) == [1, 3, 3, 3]
+    upserted = [record for call in index.upsert.call_args_list for record in call.kwargs["vectors"]]
+    assert sorted(record[0] for record in upserted) == sorted(ids)
+    assert all(len(call.kwargs["vectors"]) <= 2 for call in index.upsert.call_args_list)
+    assert {record[2]["text"] for record in upserted} == {doc.page_content for doc in docs}
+    assert vectors == [[float(len(doc.page_content)), 0.0] for doc in docs]
+    assert stats["batches"] == 4 and stats["failed_batches"] == 0
+    assert stats["docs_per_second"] > 0
+
+
+def test_ingest_pipeline_retries_with_backoff():
+    sleeps = []
+    pipeline = IngestPipeline(
+        FlakyEmbeddings(failures=2), MagicMock(), embed_batch_size=10, retry_base_seconds=1.0, sleep=sleeps.append
+    )
+
+    _, stats = pipeline.run(*_ingest_docs(4), "school_reviews")
+
+    assert stats["retries"] == 2 and stats["failed_batches"] == 0
+    assert 1.0 <= sleeps[0] < 2.0 and 2.0 <= sleeps[1] < 3.0
+
+
+def test_ingest_pipeline_resumes_from_checkpoint(tmp_path):
+    checkpoint = IngestCheckpoint(str(tmp_path / "checkpoints.db"))
+    docs, ids = _ingest_docs(9)
+
+    broken = FlakyEmbeddings(poison="review 4")
+    first = IngestPipeline(broken, MagicMock(), checkpoint, embed_batch_size=3, max_retries=1, sleep=lambda _: None)
+    vectors, stats = first.run(docs, ids, "professor_data")
+    assert stats["failed_batches"] == 1
+    assert len(vectors) == 6
+    assert checkpoint.done_batches("professor_data", IngestCheckpoint.run_key(ids, 3)) == {0, 2}
+
+    fixed = CountingEmbeddings()
+    index = MagicMock()
+    second = IngestPipeline(fixed, index, checkpoint, embed_batch_size=3)
+    _, stats = second.run(docs, ids, "professor_data")
+    assert fixed.document_calls == [["review 3", "review 4", "review 5"]]
+    assert stats["skipped_batches"] == 2 and stats["failed_batches"] == 0
+    assert checkpoint.done_batches("professor_data", IngestCheckpoint.run_key(ids, 3)) == set()
+
+
+def test_ingest_checkpoint_drops_abandoned_runs_once_the_namespace_succeeds(tmp_path):
+    checkpoint = IngestCheckpoint(str(tmp_path / "checkpoints.db"))
+    checkpoint.mark_done("professor_data", "abandoned-run", 0)
+    checkpoint.mark_done("school_reviews", "other-namespace", 0)
+
+    docs, ids = _ingest_docs(3)
+    IngestPipeline(CountingEmbeddings(), MagicMock(), checkpoint, embed_batch_size=3).run(docs, ids, "professor_data")
+
+    assert checkpoint.done_batches("professor_data", "abandoned-run") == set()
+    assert checkpoint.done_batches("school_reviews", "other-namespace") == {0}
+
+
+def test_ingest_data_resumes_through_the_ledger():
+    vm = _ledgered_vector_manager(FlakyEmbeddings(poison="post 4"))
+    vm._ingest_pipeline.max_retries = 0
+    posts = [_reddit_post(f"p{i}", f"post {i}") for i in range(25)]
+    assert vm.ingest_data(posts, "reddit_class_data")["failed_batches"] == 1
+
+    fixed = CountingEmbeddings()
+    vm._ingest_pipeline.embeddings = fixed
+    stats = vm.ingest_data(posts, "reddit_class_data")
+
+    # Only the batch that failed is embedded again.
+    assert fixed.document_calls == [[f"post {i}" for i in range(10)]]
+    assert stats["failed_batches"] == 0 and stats["unchanged"] == 15
+
+
+def test_ingest_ledger_diff_tracks_changed_and_stale_ids(tmp_path):
+    ledger = IngestLedger(str(tmp_path / "ledger.db"))
+    ledger.record("catalog", ["a", "b", "c"], ["1", "2", "3"])
+
+    pending, stale = ledger.diff("catalog", ["a", "b", "d", "d"], ["1", "changed", "4", "4"])
+    assert pending == [1, 2]
+    assert stale == ["c"]
+    assert ledger.diff("other_namespace", ["a"], ["1"]) == ([0], [])
+
+    ledger.forget("catalog", ["c"])
+    assert IngestLedger(str(tmp_path / "ledger.db")).hashes("catalog") == {"a": "1", "b": "2"}
+
+
+# --- CATALOG AVAILABILITY TESTS ---
+def _catalog_doc(course_id, quarter="20264"):
+    return Document(
+        page_content=f"Course: {course_id}",
+        metadata={"course_id": course_id, "quarter": quarter, "source_key": f"catalog:{course_id}"},
+    )
+
+
+def _enrollment_row(course_id, enrolled, max_enroll, quarter="20264"):
+    return {
+        "quarter": quarter,
+        "course_id": course_id,
+        "enrolled": enrolled,
+        "max_enroll": max_enroll,
+        "remaining": max(0, max_enroll - enrolled),
+        "sections": [{"section": "0100", "enroll_code": "12345", "enrolled": enrolled, "max_enroll": max_enroll}],
+    }
+
+
+def test_catalog_availability_join_adds_latest_counts(tmp_path):
+    store = CatalogAvailabilityStore(str(tmp_path / "availability.db"))
+    store.update([_enrollment_row("CMPSC 16", 90, 100)])
+    store.update([_enrollment_row("CMPSC 16", 99, 100)])
+    review = Document(page_content="Great prof", metadata={"source_key": "rmp-review:1"})
+
+    joined = store.join([_catalog_doc("CMPSC 16"), _catalog_doc("CMPSC 24"), review])
+
+    assert "99/100 Enrolled, 1 seats left" in joined[0].page_content
+    assert "Section: 0100 (Code: 12345) | Capacity: 99/100 Enrolled" in joined[0].page_content
+    assert joined[0].metadata["remaining_total_availability"] == 1
+    assert joined[1].page_content == "Course: CMPSC 24" and joined[2] is review
+    assert store.lookup([("20261", "CMPSC 16")]) == {}
+
+
+def test_vector_manager_joins_live_availability_into_catalog_results(tmp_path):
+    with _offline_vector_manager_deps():
+        vm = VectorManager(api_key="fake-key")
+    vm._catalog_availability = CatalogAvailabilityStore(str(tmp_path / "availability.db"))
+    vm._catalog_availability.update([_enrollment_row("CMPSC 16", 40, 50)])
+    vm.vector_store = MagicMock()
+    vm.vector_store.similarity_search_by_vector.return_value = [_catalog_doc("CMPSC 16")]
+
+    results = vm.multi_search("cs 16 seats", {"catalog_class_data": 3}, query_vector=[0.1, 0.2])
+
+    assert results["catalog_class_data"][0].metadata["remaining_total_availability"] == 10
+    vm.vector_store.similarity_search_by_vector.return_value = ["plain result"]
+    assert vm.multi_search("dorms", {"school_reviews": 3}, query_vector=[0.1])["school_reviews"] == ["plain result"]
+
+
+def test_catalog_availability_lists_only_flipped_flags(tmp_path):
+    store = CatalogAvailabilityStore(str(tmp_path / "availability.db"))
+    store.update([
+        _enrollment_row("CMPSC 16", 99, 100),
+        _enrollment_row("CMPSC 24", 100, 100),
+        _enrollment_row("CMPSC 24", 10, 100, quarter="20262"),
+    ])
+    assert sorted(store.changed_flags()) == [("20264", "CMPSC 16", True), ("20264", "CMPSC 24", False)]
+    store.mark_flags_synced(store.changed_flags())
+
+    # New counts keep the synced flag; only a flip is listed again.
+    store.update([_enrollment_row("CMPSC 16", 98, 100), _enrollment_row("CMPSC 24", 100, 100)])
+    assert store.changed_flags() == []
+    store.update([_enrollment_row("CMPSC 16", 100, 100)])
+    assert store.changed_flags() == [("20264", "CMPSC 16", False)]
+    assert store.join([_catalog_doc("CMPSC 16")])[0].metadata["seats_available"] is False
+
+
+def test_seats_available_flag_reaches_catalog_vector_metadata(tmp_path):
+    vm = _ledgered_vector_manager()
+    index = vm._ingest_pipeline.index
+    vm._catalog_availability = CatalogAvailabilityStore(str(tmp_path / "availability.db"))
+    vm._catalog_availability.update([_enrollment_row("CMPSC 16", 100, 100)])
+
+    docs = [_catalog_doc("CMPSC 16"), _catalog_doc("CMPSC 24")]
+    vm.ingest_data(docs, "catalog_class_data")
+    upserted = {vector_id: metadata for vector_id, _, metadata in index.upsert.call_args.kwargs["vectors"]}
+    cs16_id, cs24_id = document_id(docs[0]), document_id(docs[1])
+    # Courses without a snapshot are not hidden by a seats_available filter.
+    assert upserted[cs16_id]["seats_available"] is False and upserted[cs24_id]["seats_available"] is True
+    assert "seats_available" not in docs[0].metadata
+
+    # Seats open in one course, and a course outside the index shows up in the snapshot.
+    vm._catalog_availability.update([_enrollment_row("CMPSC 16", 90, 100), _enrollment_row("CMPSC 999", 0, 10)])
+    assert vm.sync_availability_flags("catalog_class_data") == 1
+    index.update.assert_called_once_with(id=cs16_id, set_metadata={"seats_available": True}, namespace="catalog_class_data")
+    assert vm._catalog_availability.changed_flags() == []
+    assert vm._infer_and_save_schema.call_args.args[0][0].metadata == {"seats_available": True}
+
+    # Steady counts and re-ingesting unchanged text write nothing.
+    vm._catalog_availability.update([_enrollment_row("CMPSC 16", 91, 100)])
+    assert vm.sync_availability_flags("catalog_class_data") == 0
+    assert vm.ingest_data(docs, "catalog_class_data")["documents"] == 0
+    assert index.update.call_count == 1 and index.upsert.call_count == 1
+
+
+# --- SEMANTIC RESPONSE CACHE TESTS ---
+def test_response_cache_matches_near_duplicates_per_model():
+    cache = SemanticResponseCache(threshold=0.95, ttl_seconds=60)
+    cache.store([1.0, 0.0, 0.1], "gemini", "Take CMPSC 16 first.", ["reddit_class_data"])
+
+    assert cache.lookup([0.98, 0.01, 0.12], "gemini") == "Take CMPSC 16 first."
+    assert cache.lookup([0.0, 1.0, 0.0], "gemini") is None
+    assert cache.lookup([1.0, 0.0, 0.1], "other-model") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_response_cache_requires_the_same_course_codes():
+    cache = SemanticResponseCache(threshold=0.95, ttl_seconds=60)
+    cache.store([1.0, 0.0, 0.1], "gemini", "130A needs CMPSC 40.", ["catalog_class_data"], ["CMPSC 130A"])
+
+    # Queries that differ only in the course number embed almost identically.
+    assert cache.lookup([1.0, 0.0, 0.1], "gemini", ["CMPSC 130B"]) is None
+    assert cache.lookup([1.0, 0.0, 0.1], "gemini") is None
+    assert cache.lookup([0.99, 0.0, 0.1], "gemini", ["CMPSC 130A"]) == "130A needs CMPSC 40."
+
+
+def test_response_cache_expires_and_invalidates_by_namespace():
+    cache = SemanticResponseCache(threshold=0.9, ttl_seconds=60)
+    cache.store([1.0, 0.0], "gemini", "prof answer", ["professor_data"])
+    cache.store([0.0, 1.0], "gemini", "catalog answer", ["catalog_class_data"])
+
+    assert cache.invalidate_namespace("professor_data") == 1
+    assert cache.lookup([1.0, 0.0], "gemini") is None
+    assert cache.lookup([0.0, 1.0], "gemini") == "catalog answer"
+
+    with patch("backend.src.managers.response_cache.time.monotonic", return_value=10 ** 9):
+        assert cache.lookup([0.0, 1.0], "gemini") is None
+    assert cache.stats()["entries"] == 0
+
+
+# --- CHAT WRITE-BEHIND QUEUE TESTS ---
+def _write_behind(session_manager, firebase_history=None, **kwargs):
+    return ChatWriteBehindQueue(
+        lambda: session_manager, lambda: firebase_history or MagicMock(), linger_seconds=0.05, **kwargs
+    )
+
+
+def test_write_behind_batches_per_session_and_keeps_reads_consistent(mock_db_connection):
+    sm = SessionManager()
+    gate = threading.Event()
+    real_save = sm.save_messages
+    calls = []
+
+    def gated_save(session_id, rows):
+        gate.wait(2)
+        calls.append((session_id, len(rows)))
+        real_save(session_id, rows)
+
+    sm.save_messages = gated_save
+    writer = _write_behind(sm)
+
+    writer.enqueue_turn("s-1", None, "q1", "a1")
+    writer.enqueue_turn("s-1", None, "q2", "a2")
+    writer.enqueue_turn("s-2", None, "hello", "hi")
+
+    # Not committed yet, but the next turn still sees it.
+    _, _, history = writer.load_summarized_history("s-1")
+    assert [m.content for m in history] == ["q1", "a1", "q2", "a2"]
+    assert writer.stats()["pending_messages"] == 6
+
+    gate.set()
+    assert writer.flush()
+    assert sorted(calls) == [("s-1", 4), ("s-2", 2)]
+    assert [m.content for m in writer.load_summarized_history("s-1")[2]] == ["q1", "a1", "q2", "a2"]
+    assert writer.stats()["pending_messages"] == 0
+    writer.close()
+
+
+def test_write_behind_retries_transient_errors_and_batches_firestore():
+    sm = MagicMock()
+    sm.save_messages.side_effect = [sqlite3.OperationalError("database is locked"), None]
+    firebase = MagicMock()
+    writer = _write_behind(sm, firebase, retry_backoff_seconds=0)
+
+    writer.enqueue_turn("s-1", "gaucho@ucsb.edu", "q", "a")
+    assert writer.flush()
+    writer.close()
+
+    assert sm.save_messages.call_count == 2
+    user_email, session_id, rows = firebase.save_messages.call_args.args
+    assert (user_email, session_id) == ("gaucho@ucsb.edu", "s-1")
+    assert [row[0] for row in rows] == ["human", "ai"]
+    assert rows[0][2] < rows[1][2]
+    stats = writer.stats()
+    assert stats["retries"] == 1
+    assert stats["failed"] == 0
+    assert stats["messages_written"] == 2
+
+
+def test_write_behind_does_not_hold_its_lock_during_sqlite_commits(mock_db_connection):
+    sm = SessionManager()
+    entered, gate = threading.Event(), threading.Event()
+    real_save = sm.save_messages
+
+    def gated_save(session_id, rows):
+        entered.set()
+        gate.wait(2)
+        real_save(session_id, rows)
+
+    sm.save_messages = gated_save
+    writer = _write_behind(sm)
+    writer.enqueue_turn("s-1", None, "q1", "a1")
+    assert entered.wait(2)
+
+    # The worker is mid-commit; producers must not wait for it.
+    started = time.perf_counter()
+    assert writer.enqueue_turn("s-1", None, "q2", "a2")
+    assert time.perf_counter() - started < 0.5
+    gate.set()
+    assert writer.flush()
+    writer.close()
+
+
+def test_write_behind_reads_do_not_duplicate_a_commit_in_flight(mock_db_connection):
+    sm = SessionManager()
+    writer = _write_behind(sm)
+    writer._ensure_worker = MagicMock()
+    writer.enqueue_turn("s-1", None, "q1", "a1")
+
+    # Committed to sqlite but not yet dropped from the pending buffer.
+    items = writer._pending["s-1"]
+    sm.save_messages("s-1", [(item["role"], item["content"], item["timestamp"]) for item in items])
+
+    assert [m.content for m in writer.load_summarized_history("s-1")[2]] == ["q1", "a1"]
+
+
+def test_write_behind_reports_overflow_when_full():
+    writer = _write_behind(MagicMock(), max_pending=2)
+    writer._ensure_worker = MagicMock()  # keep the queue full
+
+    assert writer.enqueue_turn("s-1", None, "q1", "a1")
+    assert not writer.enqueue_turn("s-1", None, "q2", "a2")
+    assert writer.stats()["queue_depth"] == 2
+    assert writer.stats()["overflow"] == 1
+
+
+def test_write_behind_callback_cannot_take_the_slot_a_turn_reserved():
+    writer = _write_behind(MagicMock(), max_pending=2)
+    writer._ensure_worker = MagicMock()  # keep the queue full
+    real_put_nowait = writer._queue.put_nowait
+    racer = []
+
+    def put_nowait(item):
+        real_put_nowait(item)
+        if not racer:
+            # A callback arrives between the turn's two messages.
+            racer.append(threading.Thread(target=writer.enqueue_callback, args=(lambda: None,)))
+            racer[0].start()
+            racer[0].join(0.2)
+
+    writer._queue.put_nowait = put_nowait
+    assert writer.enqueue_turn("s-1", None, "q1", "a1")
+    racer[0].join()
+
+    assert [item.get("role") for item in writer._queue.queue] == ["human", "ai"]
+    assert writer.stats()["pending_messages"] == 2
+
+
+def test_write_behind_retries_firestore_with_the_same_message_ids():
+    class ServiceUnavailable(Exception):
+        pass
+
+    firebase = MagicMock()
+    firebase.save_messages.side_effect = [ServiceUnavailable("committed, then timed out"), None]
+    writer = _write_behind(MagicMock(), firebase, retry_backoff_seconds=0)
+
+    writer.enqueue_turn("s-1", "gaucho@ucsb.edu", "q", "a")
+    assert writer.flush()
+    writer.close()
+
+    first, retry = (call.args[2] for call in firebase.save_messages.call_args_list)
+    assert [row[3] for row in first] == [row[3] for row in retry]
+    assert len({row[3] for row in first}) == 2
+
+
+def test_firebase_save_messages_uses_one_batch():
+    manager = FirebaseChatHistoryManager()
+    manager.enabled = True
+    manager.db = MagicMock()
+    chat_ref = manager._chat_ref("gaucho@ucsb.edu", "s-1")
+    chat_ref.get.return_value.exists = False
+    now = datetime.now(timezone.utc)
+
+    manager.save_messages("gaucho@ucsb.edu", "s-1", [("human", "is 130A hard?", now), ("ai", "yes", now)])
+    manager.save_messages("gaucho@ucsb.edu", "s-1", [("human", "thanks", now), ("ai", "np", now)])
+
+    batch = manager.db.batch.return_value
+    assert batch.commit.call_count == 2
+    assert batch.set.call_count == 6
+    first_payload = batch.set.call_args_list[0].args[1]
+    assert first_payload["title"] == "is 130A hard?"
+    assert "created_at" in first_payload
+    # The existence read only happens for the first batch of a chat.
+    assert chat_ref.get.call_count == 1
+
+    manager.save_messages("gaucho@ucsb.edu", "s-1", [("human", "again", now, "msg-1")])
+    chat_ref.collection.return_value.document.assert_called_with("msg-1")
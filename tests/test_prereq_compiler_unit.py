@@ -0,0 +1,75 @@
+import json
+
+from backend.src.services.prereq_compiler import compile_prereq_file, compile_prereq_text
+from backend.src.services.prereq_engine import PrereqGraph, load_compiled_prereqs
+
+
+def _groups(compiled: dict) -> list[list[str]]:
+    return [[option["course"] for option in group["any_of"]] for group in compiled["requires"]]
+
+
+def test_compiles_or_groups_with_grade_and_concurrency():
+    compiled = compile_prereq_text(
+        "Mathematics 3A or 2A with a grade of C or better (may be taken concurrently), CS 8 or "
+        "Engineering 3 or ECE 3 with a grade of C or better, or significant prior programming experience."
+    )
+
+    assert _groups(compiled) == [["MATH 3A", "MATH 2A"], ["CMPSC 8", "ENGR 3", "ECE 3"]]
+    math, intro = compiled["requires"]
+    assert all(option["min_grade"] == "C" and option["concurrent"] for option in math["any_of"])
+    assert not any(option["concurrent"] for option in intro["any_of"])
+    assert intro["alternatives"] == ["significant prior programming experience"]
+
+
+def test_compiles_shared_subjects_ranges_and_notes():
+    compiled = compile_prereq_text(
+        "Computer Science 24 and 32 with a grade of C or better; Computer Science 130A-B; "
+        "open to Computer Science majors only."
+    )
+
+    assert _groups(compiled) == [["CMPSC 24"], ["CMPSC 32"], ["CMPSC 130A"], ["CMPSC 130B"]]
+    assert compiled["requires"][0]["any_of"][0]["min_grade"] == "C"
+    assert compiled["requires"][2]["any_of"][0]["min_grade"] is None
+    assert compiled["notes"] == ["open to Computer Science majors only"]
+
+
+def test_distributes_or_over_course_ranges():
+    compiled = compile_prereq_text("ECE 139 or equivalent, or PSTAT 120A-B.")
+
+    assert _groups(compiled) == [["ECE 139", "PSTAT 120A"], ["ECE 139", "PSTAT 120B"]]
+
+
+def test_leading_grade_and_corequisite_clauses():
+    assert compile_prereq_text("Grade of B or better in CS130B")["requires"] == [
+        {"any_of": [{"course": "CMPSC 130B", "min_grade": "B", "concurrent": False}]}
+    ]
+    coreq = compile_prereq_text("Co-requisite PSTAT 120A or ECE 139")
+    assert all(option["concurrent"] for option in coreq["requires"][0]["any_of"])
+
+
+def test_clauses_without_courses_are_notes():
+    compiled = compile_prereq_text("Students must: (1) have attained upper-division standing, (3) have consent of instructor.")
+
+    assert compiled["requires"] == []
+    assert compiled["notes"]
+    assert compile_prereq_text(None) == {"requires": [], "notes": []}
+
+
+def test_compiled_artifact_round_trip_and_staleness(tmp_path):
+    source = tmp_path / "prereqs.json"
+    target = tmp_path / "prereqs.compiled.json"
+    source.write_text(json.dumps({"CMPSC 177": {"prereq_raw": "Computer Science 170 (may be taken concurrently)."}}))
+
+    compile_prereq_file(source, target)
+    artifact = load_compiled_prereqs(target, source)
+    graph = PrereqGraph.from_compiled(artifact)
+
+    assert graph.eligible_courses([], in_progress=["CMPSC 170"]) == ["CMPSC 177"]
+    assert graph.eligible_courses([]) == []
+
+    source.write_text(json.dumps({"CMPSC 177": {"prereq_raw": "None"}}))
+    assert load_compiled_prereqs(target, source) is None
+
+
+def test_bundled_compiled_artifact_is_current():
+    assert load_compiled_prereqs() is not None
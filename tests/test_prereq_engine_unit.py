@@ -0,0 +1,89 @@
+from backend.src.services.prereq_engine import PrereqGraph, parse_prereq_groups
+from backend.src.services.prereq_graph import build_mermaid_markup, build_upper_division_flowchart_data
+from backend.src.services.transcript_advisor import _eligible_courses
+
+
+SAMPLE_DATA = {
+    "CMPSC 8": {"prereq_courses": []},
+    "CS 16": {"prereq_courses": ["MATH 3A", "OR 2A", "CS 8"]},
+    "CMPSC 24": {"prereq_courses": ["CMPSC 16"]},
+    "CMPSC 130A": {"prereq_courses": ["CMPSC 24", "PSTAT 120A", "OR 120B"]},
+}
+
+
+def test_parse_prereq_groups_builds_and_of_or_groups():
+    groups = parse_prereq_groups(["MATH 3A", "OR 2A", "CS8", "AND CMPSC 24"], {"CMPSC 8", "CMPSC 24"})
+
+    assert groups == [["MATH 3A", "MATH 2A"], ["CMPSC 8"], ["CMPSC 24"]]
+
+
+def test_graph_interns_codes_and_tracks_dependents():
+    graph = PrereqGraph.from_data(SAMPLE_DATA)
+
+    assert len(graph) == 4
+    assert "cs 16" in graph
+    assert "MATH 3A" not in graph
+    assert graph.id_of("CS16") == graph.id_of("CMPSC 16")
+    assert graph.labels[graph.id_of("CMPSC 16")] == "CS 16"
+
+    node = graph.id_of("CMPSC 130A")
+    assert [[graph.codes[o] for o in group] for group in graph.groups[node]] == [
+        ["CMPSC 24"],
+        ["PSTAT 120A", "PSTAT 120B"],
+    ]
+    assert graph.dependents[graph.id_of("CMPSC 24")] == [node]
+
+
+def test_graph_eligibility_uses_or_groups():
+    graph = PrereqGraph.from_data(SAMPLE_DATA)
+
+    assert graph.eligible_courses(["CMPSC 8", "MATH 2A"], excluded=["CMPSC 8"]) == ["CMPSC 16"]
+    assert "CMPSC 16" not in graph.eligible_courses(["MATH 2A"])
+
+
+def test_flowchart_and_advisor_agree_on_eligibility():
+    completed = ["CMPSC 8", "MATH 3A", "CMPSC 16", "MATH 3B", "CMPSC 24", "CMPSC 40"]
+
+    flow = build_upper_division_flowchart_data(completed)
+    chart_courses = {node["id"] for node in flow["nodes"]}
+    flow_eligible = {node["id"] for node in flow["nodes"] if node["eligible_now"]}
+    advisor_eligible = set(_eligible_courses(set(completed), set(completed))) & chart_courses
+
+    assert flow_eligible
+    assert flow_eligible == advisor_eligible
+
+
+def test_flowchart_and_advisor_agree_with_courses_in_progress():
+    completed = ["CMPSC 8", "CMPSC 16", "CMPSC 40", "MATH 3A", "MATH 3B", "MATH 4A", "PSTAT 120A"]
+    in_progress = ["CMPSC 24"]
+
+    flow = build_upper_division_flowchart_data(completed, completed + in_progress)
+    chart_courses = {node["id"] for node in flow["nodes"] if not node["taken"]}
+    flow_eligible = {node["id"] for node in flow["nodes"] if node["eligible_now"]}
+    advisor_eligible = set(
+        _eligible_courses(set(completed), set(completed + in_progress), set(in_progress))
+    ) & chart_courses
+
+    # CMPSC 24 is not a concurrent prerequisite, so courses that need it wait a quarter.
+    assert "CMPSC 130A" not in flow_eligible
+    assert flow_eligible == advisor_eligible
+
+
+def test_mermaid_uses_normalized_prereq_labels():
+    markup = build_mermaid_markup([], graph=PrereqGraph.from_data(SAMPLE_DATA))
+
+    assert 'CMPSC_16["CS 16"]' not in markup
+    assert 'CS_16["CS 16"]' in markup
+    assert 'MATH_2A["MATH 2A"]' in markup
+    assert "CMPSC_8 --> CS_16" in markup
+
+
+def test_bitmask_eligibility_matches_group_semantics():
+    graph = PrereqGraph.from_data(SAMPLE_DATA)
+    completed = graph.to_mask(["CMPSC 8", "MATH 3A", "CMPSC 24"])
+
+    assert completed == sum(1 << graph.id_of(code) for code in ["CMPSC 8", "MATH 3A", "CMPSC 24"])
+    assert graph.is_eligible(graph.id_of("CMPSC 16"), completed)
+    assert not graph.is_eligible(graph.id_of("CMPSC 130A"), completed)
+    assert graph.is_eligible(graph.id_of("CMPSC 130A"), completed | graph.to_mask(["PSTAT 120B"]))
+    assert [graph.codes[n] for n in graph.eligible_ids(completed, graph.to_ids(["CMPSC 8"]))] == ["CMPSC 16"]
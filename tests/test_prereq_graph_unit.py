@@ -0,0 +1,54 @@
+import pytest
+
+from backend.src.services.prereq_graph import build_upper_division_flowchart_data, layer_courses
+
+COURSES = ["CMPSC 8", "CMPSC 16", "CMPSC 24", "CMPSC 40", "CMPSC 130A"]
+EDGES = {
+    ("CMPSC 8", "CMPSC 16"),
+    ("CMPSC 16", "CMPSC 24"),
+    ("CMPSC 24", "CMPSC 130A"),
+    ("CMPSC 16", "CMPSC 40"),
+}
+
+
+def test_longest_path_layering():
+    levels, cycles = layer_courses(COURSES, EDGES)
+
+    assert levels == {"CMPSC 8": 0, "CMPSC 16": 1, "CMPSC 24": 2, "CMPSC 40": 2, "CMPSC 130A": 3}
+    assert cycles == []
+
+
+def test_alap_layering_pulls_courses_toward_what_they_unlock():
+    levels, _ = layer_courses(COURSES + ["CMPSC 5A"], EDGES, mode="alap")
+
+    assert levels["CMPSC 130A"] == 3
+    assert levels["CMPSC 40"] == 3
+    assert levels["CMPSC 5A"] == 3
+    assert levels["CMPSC 8"] == 0
+
+
+def test_layering_reports_cycles():
+    edges = EDGES | {("CMPSC 130A", "CMPSC 16")}
+
+    levels, cycles = layer_courses(COURSES, edges)
+
+    assert cycles == [["CMPSC 16", "CMPSC 24", "CMPSC 130A"]]
+    assert set(levels) == set(COURSES)
+
+
+def test_unknown_layering_mode_is_rejected():
+    with pytest.raises(ValueError):
+        layer_courses(COURSES, EDGES, mode="sideways")
+
+
+def test_flowchart_tiers_follow_layering_mode():
+    completed = ["CMPSC 8", "CMPSC 16"]
+
+    longest = build_upper_division_flowchart_data(completed)
+    alap = build_upper_division_flowchart_data(completed, layering="alap")
+
+    assert longest["cycles"] == []
+    assert sorted(sum(longest["tiers"], [])) == sorted(sum(alap["tiers"], []))
+    assert len(longest["tiers"]) == len(alap["tiers"])
+    assert longest["tiers"] != alap["tiers"]
+    assert [node["id"] for node in longest["nodes"] if not node["taken"]] == sum(longest["tiers"], [])
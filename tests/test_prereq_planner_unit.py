@@ -0,0 +1,115 @@
+import pytest
+
+from backend.src.api.chat import plan_course_schedule
+from backend.src.services.prereq_engine import PrereqGraph
+from backend.src.services.prereq_planner import DegreePlanner
+
+SAMPLE_DATA = {
+    "CMPSC 8": {"prereq_courses": []},
+    "CMPSC 16": {"prereq_courses": ["CMPSC 8"]},
+    "CMPSC 24": {"prereq_courses": ["CMPSC 16"]},
+    "CMPSC 40": {"prereq_courses": ["CMPSC 16"]},
+    "CMPSC 64": {"prereq_courses": ["CMPSC 16"]},
+    "CMPSC 130A": {"prereq_courses": ["CMPSC 24", "CMPSC 40"]},
+    "CMPSC 130B": {"prereq_courses": ["CMPSC 130A"]},
+    "CMPSC 154": {"prereq_courses": ["CMPSC 64"]},
+}
+
+
+def _requires(*codes, concurrent=False):
+    return {"any_of": [{"course": code, "min_grade": None, "concurrent": concurrent} for code in codes]}
+
+
+# CMPSC 130A takes CMPSC 9 or 24, and ECE 139 in the same quarter or earlier.
+OR_COREQ_COURSES = {
+    "CMPSC 9": {"requires": []},
+    "CMPSC 16": {"requires": []},
+    "CMPSC 24": {"requires": [_requires("CMPSC 16")]},
+    "CMPSC 64": {"requires": [_requires("CMPSC 24")]},
+    "CMPSC 154": {"requires": [_requires("CMPSC 64")]},
+    "ECE 139": {"requires": []},
+    "CMPSC 130A": {"requires": [_requires("CMPSC 9", "CMPSC 24"), _requires("ECE 139", concurrent=True)]},
+}
+
+
+def _plan(completed, targets, **kwargs):
+    return DegreePlanner(completed, targets, graph=PrereqGraph.from_data(SAMPLE_DATA), **kwargs).plan()
+
+
+def test_plan_follows_the_critical_path():
+    plan = _plan(["CMPSC 8", "CMPSC 16"], ["CMPSC 130B", "CMPSC 154"], max_units=8)
+
+    assert plan["optimal"]
+    assert plan["quarter_count"] == plan["lower_bound"] == 3
+    assert plan["critical_path"] == ["CMPSC 24", "CMPSC 130A", "CMPSC 130B"]
+    assert plan["added_prerequisites"] == ["CMPSC 24", "CMPSC 40", "CMPSC 64", "CMPSC 130A"]
+    assert plan["quarters"][0]["courses"] == ["CMPSC 24", "CMPSC 40"]
+    assert all(quarter["units"] <= 8 for quarter in plan["quarters"])
+
+
+def test_unit_cap_and_offerings_stretch_the_plan():
+    tight = _plan(["CMPSC 8", "CMPSC 16"], ["CMPSC 130B", "CMPSC 154"], max_units=4)
+    assert tight["quarter_count"] == 6
+
+    # CMPSC 40 only in Spring pushes 130A/130B past the first year.
+    seasonal = _plan(["CMPSC 8", "CMPSC 16"], ["CMPSC 130B"], offerings={"CMPSC 40": ["Spring"]})
+    assert [quarter["season"] for quarter in seasonal["quarters"]] == ["Fall", "Winter", "Spring", "Fall", "Winter"]
+    assert seasonal["quarters"][2]["courses"] == ["CMPSC 40"]
+    assert seasonal["optimal"]
+
+
+def test_unschedulable_and_unknown_courses_are_reported():
+    plan = _plan(["CMPSC 16"], ["CMPSC 130B", "CMPSC 154", "ART 1", "cs16"], offerings={"CMPSC 40": []})
+
+    assert plan["unschedulable"] == ["CMPSC 40", "CMPSC 130A", "CMPSC 130B"]
+    assert plan["unknown_courses"] == ["ART 1"]
+    assert plan["already_completed"] == ["CMPSC 16"]
+    assert [quarter["courses"] for quarter in plan["quarters"]] == [["CMPSC 64"], ["CMPSC 154"]]
+
+
+def test_exhausted_time_budget_falls_back_to_greedy():
+    plan = _plan(["CMPSC 8"], ["CMPSC 130B", "CMPSC 154"], max_units=8, time_budget_ms=0)
+
+    assert plan["quarter_count"] >= plan["lower_bound"]
+    assert sum(len(quarter["courses"]) for quarter in plan["quarters"]) == 7
+
+
+def test_unknown_start_quarter_is_rejected():
+    with pytest.raises(ValueError):
+        _plan([], ["CMPSC 16"], start_season="Autumn")
+
+
+def test_plan_tool_formats_quarters():
+    output = plan_course_schedule.invoke(
+        {"target_courses": ["CMPSC 24"], "completed_courses": ["CMPSC 8", "CMPSC 16"]}
+    )
+
+    assert "quarter(s) needed:" in output
+    assert "Quarter 1 (Fall):" in output
+    assert output.split("Critical path: ")[1].splitlines()[0].endswith("CMPSC 24")
+
+
+def test_redundant_or_group_pick_is_dropped():
+    plan = DegreePlanner([], ["CMPSC 130A", "CMPSC 154"], graph=PrereqGraph(OR_COREQ_COURSES)).plan()
+
+    planned = sum((quarter["courses"] for quarter in plan["quarters"]), [])
+    assert "CMPSC 24" in planned and "CMPSC 9" not in planned
+    assert "CMPSC 9" not in plan["added_prerequisites"]
+
+
+def test_concurrent_prerequisite_can_share_the_quarter():
+    graph = PrereqGraph(OR_COREQ_COURSES)
+
+    together = DegreePlanner(["CMPSC 24"], ["CMPSC 130A"], graph=graph).plan()
+    assert together["quarter_count"] == together["lower_bound"] == 1
+    assert together["quarters"][0]["courses"] == ["CMPSC 130A", "ECE 139"]
+
+    # With room for one course, ECE 139 still has to come first.
+    apart = DegreePlanner(["CMPSC 24"], ["CMPSC 130A"], max_units=4, graph=graph).plan()
+    assert [quarter["courses"] for quarter in apart["quarters"]] == [["ECE 139"], ["CMPSC 130A"]]
+
+
+def test_non_positive_unit_cap_is_rejected():
+    with pytest.raises(ValueError):
+        _plan([], ["CMPSC 16"], max_units=0)
+    assert plan_course_schedule.invoke({"target_courses": ["CMPSC 16"], "max_units_per_quarter": 0}).startswith("Error:")
@@ -0,0 +1,59 @@
+from fastapi.testclient import TestClient
+
+from backend.src.api.chat import lookup_course_prereq_chain
+from backend.src.main import app
+from backend.src.services.prereq_engine import PrereqGraph
+from backend.src.services.prereq_reachability import ReachabilityIndex
+
+SAMPLE_DATA = {
+    "CMPSC 8": {"prereq_courses": []},
+    "CMPSC 16": {"prereq_courses": ["MATH 3A", "CMPSC 8"]},
+    "CMPSC 24": {"prereq_courses": ["CMPSC 16"]},
+    "CMPSC 40": {"prereq_courses": ["CMPSC 16"]},
+    "CMPSC 130A": {"prereq_courses": ["CMPSC 24", "CMPSC 40"]},
+    "CMPSC 130B": {"prereq_courses": ["CMPSC 130A"]},
+}
+
+
+def test_ancestors_and_descendants():
+    index = ReachabilityIndex(PrereqGraph.from_data(SAMPLE_DATA))
+
+    assert set(index.prerequisites("CMPSC 130A")) == {"CMPSC 8", "CMPSC 16", "CMPSC 24", "CMPSC 40", "MATH 3A"}
+    assert index.unlocks("cs16") == ["CMPSC 24", "CMPSC 40", "CMPSC 130A", "CMPSC 130B"]
+    assert index.unlocks("CMPSC 130B") == []
+    assert index.requires("CMPSC 130B", "MATH 3A")
+    assert not index.requires("CMPSC 24", "CMPSC 40")
+
+
+def test_shortest_chain():
+    index = ReachabilityIndex(PrereqGraph.from_data(SAMPLE_DATA))
+
+    assert index.shortest_chain("CMPSC 130B") == ["MATH 3A", "CMPSC 16", "CMPSC 24", "CMPSC 130A", "CMPSC 130B"]
+    assert index.shortest_chain("CMPSC 130B", start="CMPSC 40") == ["CMPSC 40", "CMPSC 130A", "CMPSC 130B"]
+    assert index.shortest_chain("CMPSC 24", start="CMPSC 40") == []
+
+
+def test_cycles_still_produce_a_closure():
+    data = dict(SAMPLE_DATA, **{"CMPSC 8": {"prereq_courses": ["CMPSC 130B"]}})
+    index = ReachabilityIndex(PrereqGraph.from_data(data))
+
+    assert "CMPSC 130B" in index.unlocks("CMPSC 8")
+    assert "CMPSC 8" in index.unlocks("CMPSC 130B")
+
+
+def test_reachability_endpoint_and_tool():
+    client = TestClient(app)
+
+    response = client.get("/courses/CMPSC 130A/reachability", params={"start": "CMPSC 16"})
+    body = response.json()
+    assert response.status_code == 200
+    assert "CMPSC 16" in body["all_prerequisites"]
+    assert "CMPSC 130B" in body["directly_unlocks"]
+    assert body["shortest_chain"][0] == "CMPSC 16"
+    assert body["shortest_chain"][-1] == "CMPSC 130A"
+
+    assert client.get("/courses/CMPSC 9999/reachability").status_code == 404
+
+    answer = lookup_course_prereq_chain.invoke({"course": "CMPSC 130B"})
+    assert "Directly unlocks" in answer
+    assert "CMPSC 130A" in answer
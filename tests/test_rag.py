@@ -1,20 +1,65 @@
-import pytest
-from unittest.mock import patch, MagicMock
+import sys
+from unittest.mock import MagicMock
 
+from backend.src.managers.catalog_availability import CatalogAvailabilityStore
+from tests.conftest import make_fake_container
 
-@pytest.mark.asyncio
-async def test_rag_update_concurrency(client):
+
+def _patch_rag_module(monkeypatch, **attrs):
+    # The app imports this module as `src`, tests as `backend.src`.
+    for name in ("src.api.rag", "backend.src.api.rag"):
+        if name in sys.modules:
+            for attr, value in {"MODEL_NAME": "gemini", **attrs}.items():
+                monkeypatch.setattr(sys.modules[name], attr, value)
+
+
+def test_rag_update_concurrency(client, monkeypatch):
     mock_reviews = [MagicMock(page_content="Review 1")]
     mock_profs = [MagicMock(page_content="Prof Smith")]
+    mock_reddit = ([MagicMock(page_content="CS 16 is fine")], ["CMPSC 16"])
+    mock_catalog = [MagicMock(page_content="Course: CMPSC 16")]
+
+    container = make_fake_container()
+    container.catalog_availability = CatalogAvailabilityStore(":memory:")
+    client.app.state.container = container
+    ucsb_client = MagicMock()
+    ucsb_client.get_all_classes_by_dept.return_value = mock_catalog
+    ucsb_client.get_enrollment_snapshot.return_value = [
+        {"quarter": "20264", "course_id": "CMPSC 16", "enrolled": 9, "max_enroll": 10, "remaining": 1}
+    ]
+    _patch_rag_module(
+        monkeypatch,
+        get_school_reviews=lambda school_id: mock_reviews,
+        get_school_professors=lambda school_id: mock_profs,
+        fetch_reddit_docs_for_cmpsc_catalog=lambda: mock_reddit,
+        UCSBCatalogClient=lambda: ucsb_client,
+    )
+
+    response = client.post("/rag/update")
+
+    assert response.status_code == 200
+    assert "Successfully updated" in response.json()["message"]
+    assert [call.args[1] for call in container.vector_manager.ingest_data.call_args_list] == [
+        "school_reviews", "professor_data", "reddit_class_data", "catalog_class_data"
+    ]
+    assert container.catalog_availability.lookup([("20264", "CMPSC 16")])[("20264", "CMPSC 16")]["remaining"] == 1
+
 
-    with patch("backend.src.api.rag.get_school_reviews", return_value=mock_reviews), \
-            patch("backend.src.api.rag.get_school_professors", return_value=mock_profs), \
-            patch("backend.src.api.rag.VectorManager") as MockVM:
-        vm_instance = MockVM.return_value
+def test_rag_availability_refreshes_side_table_without_ingesting(client, monkeypatch):
+    container = make_fake_container()
+    container.catalog_availability = CatalogAvailabilityStore(":memory:")
+    client.app.state.container = container
+    rows = [{"quarter": "20264", "course_id": "CMPSC 16", "enrolled": 9, "max_enroll": 10, "remaining": 1}]
 
-        response = client.post("/rag/update")
+    ucsb_client = MagicMock()
+    ucsb_client.get_enrollment_snapshot.return_value = rows
+    _patch_rag_module(monkeypatch, UCSBCatalogClient=lambda: ucsb_client)
 
-        assert response.status_code == 200
-        assert "Successfully updated" in response.json()["message"]
+    response = client.post("/rag/availability")
 
-        assert vm_instance.ingest_data.call_count == 2
+    assert response.status_code == 200
+    assert "1 catalog courses" in response.json()["message"]
+    assert container.catalog_availability.lookup([("20264", "CMPSC 16")])[("20264", "CMPSC 16")]["remaining"] == 1
+    container.vector_manager.ingest_data.assert_not_called()
+    container.vector_manager.sync_availability_flags.assert_called_once_with("catalog_class_data")
+    container.response_cache.invalidate_namespace.assert_called_once_with("catalog_class_data")
@@ -14,6 +14,10 @@ Endpoints tested
   DELETE /transcript/clear?session_id=<id>
       Wipes the stored transcript for the given session.
 
+  POST   /transcript/what-if
+      JSON { "session_id", "add": [...], "remove": [...] }; returns the eligibility
+      and tier delta against the session's stored transcript.
+
 Test coverage
 -------------
   test_parse_transcript_success            — PDF upload returns parsed JSON and saves to session
@@ -21,6 +25,8 @@ Test coverage
   test_parse_transcript_handles_parse_error — Parser failures return HTTP 422
   test_clear_transcript                    — DELETE endpoint wipes the session transcript
   test_session_manager_transcript_lifecycle — SQLite save → load → clear round-trip
+  test_what_if_returns_delta_from_cached_base — what-if delta matches a full recompute
+  test_flowchart_upload_renders_off_the_event_loop — flowchart layout and SVG run on the I/O pool
 
 Running the tests
 -----------------
@@ -30,12 +36,16 @@ Running the tests
 import io
 import json
 import sqlite3
+import sys
+import threading
 from unittest.mock import MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
 
 from backend.src.main import app
+from backend.src.services.transcript_advisor import build_transcript_advising_context, prereq_data_version
+from tests.conftest import make_fake_container
 
 
 @pytest.fixture
@@ -71,24 +81,35 @@ SAMPLE_TRANSCRIPT = {
 }
 
 
-def test_parse_transcript_success(client, mock_db_connection):
-    with patch("backend.src.api.transcript.parse_transcript", return_value=SAMPLE_TRANSCRIPT), \
-         patch("backend.src.api.transcript.SessionManager") as MockSM:
-        sm_instance = MockSM.return_value
+def _patch_parse_transcript(monkeypatch, parser):
+    # The app imports this module as `src`, tests as `backend.src`.
+    for name in ("src.api.transcript", "backend.src.api.transcript"):
+        if name in sys.modules:
+            monkeypatch.setattr(sys.modules[name], "parse_transcript", parser)
+
 
-        fake_pdf = io.BytesIO(b"%PDF-1.4 fake pdf content")
-        response = client.post(
-            "/transcript/parse",
-            data={"session_id": "test-session-123"},
-            files={"file": ("transcript.pdf", fake_pdf, "application/pdf")},
-        )
+def test_parse_transcript_success(client, mock_db_connection, monkeypatch):
+    sm_instance = MagicMock()
+    app.state.container = make_fake_container(session_manager=sm_instance)
+    parser = MagicMock(return_value=SAMPLE_TRANSCRIPT)
+    _patch_parse_transcript(monkeypatch, parser)
+    fake_pdf = io.BytesIO(b"%PDF-1.4 fake pdf content")
+    response = client.post(
+        "/transcript/parse",
+        data={"session_id": "test-session-123"},
+        files={"file": ("transcript.pdf", fake_pdf, "application/pdf")},
+    )
 
-        assert response.status_code == 200
-        body = response.json()
-        assert body["message"] == "Transcript parsed and stored for this session."
-        assert body["data"]["student_name"] == "Gaucho Student"
-        assert len(body["data"]["courses"]) == 1
-        sm_instance.save_transcript.assert_called_once_with("test-session-123", SAMPLE_TRANSCRIPT)
+    assert response.status_code == 200
+    parser.assert_called_once_with(b"%PDF-1.4 fake pdf content")
+    body = response.json()
+    assert body["message"] == "Transcript parsed and stored for this session."
+    assert body["data"]["student_name"] == "Gaucho Student"
+    assert len(body["data"]["courses"]) == 1
+    session_id, transcript, advising_context, context_version = sm_instance.save_transcript.call_args.args
+    assert (session_id, transcript) == ("test-session-123", SAMPLE_TRANSCRIPT)
+    assert advising_context == build_transcript_advising_context(SAMPLE_TRANSCRIPT)
+    assert context_version == prereq_data_version()
 
 
 def test_parse_transcript_rejects_non_pdf(client):
@@ -102,27 +123,55 @@ def test_parse_transcript_rejects_non_pdf(client):
     assert "PDF" in response.json()["detail"]
 
 
-def test_parse_transcript_handles_parse_error(client):
-    with patch("backend.src.api.transcript.parse_transcript", side_effect=Exception("bad pdf")):
-        fake_pdf = io.BytesIO(b"%PDF-1.4 corrupt")
-        response = client.post(
-            "/transcript/parse",
-            data={"session_id": "test-session-123"},
-            files={"file": ("transcript.pdf", fake_pdf, "application/pdf")},
-        )
-        assert response.status_code == 422
-        assert "Failed to parse transcript" in response.json()["detail"]
+def test_parse_transcript_handles_parse_error(client, monkeypatch):
+    _patch_parse_transcript(monkeypatch, MagicMock(side_effect=Exception("bad pdf")))
+    fake_pdf = io.BytesIO(b"%PDF-1.4 corrupt")
+    response = client.post(
+        "/transcript/parse",
+        data={"session_id": "test-session-123"},
+        files={"file": ("transcript.pdf", fake_pdf, "application/pdf")},
+    )
+    assert response.status_code == 422
+    assert "Failed to parse transcript" in response.json()["detail"]
+
+
+def test_flowchart_upload_renders_off_the_event_loop(client, monkeypatch):
+    container = make_fake_container()
+    container.flowcharts = MagicMock()
+    threads = []
+
+    def flowchart_data(completed, accounted, layering):
+        threads.append(threading.current_thread())
+        return {"tiers": [["CMPSC 24"]], "summary": {"remaining_cmpsc_0_199_courses": 1, "eligible_now": 1}}
+
+    def flowchart_svg(completed, accounted, layering):
+        threads.append(threading.current_thread())
+        return "a" * 64
+
+    container.flowcharts.flowchart_data.side_effect = flowchart_data
+    container.flowcharts.flowchart_svg.side_effect = flowchart_svg
+    app.state.container = container
+    _patch_parse_transcript(monkeypatch, lambda pdf_bytes: SAMPLE_TRANSCRIPT)
+
+    response = client.post(
+        "/transcript/flowchart",
+        files={"file": ("transcript.pdf", io.BytesIO(b"%PDF-1.4"), "application/pdf")},
+    )
+
+    assert response.status_code == 200
+    assert len(threads) == 2
+    assert all(thread.name.startswith(container.io_pool._thread_name_prefix) for thread in threads)
 
 
 def test_clear_transcript(client):
-    with patch("backend.src.api.transcript.SessionManager") as MockSM:
-        sm_instance = MockSM.return_value
+    sm_instance = MagicMock()
+    app.state.container = make_fake_container(session_manager=sm_instance)
 
-        response = client.delete("/transcript/clear", params={"session_id": "test-session-123"})
+    response = client.delete("/transcript/clear", params={"session_id": "test-session-123"})
 
-        assert response.status_code == 200
-        assert "cleared" in response.json()["message"]
-        sm_instance.clear_transcript.assert_called_once_with("test-session-123")
+    assert response.status_code == 200
+    assert "cleared" in response.json()["message"]
+    sm_instance.clear_transcript.assert_called_once_with("test-session-123")
 
 
 def test_session_manager_transcript_lifecycle():
@@ -142,3 +191,114 @@ def test_session_manager_transcript_lifecycle():
 
         sm.clear_transcript("session-abc")
         assert sm.load_transcript("session-abc") is None
+
+
+def test_advising_context_is_computed_once_and_reused(mock_db_connection):
+    from backend.src.managers.advising_context_cache import AdvisingContextCache
+    from backend.src.managers.session_manager import SessionManager
+
+    sm = SessionManager()
+    cache = AdvisingContextCache(lambda: sm)
+    expected = build_transcript_advising_context(SAMPLE_TRANSCRIPT)
+
+    with patch(
+        "backend.src.managers.advising_context_cache.build_transcript_advising_context",
+        wraps=build_transcript_advising_context,
+    ) as build:
+        assert cache.store("s-1", SAMPLE_TRANSCRIPT) == expected
+        assert cache.load("s-1") == (SAMPLE_TRANSCRIPT, expected)
+
+        # A fresh process reads the stored copy instead of recomputing it.
+        restarted = AdvisingContextCache(lambda: sm)
+        assert restarted.load("s-1") == (SAMPLE_TRANSCRIPT, expected)
+        assert build.call_count == 1
+
+        # New prerequisite data invalidates stored contexts.
+        with patch("backend.src.managers.advising_context_cache.prereq_data_version", return_value="new"):
+            assert restarted.load("s-1") == (SAMPLE_TRANSCRIPT, expected)
+        assert build.call_count == 2
+        assert sm.load_transcript_with_context("s-1")[2] == "new"
+
+    assert cache.load("missing") == (None, None)
+    assert restarted.stats()["stored_hits"] == 1
+
+
+def test_advising_context_cache_sees_uploads_from_other_workers(mock_db_connection):
+    from backend.src.managers.advising_context_cache import AdvisingContextCache
+    from backend.src.managers.session_manager import SessionManager
+
+    sm = SessionManager()
+    worker_a = AdvisingContextCache(lambda: sm)
+    worker_b = AdvisingContextCache(lambda: sm)
+    worker_a.store("s-1", SAMPLE_TRANSCRIPT)
+    assert worker_a.load("s-1")[0] == SAMPLE_TRANSCRIPT
+
+    reuploaded = {**SAMPLE_TRANSCRIPT, "courses": SAMPLE_TRANSCRIPT["courses"][:1]}
+    worker_b.store("s-1", reuploaded)
+    assert worker_a.load("s-1") == (reuploaded, build_transcript_advising_context(reuploaded))
+
+    sm.clear_transcript("s-1")
+    assert worker_a.load("s-1") == (None, None)
+    assert worker_a.stats()["entries"] == 0
+
+
+def test_what_if_returns_delta_from_cached_base(client):
+    from backend.src.services.prereq_graph import build_upper_division_flowchart_data
+
+    sm_instance = MagicMock()
+    sm_instance.load_transcript_with_context.return_value = (SAMPLE_TRANSCRIPT, {"eligible_next_courses": []}, None)
+    container = make_fake_container(session_manager=sm_instance)
+    app.state.container = container
+
+    body = {"session_id": "s-what-if", "add": ["CMPSC 24", "MATH 4A", "CMPSC 40"], "remove": []}
+    response = client.post("/transcript/what-if", json=body)
+    assert response.status_code == 200
+    delta = response.json()
+
+    before = build_upper_division_flowchart_data(["CMPSC 16"])
+    after = build_upper_division_flowchart_data(["CMPSC 16", "CMPSC 24", "MATH 4A", "CMPSC 40"])
+    eligible_before = {node["id"] for node in before["nodes"] if node["eligible_now"]}
+    eligible_after = {node["id"] for node in after["nodes"] if node["eligible_now"]}
+    assert set(delta["newly_eligible"]) == eligible_after - eligible_before
+    assert delta["eligible_now"] == len(eligible_after)
+    assert {"course": "CMPSC 24", "from": 0, "to": None} in delta["tier_changes"]
+
+    again = client.post("/transcript/what-if", json=dict(body, add=["CMPSC 9"], remove=["CMPSC 16"]))
+    assert again.status_code == 200
+    assert again.json()["removed"] == ["CMPSC 16"]
+    assert "CMPSC 64" in again.json()["newly_blocked"]
+    assert container.what_if_bases.stats() == {"entries": 1, "hits": 1, "builds": 1}
+
+    sm_instance.load_transcript_with_context.return_value = None
+    missing = client.post("/transcript/what-if", json={"session_id": "nobody"})
+    assert missing.status_code == 404
+
+
+def test_plan_schedules_remaining_courses(client):
+    sm_instance = MagicMock()
+    sm_instance.load_transcript_with_context.return_value = (SAMPLE_TRANSCRIPT, {"eligible_next_courses": []}, None)
+    app.state.container = make_fake_container(session_manager=sm_instance)
+
+    response = client.post(
+        "/transcript/plan",
+        json={"session_id": "s-plan", "courses": ["CMPSC 130A", "CMPSC 16"], "max_units": 8, "start_quarter": "Winter"},
+    )
+    assert response.status_code == 200
+    plan = response.json()
+    assert plan["already_completed"] == ["CMPSC 16"]
+    assert plan["critical_path"][-1] == "CMPSC 130A"
+    assert plan["quarters"][0]["season"] == "Winter"
+    # ECE 139 / PSTAT 120A may be taken concurrently, so it can share 130A's quarter.
+    assert "CMPSC 130A" in plan["quarters"][-1]["courses"]
+    assert plan["quarter_count"] >= plan["lower_bound"]
+
+    default = client.post("/transcript/plan", json={"session_id": "s-plan"})
+    assert default.status_code == 200
+    assert "CMPSC 130A" in sum((quarter["courses"] for quarter in default.json()["quarters"]), [])
+
+    bad = client.post("/transcript/plan", json={"session_id": "s-plan", "start_quarter": "Autumn"})
+    assert bad.status_code == 400
+
+    sm_instance.load_transcript_with_context.return_value = None
+    missing = client.post("/transcript/plan", json={"session_id": "nobody"})
+    assert missing.status_code == 404
@@ -57,6 +57,66 @@ class TestUCSBCatalogClient(unittest.TestCase):
         self.assertIn("T R 14:00-15:15 at PHELP 3515", formatted)
         self.assertIn("Capacity: 45/50 Enrolled", formatted)
 
+    def test_format_class_data_without_enrollment(self):
+        mock_course = {
+            "courseId": "CMPSC 8",
+            "title": "INTRO TO COMP SCI",
+            "classSections": [{"section": "0100", "enrollCode": "12345", "enrolledTotal": 45, "maxEnroll": 50}],
+        }
+
+        formatted = self.client._format_class_data(mock_course, include_enrollment=False)
+
+        self.assertIn("Section: 0100 (Code: 12345)", formatted)
+        self.assertNotIn("Capacity", formatted)
+
+    @patch('requests.Session.get')
+    def test_get_all_classes_by_dept_embeds_static_text(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "classes": [{
+                "courseId": "CMPSC     8 ",
+                "title": "INTRO TO COMP SCI",
+                "classSections": [{"section": "0100", "enrollCode": "12345", "enrolledTotal": 45, "maxEnroll": 50}],
+            }]
+        }
+        mock_get.return_value = mock_response
+
+        with patch.object(self.client, "_get_current_quarter_id", return_value="20264"):
+            docs = self.client.get_all_classes_by_dept("CMPSC")
+
+        self.assertEqual(len(docs), 1)
+        self.assertNotIn("45/50", docs[0].page_content)
+        self.assertEqual(docs[0].metadata["source_key"], "catalog:CMPSC 8")
+        self.assertEqual(docs[0].metadata["course_id"], "CMPSC 8")
+        self.assertNotIn("remaining_total_availability", docs[0].metadata)
+
+    @patch('requests.Session.get')
+    def test_get_enrollment_snapshot(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "classSpaces": [
+                {
+                    "courseId": "CMPSC    16 ",
+                    "classSpaceAvailabilities": [
+                        {"section": "0100", "enrollCode": "11111", "enrolledTotal": 90, "maxEnroll": 100},
+                        {"section": "0101", "enrollCode": "11112", "enrolledTotal": 25, "maxEnroll": 25},
+                    ]
+                },
+                {"courseId": "MATH     3A", "classSpaceAvailabilities": []},
+            ]
+        }
+        mock_get.return_value = mock_response
+
+        rows = self.client.get_enrollment_snapshot("CMPSC", quarter="20264")
+
+        mock_get.assert_called_once_with("https://api.ucsb.edu/academics/curriculums/v3/classspaceavailability/20264")
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["course_id"], "CMPSC 16")
+        self.assertEqual((rows[0]["enrolled"], rows[0]["max_enroll"], rows[0]["remaining"]), (115, 125, 10))
+        self.assertEqual(rows[0]["sections"][1]["enroll_code"], "11112")
+
     @patch('requests.Session.get')
     def test_get_class_by_enrollcode_success(self, mock_get):
         # Setup mock response